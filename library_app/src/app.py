@@ -1,12 +1,16 @@
+import logging
+import os
+import threading
 import flet as ft
 from dotenv import load_dotenv
-from controllers.authControllers import AuthController
-from view.loginView import LoginView
-from view.registerView import RegisterView
-from view.librarianView import LibrarianView
-from view.studentView import StudentView
-from sqlalchemy.orm import sessionmaker
-from model.db import engine
+
+# Vistas, controladores y model.db se importan al visitar cada ruta por
+# primera vez, para que el servidor atienda /login apenas arranca
+
+load_dotenv()
+
+
+SESSION_TOKEN_KEY = "biblioteca.session_token"
 
 
 def main(page: ft.Page):
@@ -32,9 +36,35 @@ def main(page: ft.Page):
     )
     page.overlay.append(page.snack)
 
-    # SQLAlchemy
-    Session = sessionmaker(bind=engine)
-    session = Session()
+    from controllers.authControllers import AuthController
+    from model.db import SessionLocal
+    from model.session import release_identity_map
+
+    # SQLAlchemy: una sesión por conexión del navegador (se conecta en la primera consulta)
+    session = SessionLocal()
+
+    def on_close(e):
+        session.close()
+
+    page.on_close = on_close
+
+    # Cada evento es una unidad de trabajo: los handlers de esta conexión corren
+    # de a uno (comparten la sesión, que no es thread-safe) y al terminar se
+    # cierra la transacción, así un usuario inactivo no retiene una conexión
+    handler_lock = threading.Lock()
+    run_thread = page.run_thread
+
+    def run_handler(handler, *args, **kwargs):
+        def unidad_de_trabajo(*a, **k):
+            with handler_lock:
+                try:
+                    handler(*a, **k)
+                finally:
+                    release_identity_map(session)
+
+        run_thread(unidad_de_trabajo, *args, **kwargs)
+
+    page.run_thread = run_handler
 
     auth_controller = AuthController(session)
 
@@ -42,8 +72,10 @@ def main(page: ft.Page):
 
     def go_to(view_name):
         page.views.clear()
+        release_identity_map(session)
 
         if view_name == "login":
+            from view.loginView import LoginView
             page.views.append(
                 LoginView(
                     page,
@@ -54,6 +86,7 @@ def main(page: ft.Page):
             )
 
         elif view_name == "register":
+            from view.registerView import RegisterView
             page.views.append(
                 RegisterView(
                     page,
@@ -65,6 +98,7 @@ def main(page: ft.Page):
 
 
         elif view_name == "admin":
+            from view.librarianView import LibrarianView
             page.views.append(
                 LibrarianView(
                     page,
@@ -74,6 +108,7 @@ def main(page: ft.Page):
             )
 
         elif view_name == "home":
+            from view.studentView import StudentView
             page.views.append(
                 StudentView(
                     page,
@@ -90,6 +125,14 @@ def main(page: ft.Page):
     def on_login_success():
         #user = auth_controller.get_current_user()
 
+        # Token firmado para que una pestaña que se reconecta no repita el login
+        token = auth_controller.issue_session_token()
+        if token:
+            page.client_storage.set(SESSION_TOKEN_KEY, token)
+
+        go_to_home()
+
+    def go_to_home():
         # Bibliotecario
         if auth_controller.user_has_role("bibliotecario"):
             go_to("admin")
@@ -100,6 +143,7 @@ def main(page: ft.Page):
 
 
     def on_logout():
+        page.client_storage.remove(SESSION_TOKEN_KEY)
         go_to("login")
 
     def on_register_success():
@@ -118,13 +162,40 @@ def main(page: ft.Page):
 
     # ----------- Vista inicial -----------
 
-    go_to("login")
+    token = page.client_storage.get(SESSION_TOKEN_KEY)
+    if token and auth_controller.login_with_token(token):
+        go_to_home()
+    else:
+        go_to("login")
+    release_identity_map(session)
+
+
+def start_background_jobs():
+    """Arranca las tareas periódicas; sus imports y la conexión quedan fuera del arranque"""
+    from model.db import SessionLocal
+    from model.fines import FINE_ACCRUAL_INTERVAL, accrue_overdue_fines
+    from model.dashboard import DASHBOARD_REFRESH_INTERVAL, refresh_dashboard
+    from model.pool import POOL_STATS_INTERVAL, log_pool_stats
+    from model.scheduler import PeriodicJob
+
+    # Multas por atraso en segundo plano (FINE_ACCRUAL_INTERVAL > 0 para activarlo)
+    PeriodicJob("fine-accrual", SessionLocal, accrue_overdue_fines, FINE_ACCRUAL_INTERVAL).start()
+    # Vistas materializadas del dashboard (DASHBOARD_REFRESH_INTERVAL = 0 lo desactiva)
+    PeriodicJob("dashboard-refresh", SessionLocal, refresh_dashboard, DASHBOARD_REFRESH_INTERVAL).start()
+    # Métricas del pool de conexiones en el log (POOL_STATS_INTERVAL = 0 lo desactiva)
+    PeriodicJob("pool-stats", SessionLocal, log_pool_stats, POOL_STATS_INTERVAL).start()
 
 
 if __name__ == "__main__":
+    logging.basicConfig(
+        level=os.getenv("LOG_LEVEL", "INFO"),
+        format="%(asctime)s %(levelname)s %(name)s: %(message)s",
+    )
+    threading.Thread(target=start_background_jobs, name="background-jobs", daemon=True).start()
+
     ft.app(
         target=main,
         view=ft.WEB_BROWSER,  
         host="0.0.0.0",       
-        port=8550              
+        port=int(os.getenv("APP_PORT", "8550"))
     )
@@ -7,6 +7,8 @@ from model.models import Rol, UsuarioRol
 from sqlalchemy import select, and_, or_, func
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import IntegrityError
+from model import passwords
+from model.auth import session_tokens, login_rate_limiter
 
 
 class AuthController:
@@ -15,50 +17,79 @@ class AuthController:
         self.current_user = None
 
   
-    def login(self, usuario: str, password: str) -> bool:
-        if not usuario or not password:
-            return False
-
-        user = (
+    def _find_user(self, usuario: str):
+        return (
             self.session.query(Usuario)
             .filter(Usuario.nombre == usuario)
             .first()
         )
 
+    def login(self, usuario: str, password: str, client_ip: str = None) -> bool:
+        if not usuario or not password or self.is_locked(usuario, client_ip):
+            return False
+
+        user = self._find_user(usuario)
+
         if user and user.check_password(password):
-            self.current_user = user
-            return True
+            if passwords.needs_rehash(user.password_hash):
+                user.set_password(password)
+                self.session.commit()
+            login_rate_limiter.reset(usuario, client_ip)
+            return self._login_ok(user)
 
+        login_rate_limiter.register_failure(usuario, client_ip)
         return False
 
+    def _login_ok(self, user: Usuario) -> bool:
+        self.current_user = user
+        # Autor de los cambios que se registran en el historial (model/history.py)
+        self.session.info["id_usuario"] = user.id_usuario
+        return True
+
+    def is_locked(self, usuario: str, client_ip: str = None) -> bool:
+        """True si el usuario (desde esa IP) o la IP superaron los intentos fallidos permitidos"""
+        return login_rate_limiter.is_blocked(usuario, client_ip)
+
+    # ---------------------------
+    # Tokens de sesión
+    # ---------------------------
+    def issue_session_token(self):
+        """Token firmado para el usuario actual, o None si no hay sesión o no hay SESSION_SECRET"""
+        if not self.current_user:
+            return None
+        return session_tokens.issue(self.current_user.id_usuario, self.current_user.password_hash)
 
+    def login_with_token(self, token: str) -> bool:
+        """Recupera la sesión desde un token válido sin volver a verificar con bcrypt"""
+        datos = session_tokens.verify(token)
+        if not datos:
+            return False
 
-    def register(self, nombre: str, correo: str, password: str, role_name="estudiante"):
-        """Registra un usuario nuevo con contraseña encriptada."""
-        print("Registrando usuario:", nombre, correo, "con rol:", role_name)
-        role = self.session.query(Rol).filter_by(nombre=role_name).first()
-        print("ROL ENCONTRADO:", role)
+        id_usuario, huella = datos
+        user = self.session.get(Usuario, id_usuario)
+        if not user or not session_tokens.matches(huella, user.password_hash):
+            return False
 
+        return self._login_ok(user)
 
+    def register(self, nombre: str, correo: str, password: str, role_name="estudiante"):
+        """Registra un usuario nuevo con contraseña encriptada."""
+        role = self._find_role(role_name)
         if not role:
-            print("Rol no encontrado:", role_name)
             return False
-           
-        
-        nuevo = Usuario(
-            nombre=nombre,
-            correo=correo,
-        )
+
+        nuevo = Usuario(nombre=nombre, correo=correo)
         nuevo.set_password(password)
+        return self._save_new_user(nuevo, role)
+
+    def _find_role(self, role_name):
+        return self.session.query(Rol).filter_by(nombre=role_name).first()
 
+    def _save_new_user(self, nuevo: Usuario, role: Rol):
         try:
             self.session.add(nuevo)
-            self.session.flush()  
-        
-            print("Usuario creado con ID:", nuevo.id_usuario)
+            self.session.flush()
             nuevo.roles.append(role)
-
-
             self.session.commit()
             return True
         except IntegrityError as e:
@@ -75,6 +106,7 @@ class AuthController:
 
     def logout(self):
         self.current_user = None
+        self.session.info.pop("id_usuario", None)
 
     def get_current_user(self):
         return self.current_user
@@ -1,28 +1,41 @@
-from sqlalchemy.orm import Session
+from datetime import datetime, timedelta
+from sqlalchemy.orm import Session, joinedload
 from model.models import Copia, Material, Estado
+from model.usuario import Usuario
+from model.history import copy_history
+from model.cache import reference_cache
+from model.search import material_search
+from model.pagination import keyset_page
+from model.session import check_version, transactional
 
 
 class CopiaController:
     def __init__(self, session: Session):
         self.session = session
 
-    def get_all_copias(self):
-        """Obtiene todas las copias"""
-        return self.session.query(Copia).all()
+    def get_all_copias(self, after_id: int = None, limit: int = None):
+        """Obtiene las copias con su material, paginadas por llave si se indica `limit`"""
+        query = self.session.query(Copia).options(joinedload(Copia.material))
+        return keyset_page(query, Copia.id_copia, after_id, limit)
 
     def get_copia_by_id(self, copia_id: int):
         """Obtiene una copia por ID"""
         return self.session.query(Copia).filter_by(id_copia=copia_id).first()
 
     def search_copias(self, search_text: str):
-        """Busca copias por título del material"""
+        """Busca copias por título, autor o ISBN del material, ordenadas por relevancia"""
+        if not search_text or not search_text.strip():
+            return self.get_all_copias()
+
+        busqueda = material_search.ranking(self.session, search_text)
         return (
             self.session.query(Copia)
-            .join(Material)
-            .filter(Material.titulo.ilike(f"%{search_text}%"))
+            .join(busqueda, busqueda.c.id_material == Copia.id_material)
+            .order_by(busqueda.c.rank.desc(), Copia.id_copia)
             .all()
         )
 
+    @transactional
     def create_copia(self, id_material: int, codigo_copia: str, 
                     ubicacion: str = None, coleccion: str = None,
                     id_estado: int = None, formato: str = "fisico"):
@@ -36,17 +49,21 @@ class CopiaController:
             formato=formato
         )
         self.session.add(nueva_copia)
-        self.session.commit()
         return nueva_copia
 
+    @transactional
     def update_copia(self, copia_id: int, id_material: int = None,
                     codigo_copia: str = None, ubicacion: str = None,
                     coleccion: str = None, id_estado: int = None,
-                    formato: str = None):
-        """Actualiza una copia existente"""
+                    formato: str = None, version: int = None):
+        """
+        Actualiza una copia existente. `version` es la que se mostró al abrir
+        el diálogo: si la copia cambió desde entonces se lanza ConflictError
+        """
         copia = self.get_copia_by_id(copia_id)
         if not copia:
             return None
+        check_version(copia, version)
 
         if id_material is not None:
             copia.id_material = id_material
@@ -61,15 +78,15 @@ class CopiaController:
         if formato is not None:
             copia.formato = formato
 
-        self.session.commit()
         return copia
 
-    def delete_copia(self, copia_id: int):
-        """Elimina una copia"""
+    @transactional
+    def delete_copia(self, copia_id: int, version: int = None):
+        """Elimina una copia; con `version`, solo si nadie la cambió desde que se mostró"""
         copia = self.get_copia_by_id(copia_id)
         if copia:
+            check_version(copia, version)
             self.session.delete(copia)
-            self.session.commit()
             return True
         return False
 
@@ -91,4 +108,29 @@ class CopiaController:
 
     def get_copia_estado_nombre(self, copia: Copia):
         """Obtiene el nombre del estado de una copia"""
-        return copia.estado_rel.nombre if copia.estado_rel else ""
+        return reference_cache.estado_nombre(self.session, copia.id_estado) or ""
+
+    def get_historial(self, id_copia: int, dias: int = 90):
+        """
+        Cambios de estado de una copia en los últimos `dias` días, más recientes
+        primero; el rango de fechas limita la lectura a las particiones de esos meses
+        """
+        eventos = copy_history(self.session, id_copia, desde=datetime.now() - timedelta(days=dias))
+
+        ids_usuario = {e.id_usuario for e in eventos if e.id_usuario}
+        usuarios = dict(
+            self.session.query(Usuario.id_usuario, Usuario.nombre)
+            .filter(Usuario.id_usuario.in_(ids_usuario))
+            .all()
+        ) if ids_usuario else {}
+
+        return [
+            {
+                "fecha": e.fecha,
+                "anterior": reference_cache.estado_nombre(self.session, e.id_estado_anterior) or "—",
+                "nuevo": reference_cache.estado_nombre(self.session, e.id_estado_nuevo) or "",
+                "usuario": usuarios.get(e.id_usuario, ""),
+                "operacion": e.operacion or "",
+            }
+            for e in eventos
+        ]
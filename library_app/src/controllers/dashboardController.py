@@ -0,0 +1,31 @@
+from sqlalchemy.orm import Session
+from model import dashboard
+
+
+class DashboardController:
+    def __init__(self, session: Session):
+        self.session = session
+
+    def get_resumen(self):
+        """Totales generales: préstamos activos y vencidos, multas y reservas en cola"""
+        return dashboard.resumen(self.session)
+
+    def get_prestamos_por_dia(self, dias: int = 30):
+        """Préstamos realizados por día en los últimos `dias` días"""
+        return dashboard.prestamos_por_dia(self.session, dias)
+
+    def get_estado_copias(self):
+        """Cantidad de copias por estado"""
+        return dashboard.estado_copias(self.session)
+
+    def get_materiales_mas_prestados(self, limite: int = 10):
+        """Materiales con más préstamos"""
+        return dashboard.materiales_mas_prestados(self.session, limite)
+
+    def get_colas_mas_largas(self, limite: int = 10):
+        """Materiales con más reservas en espera"""
+        return dashboard.colas_mas_largas(self.session, limite)
+
+    def refresh(self):
+        """Refresca las vistas materializadas del dashboard"""
+        dashboard.refresh_dashboard(self.session)
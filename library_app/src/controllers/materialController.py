@@ -1,20 +1,33 @@
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, selectinload
 from model.models import Material, Autor, MaterialAutor, Idioma
+from model.cache import reference_cache
+from model.search import material_search
+from model.pagination import keyset_page
+from model.session import transactional
 
 
 class MaterialController:
     def __init__(self, session: Session):
         self.session = session
 
-    def get_all_materials(self):
-        """Obtiene todos los materiales"""
-        return self.session.query(Material).all()
+    def get_all_materials(self, after_id: int = None, limit: int = None):
+        """Obtiene los materiales con sus autores, paginados por llave si se indica `limit`"""
+        query = self.session.query(Material).options(
+            selectinload(Material.autores).selectinload(MaterialAutor.autor)
+        )
+        return keyset_page(query, Material.id_material, after_id, limit)
 
     def search_materials(self, search_text: str):
-        """Busca materiales por título"""
+        """Busca materiales por título, autor, descripción o ISBN, ordenados por relevancia"""
+        if not search_text or not search_text.strip():
+            return self.get_all_materials()
+
+        busqueda = material_search.ranking(self.session, search_text)
         return (
             self.session.query(Material)
-            .filter(Material.titulo.ilike(f"%{search_text}%"))
+            .options(selectinload(Material.autores).selectinload(MaterialAutor.autor))
+            .join(busqueda, busqueda.c.id_material == Material.id_material)
+            .order_by(busqueda.c.rank.desc(), Material.id_material)
             .all()
         )
 
@@ -22,10 +35,12 @@ class MaterialController:
         """Obtiene un material por ID"""
         return self.session.query(Material).filter_by(id_material=material_id).first()
 
+    @transactional
     def create_material(self, titulo: str, descripcion: str = None, 
                        año_publicacion: int = None, id_idioma: int = None,
-                       tipo_material: str = "libro", isbn: str = None):
-        """Crea un nuevo material"""
+                       tipo_material: str = "libro", isbn: str = None,
+                       id_autor: int = None):
+        """Crea un nuevo material y, si se indica, lo asocia a un autor"""
         nuevo_material = Material(
             titulo=titulo,
             descripcion=descripcion,
@@ -35,9 +50,16 @@ class MaterialController:
             isbn=isbn
         )
         self.session.add(nuevo_material)
-        self.session.commit()
+
+        if id_autor:
+            self.session.flush()
+            self.session.add(MaterialAutor(
+                id_material=nuevo_material.id_material,
+                id_autor=id_autor,
+            ))
         return nuevo_material
 
+    @transactional
     def update_material(self, material_id: int, titulo: str = None, 
                        descripcion: str = None, año_publicacion: int = None):
         """Actualiza un material existente"""
@@ -52,15 +74,14 @@ class MaterialController:
         if año_publicacion is not None:
             material.año_publicacion = año_publicacion
 
-        self.session.commit()
         return material
 
+    @transactional
     def delete_material(self, material_id: int):
         """Elimina un material"""
         material = self.get_material_by_id(material_id)
         if material:
             self.session.delete(material)
-            self.session.commit()
             return True
         return False
 
@@ -71,3 +92,9 @@ class MaterialController:
     def get_all_idiomas(self):
         """Obtiene todos los idiomas"""
         return self.session.query(Idioma).all()
+
+    def get_idioma_nombre(self, id_idioma: int):
+        """Obtiene el nombre de un idioma desde la caché de referencias"""
+        if not id_idioma:
+            return None
+        return reference_cache.idioma_nombre(self.session, id_idioma)
@@ -1,20 +1,43 @@
-from sqlalchemy.orm import Session
+from sqlalchemy import delete, insert, select, update
+from sqlalchemy.orm import Session, joinedload, selectinload
 from model.models import Movimiento, Prestamo, Copia, Estado
+from model.cache import reference_cache
+from model.session import ConflictError, transactional
+from model.history import record_transitions
+from model.pagination import keyset_page
 from datetime import date
 
 
+# Relaciones que usan los listados; se cargan en la misma consulta para evitar N+1
+MOVIMIENTO_LISTADO = (
+    joinedload(Movimiento.copia_rel).joinedload(Copia.material),
+    joinedload(Movimiento.estado),
+    joinedload(Movimiento.usuario),
+)
+
+PRESTAMO_LISTADO = (
+    joinedload(Prestamo.copia).joinedload(Copia.material),
+    joinedload(Prestamo.usuario),
+    selectinload(Prestamo.multas),
+)
+
+
 class PrestamoController:
     def __init__(self, session: Session):
         self.session = session
     
     def get_movimientos_pendientes(self):
-        """Obtiene todos los movimientos pendientes (estado = 3 - reservado)"""
-        movimientos = self.session.query(Movimiento).filter_by(
-            id_estado=3
+        """Obtiene todos los movimientos pendientes (estado reservado)"""
+        id_reservado = reference_cache.estado_id(self.session, "reservado")
+        movimientos = self.session.query(Movimiento).options(
+            *MOVIMIENTO_LISTADO
+        ).filter_by(
+            id_estado=id_reservado
         ).order_by(Movimiento.fecha_solicitud.desc()).all()
         
         return movimientos
     
+    @transactional
     def aprobar_prestamo(self, id_movimiento: int):
         """
         Cambia el estado de reservado a prestado y crea un registro en la tabla Prestamo
@@ -27,6 +50,9 @@ class PrestamoController:
         if not movimiento:
             raise Exception("Movimiento no encontrado")
         
+        if movimiento.id_estado != reference_cache.estado_id(self.session, "reservado"):
+            raise ConflictError("La solicitud ya fue procesada por otro usuario.")
+        
         # Verificar que tenga una copia asociada
         if not movimiento.id_copia:
             raise Exception("El movimiento no tiene una copia asociada")
@@ -40,11 +66,9 @@ class PrestamoController:
             raise Exception("Copia no encontrada")
         
         # Buscar estado "prestado"
-        estado_prestado = self.session.query(Estado).filter_by(
-            nombre="prestado"
-        ).first()
+        id_prestado = reference_cache.estado_id(self.session, "prestado")
         
-        if not estado_prestado:
+        if not id_prestado:
             raise Exception("No se encontró el estado 'prestado'")
         
         # Obtener id_usuario del movimiento
@@ -63,17 +87,17 @@ class PrestamoController:
         )
         
         # Cambiar estado de la copia a "prestado"
-        copia.id_estado = estado_prestado.id_estado
+        copia.id_estado = id_prestado
         
-        # Actualizar el estado del movimiento a prestado (id_estado = estado_prestado.id_estado)
-        movimiento.id_estado = estado_prestado.id_estado
+        # Actualizar el estado del movimiento a prestado
+        movimiento.id_estado = id_prestado
         
         # Guardar cambios
         self.session.add(nuevo_prestamo)
-        self.session.commit()
         
         return nuevo_prestamo
     
+    @transactional
     def rechazar_solicitud(self, id_movimiento: int):
         """
         Rechaza una solicitud de préstamo, devuelve la copia a estado disponible
@@ -86,6 +110,9 @@ class PrestamoController:
         if not movimiento:
             raise Exception("Movimiento no encontrado")
         
+        if movimiento.id_estado != reference_cache.estado_id(self.session, "reservado"):
+            raise ConflictError("La solicitud ya fue procesada por otro usuario.")
+        
         # Buscar la copia
         if movimiento.id_copia:
             copia = self.session.query(Copia).filter_by(
@@ -94,26 +121,165 @@ class PrestamoController:
             
             if copia:
                 # Buscar estado "disponible"
-                estado_disponible = self.session.query(Estado).filter_by(
-                    nombre="disponible"
-                ).first()
+                id_disponible = reference_cache.estado_id(self.session, "disponible")
                 
-                if estado_disponible:
-                    copia.id_estado = estado_disponible.id_estado
+                if id_disponible:
+                    copia.id_estado = id_disponible
         
         # Eliminar o marcar el movimiento como rechazado
         # Por ahora lo eliminamos, pero podrías crear un estado "rechazado"
         self.session.delete(movimiento)
-        self.session.commit()
     
-    def get_prestamos_activos(self):
-        """Obtiene todos los préstamos activos"""
-        return self.session.query(Prestamo).filter_by(
-            estado="activo"
-        ).order_by(Prestamo.fecha_prestamo.desc()).all()
+    # ---------------------------
+    # Procesamiento por lotes
+    # ---------------------------
+    def aprobar_prestamos(self, ids_movimiento):
+        """
+        Aprueba varias solicitudes en una sola transacción.
+        Retorna (ids de movimientos aprobados, préstamos creados); las
+        solicitudes que ya no estaban pendientes se omiten.
+        """
+        procesados, ids_prestamo = self._aprobar_lote(list(ids_movimiento))
+        if not ids_prestamo:
+            return procesados, []
+
+        prestamos = self.session.query(Prestamo).options(
+            *PRESTAMO_LISTADO
+        ).filter(
+            Prestamo.id_prestamo.in_(ids_prestamo)
+        ).order_by(Prestamo.id_prestamo.desc()).all()
+        return procesados, prestamos
+
+    @transactional
+    def _aprobar_lote(self, ids_movimiento):
+        if not ids_movimiento:
+            return [], []
+
+        id_reservado = reference_cache.estado_id(self.session, "reservado")
+        id_prestado = reference_cache.estado_id(self.session, "prestado")
+
+        if not id_reservado or not id_prestado:
+            raise Exception("No se encontraron los estados 'reservado' y 'prestado'")
+
+        # FOR UPDATE bloquea las solicitudes hasta confirmar: un rechazo u otra
+        # aprobación simultánea espera y luego ya no las encuentra pendientes,
+        # así nadie libera y vuelve a pedir la copia entre esta lectura y el UPDATE
+        ids_copia = self.session.scalars(
+            select(Movimiento.id_copia)
+            .where(
+                Movimiento.id_movimiento.in_(ids_movimiento),
+                Movimiento.id_estado == id_reservado,
+                Movimiento.id_copia.is_not(None),
+                Movimiento.id_usuario.is_not(None),
+            )
+            .with_for_update()
+        ).all()
+        if not ids_copia:
+            return [], []
+
+        # Solo se prestan las copias que siguen reservadas; la condición evita
+        # pisar una copia que otra transacción ya cambió
+        ids_copia = self.session.scalars(
+            update(Copia)
+            .where(Copia.id_copia.in_(ids_copia), Copia.id_estado == id_reservado)
+            .values(id_estado=id_prestado, version=Copia.version + 1)
+            .returning(Copia.id_copia)
+            .execution_options(synchronize_session="fetch")
+        ).all()
+        if not ids_copia:
+            return [], []
+        record_transitions(self.session, ids_copia, id_reservado, id_prestado)
+
+        # Solo pasan las que siguen pendientes; la condición evita aprobar dos veces
+        aprobados = self.session.execute(
+            update(Movimiento)
+            .where(
+                Movimiento.id_movimiento.in_(ids_movimiento),
+                Movimiento.id_estado == id_reservado,
+                Movimiento.id_copia.in_(ids_copia),
+                Movimiento.id_usuario.is_not(None),
+            )
+            .values(id_estado=id_prestado, version=Movimiento.version + 1)
+            .returning(
+                Movimiento.id_movimiento,
+                Movimiento.id_copia,
+                Movimiento.id_usuario,
+                Movimiento.fecha_devolucion,
+            )
+            .execution_options(synchronize_session="fetch")
+        ).all()
+
+        if not aprobados:
+            return [], []
+
+        hoy = date.today()
+        ids_prestamo = self.session.scalars(
+            insert(Prestamo).returning(Prestamo.id_prestamo),
+            [
+                {
+                    "id_copia": fila.id_copia,
+                    "id_usuario": fila.id_usuario,
+                    "fecha_prestamo": hoy,
+                    "fecha_devolucion_prevista": fila.fecha_devolucion,
+                    "estado": "activo",
+                }
+                for fila in aprobados
+            ],
+        ).all()
+
+        return [fila.id_movimiento for fila in aprobados], ids_prestamo
+
+    @transactional
+    def rechazar_solicitudes(self, ids_movimiento):
+        """
+        Rechaza varias solicitudes en una sola transacción y libera sus copias.
+        Retorna los ids de los movimientos rechazados.
+        """
+        ids_movimiento = list(ids_movimiento)
+        if not ids_movimiento:
+            return []
+
+        id_reservado = reference_cache.estado_id(self.session, "reservado")
+        id_disponible = reference_cache.estado_id(self.session, "disponible")
+
+        if not id_reservado or not id_disponible:
+            raise Exception("No se encontraron los estados 'reservado' y 'disponible'")
+
+        rechazados = self.session.execute(
+            delete(Movimiento)
+            .where(
+                Movimiento.id_movimiento.in_(ids_movimiento),
+                Movimiento.id_estado == id_reservado,
+            )
+            .returning(Movimiento.id_movimiento, Movimiento.id_copia)
+            .execution_options(synchronize_session="fetch")
+        ).all()
+
+        ids_copia = [fila.id_copia for fila in rechazados if fila.id_copia]
+        if ids_copia:
+            # Solo se liberan las copias que seguían reservadas
+            ids_copia = self.session.scalars(
+                update(Copia)
+                .where(Copia.id_copia.in_(ids_copia), Copia.id_estado == id_reservado)
+                .values(id_estado=id_disponible, version=Copia.version + 1)
+                .returning(Copia.id_copia)
+                .execution_options(synchronize_session="fetch")
+            ).all()
+            record_transitions(self.session, ids_copia, id_reservado, id_disponible)
+
+        return [fila.id_movimiento for fila in rechazados]
+
+    def get_prestamos_activos(self, after_id: int = None, limit: int = None):
+        """Obtiene los préstamos activos, más recientes primero, paginados por llave"""
+        query = self.session.query(Prestamo).options(
+            *PRESTAMO_LISTADO
+        ).filter_by(estado="activo")
+        return keyset_page(query, Prestamo.id_prestamo, after_id, limit, descending=True)
     
     def get_all_prestamos(self):
         """Obtiene todos los préstamos"""
-        return self.session.query(Prestamo).order_by(
+        return self.session.query(Prestamo).options(
+            *PRESTAMO_LISTADO
+        ).order_by(
             Prestamo.fecha_prestamo.desc()
         ).all()
@@ -1,26 +1,41 @@
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, joinedload
 from model.models import Reserva, Copia, Estado
+from model.cache import reference_cache
+from model.session import ConflictError, check_version, transactional
+from model.pagination import keyset_page
+from model.allocation import assign_copy_to_queue, release_assigned_copy
 from datetime import datetime
 
 
+# Relaciones que usan los listados; se cargan en la misma consulta para evitar N+1
+RESERVA_LISTADO = (
+    joinedload(Reserva.material),
+    joinedload(Reserva.copia),
+    joinedload(Reserva.usuario),
+)
+
+
 class ReservaController:
     def __init__(self, session: Session):
         self.session = session
     
     def get_reservas_activas(self):
         """Obtiene todas las reservas activas"""
-        return self.session.query(Reserva).filter_by(
+        return self.session.query(Reserva).options(
+            *RESERVA_LISTADO
+        ).filter_by(
             estado="activa"
         ).order_by(Reserva.fecha_reserva.desc()).all()
     
-    def get_all_reservas(self):
-        """Obtiene todas las reservas"""
-        return self.session.query(Reserva).order_by(
-            Reserva.fecha_reserva.desc()
-        ).all()
+    def get_all_reservas(self, after_id: int = None, limit: int = None):
+        """Obtiene todas las reservas, más recientes primero, paginadas por llave"""
+        return keyset_page(
+            self.session.query(Reserva).options(*RESERVA_LISTADO),
+            Reserva.id_reserva, after_id, limit, descending=True
+        )
     
-    def cancelar_reserva(self, id_reserva: int):
-        """Cancela una reserva"""
+    def _reserva_activa(self, id_reserva: int, version: int = None):
+        """Lee la reserva y verifica que siga activa y sin cambios desde que se mostró"""
         reserva = self.session.query(Reserva).filter_by(
             id_reserva=id_reserva
         ).first()
@@ -28,46 +43,51 @@ class ReservaController:
         if not reserva:
             raise Exception("Reserva no encontrada")
         
-        reserva.estado = "cancelada"
-        self.session.commit()
+        if reserva.estado != "activa":
+            raise ConflictError("La reserva ya no está activa.")
         
+        check_version(reserva, version)
         return reserva
     
-    def completar_reserva(self, id_reserva: int):
-        """Marca una reserva como completada (el usuario recogió el libro)"""
-        reserva = self.session.query(Reserva).filter_by(
-            id_reserva=id_reserva
-        ).first()
+    @transactional
+    def cancelar_reserva(self, id_reserva: int, version: int = None):
+        """Cancela una reserva activa (`version`: la que se mostró en la tabla)"""
+        reserva = self._reserva_activa(id_reserva, version)
         
-        if not reserva:
-            raise Exception("Reserva no encontrada")
+        reserva.estado = "cancelada"
+        
+        # Si ya tenía una copia apartada, pasa a la siguiente reserva o queda disponible
+        id_disponible = reference_cache.estado_id(self.session, "disponible")
+        id_reservado = reference_cache.estado_id(self.session, "reservado")
+        
+        if id_disponible and id_reservado:
+            release_assigned_copy(self.session, reserva, id_reservado, id_disponible)
+        
+        return reserva
+    
+    @transactional
+    def completar_reserva(self, id_reserva: int, version: int = None):
+        """Marca una reserva activa como completada (el usuario recogió el libro)"""
+        reserva = self._reserva_activa(id_reserva, version)
         
         reserva.estado = "completada"
-        self.session.commit()
         
         return reserva
     
+    @transactional
     def liberar_copia_para_reserva(self, id_copia: int):
         """
-        Cuando una copia es devuelta, verifica si hay reservas activas
-        y notifica al primer usuario en la lista
+        Cuando una copia es devuelta, la asigna a la primera reserva en la
+        cola de su material (cualquier copia sirve) y la deja reservada
         """
-        # Buscar reservas activas para esta copia
-        reserva = self.session.query(Reserva).filter_by(
-            id_copia=id_copia,
-            estado="activa"
-        ).order_by(Reserva.fecha_reserva.asc()).first()
+        copia = self.session.get(Copia, id_copia)
+        
+        if not copia:
+            raise Exception("Copia no encontrada")
+        
+        id_reservado = reference_cache.estado_id(self.session, "reservado")
         
-        if reserva:
-            # Cambiar estado de la copia a "reservado" para el usuario
-            estado_reservado = self.session.query(Estado).filter_by(
-                nombre="reservado"
-            ).first()
-            
-            if estado_reservado and reserva.copia:
-                reserva.copia.id_estado = estado_reservado.id_estado
-                self.session.commit()
-                
-            return reserva
+        if not id_reservado:
+            raise Exception("No se encontró el estado 'reservado'")
         
-        return None
+        return assign_copy_to_queue(self.session, copia, id_reservado)
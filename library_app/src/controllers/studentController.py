@@ -1,5 +1,16 @@
-from sqlalchemy.orm import Session
-from model.models import Copia, Material, Prestamo, Reserva, Estado, Movimiento, Multa
+from sqlalchemy import case, func, or_
+from sqlalchemy.orm import Session, joinedload, selectinload
+from model.models import (
+    Copia, Material, MaterialAutor, Autor, Prestamo, Reserva, Estado, Movimiento, Multa
+)
+from model.allocation import (
+    assign_copy_to_queue, claim_copy, next_queue_position, queue_length, queue_positions,
+    release_assigned_copy
+)
+from model.cache import blocked_users, reference_cache
+from model.fines import monto_multa
+from model.search import material_search
+from model.session import ConflictError, transactional
 from datetime import date, timedelta
 
 
@@ -13,151 +24,147 @@ class StudentController:
     
     def get_available_materials(self):
         """Obtiene todos los materiales con copias disponibles"""
-        estado_disponible = self.session.query(Estado).filter_by(nombre="disponible").first()
-        
-        if not estado_disponible:
-            return []
-        
-        materiales = self.session.query(Material).all()
-        materiales_disponibles = []
-        
-        for material in materiales:
-            copias_count = self.count_available_copies(material.id_material)
-            if copias_count > 0:
-                materiales_disponibles.append({
-                    'material': material,
-                    'copias_disponibles': copias_count
-                })
-        
-        return materiales_disponibles
+        query, conteos = self._catalog_query()
+        filas = query.filter(conteos.c.copias_disponibles > 0).all()
+        
+        return [
+            {
+                'material': material,
+                'copias_disponibles': disponibles,
+                'autores': autores or ""
+            }
+            for material, disponibles, _, autores in filas
+        ]
 
     def search_available_materials(self, search_text: str):
-        """Busca materiales disponibles por título"""
-        estado_disponible = self.session.query(Estado).filter_by(nombre="disponible").first()
-        
-        if not estado_disponible:
-            return []
-        
-        materiales = self.session.query(Material).filter(
-            Material.titulo.ilike(f"%{search_text}%")
-        ).all()
-        
-        materiales_disponibles = []
-        
-        for material in materiales:
-            copias_count = self.count_available_copies(material.id_material)
-            if copias_count > 0:
-                materiales_disponibles.append({
-                    'material': material,
-                    'copias_disponibles': copias_count
-                })
-        
-        return materiales_disponibles
+        """Busca materiales disponibles por título, autor o ISBN"""
+        query, conteos = self._catalog_query(search_text)
+        filas = query.filter(conteos.c.copias_disponibles > 0).all()
+        
+        return [
+            {
+                'material': material,
+                'copias_disponibles': disponibles,
+                'autores': autores or ""
+            }
+            for material, disponibles, _, autores in filas
+        ]
 
     def count_available_copies(self, id_material: int):
         """Cuenta las copias disponibles de un material"""
-        estado_disponible = self.session.query(Estado).filter_by(nombre="disponible").first()
+        id_disponible = reference_cache.estado_id(self.session, "disponible")
         
-        if not estado_disponible:
+        if not id_disponible:
             return 0
         
         return self.session.query(Copia).filter_by(
             id_material=id_material,
-            id_estado=estado_disponible.id_estado
+            id_estado=id_disponible
         ).count()
 
     def get_material_authors(self, material: Material):
         """Obtiene los autores de un material"""
         return ", ".join([ma.autor.nombre for ma in material.autores])
     
-    def get_all_materials_with_copies(self):
-        """Obtiene todos los materiales con copias disponibles y prestadas"""
-        estado_disponible = self.session.query(Estado).filter_by(nombre="disponible").first()
-        estado_prestado = self.session.query(Estado).filter_by(nombre="prestado").first()
+    def _catalog_query(self, search_text: str = None):
+        """
+        Consulta agregada del catálogo: material, copias disponibles,
+        copias prestadas y autores en una sola ida a la base de datos.
+        Retorna la consulta y la subconsulta de conteos para filtrar.
+        """
+        copias = (
+            self.session.query(
+                Copia.id_material.label("id_material"),
+                func.count(case((Estado.nombre == "disponible", 1))).label("copias_disponibles"),
+                func.count(case((Estado.nombre == "prestado", 1))).label("copias_prestadas"),
+            )
+            .join(Estado, Copia.id_estado == Estado.id_estado)
+            .group_by(Copia.id_material)
+            .subquery()
+        )
+        autores = (
+            self.session.query(
+                MaterialAutor.id_material.label("id_material"),
+                func.aggregate_strings(Autor.nombre, ", ").label("autores"),
+            )
+            .join(Autor, MaterialAutor.id_autor == Autor.id_autor)
+            .group_by(MaterialAutor.id_material)
+            .subquery()
+        )
+        query = (
+            self.session.query(
+                Material,
+                copias.c.copias_disponibles,
+                copias.c.copias_prestadas,
+                autores.c.autores,
+            )
+            .join(copias, copias.c.id_material == Material.id_material)
+            .outerjoin(autores, autores.c.id_material == Material.id_material)
+        )
         
-        if not estado_disponible or not estado_prestado:
-            return []
+        if search_text and search_text.strip():
+            busqueda = material_search.ranking(self.session, search_text)
+            query = (
+                query.join(busqueda, busqueda.c.id_material == Material.id_material)
+                .order_by(busqueda.c.rank.desc(), Material.id_material)
+            )
+        else:
+            query = query.order_by(Material.id_material)
         
-        materiales = self.session.query(Material).all()
-        materiales_con_copias = []
+        return query, copias
+
+    def _materials_with_copies(self, search_text: str = None):
+        """Materiales con al menos una copia disponible o prestada"""
+        query, conteos = self._catalog_query(search_text)
+        filas = query.filter(
+            or_(
+                conteos.c.copias_disponibles > 0,
+                conteos.c.copias_prestadas > 0
+            )
+        ).all()
         
-        for material in materiales:
-            copias_disponibles = self.session.query(Copia).filter_by(
-                id_material=material.id_material,
-                id_estado=estado_disponible.id_estado
-            ).count()
-            
-            copias_prestadas = self.session.query(Copia).filter_by(
-                id_material=material.id_material,
-                id_estado=estado_prestado.id_estado
-            ).count()
-            
-            if copias_disponibles > 0 or copias_prestadas > 0:
-                materiales_con_copias.append({
-                    'material': material,
-                    'copias_disponibles': copias_disponibles,
-                    'copias_prestadas': copias_prestadas
-                })
-        
-        return materiales_con_copias
+        return [
+            {
+                'material': material,
+                'copias_disponibles': disponibles,
+                'copias_prestadas': prestadas,
+                'autores': autores or ""
+            }
+            for material, disponibles, prestadas, autores in filas
+        ]
+    
+    def get_all_materials_with_copies(self):
+        """Obtiene todos los materiales con copias disponibles y prestadas"""
+        return self._materials_with_copies()
     
     def search_materials_with_copies(self, search_text: str):
-        """Busca materiales por título mostrando disponibles y prestadas"""
-        estado_disponible = self.session.query(Estado).filter_by(nombre="disponible").first()
-        estado_prestado = self.session.query(Estado).filter_by(nombre="prestado").first()
-        
-        if not estado_disponible or not estado_prestado:
-            return []
-        
-        materiales = self.session.query(Material).filter(
-            Material.titulo.ilike(f"%{search_text}%")
-        ).all()
-        
-        materiales_con_copias = []
-        
-        for material in materiales:
-            copias_disponibles = self.session.query(Copia).filter_by(
-                id_material=material.id_material,
-                id_estado=estado_disponible.id_estado
-            ).count()
-            
-            copias_prestadas = self.session.query(Copia).filter_by(
-                id_material=material.id_material,
-                id_estado=estado_prestado.id_estado
-            ).count()
-            
-            if copias_disponibles > 0 or copias_prestadas > 0:
-                materiales_con_copias.append({
-                    'material': material,
-                    'copias_disponibles': copias_disponibles,
-                    'copias_prestadas': copias_prestadas
-                })
-        
-        return materiales_con_copias
+        """Busca materiales por título, autor o ISBN mostrando disponibles y prestadas"""
+        return self._materials_with_copies(search_text)
     
+    @transactional
     def create_reservation(self, id_material: int, id_usuario: int):
-        """Crea una reserva de una copia prestada"""
+        """Agrega al usuario a la cola de reservas del material"""
         # Verificar si el usuario tiene multas pendientes
         if self.tiene_multas_pendientes(id_usuario):
             raise Exception("No puedes crear reservas. Tienes multas pendientes por pagar.")
         
-        # Buscar una copia prestada
-        estado_prestado = self.session.query(Estado).filter_by(nombre="prestado").first()
+        # Solo se reserva un material con copias prestadas
+        id_prestado = reference_cache.estado_id(self.session, "prestado")
         
-        if not estado_prestado:
+        if not id_prestado:
             raise Exception("No se encontró el estado 'prestado'")
         
-        copia = self.session.query(Copia).filter_by(
+        prestada = self.session.query(Copia.id_copia).filter_by(
             id_material=id_material,
-            id_estado=estado_prestado.id_estado
+            id_estado=id_prestado
         ).first()
         
-        if not copia:
+        if not prestada:
             raise Exception("No hay copias prestadas para reservar")
         
-        # Verificar si el usuario ya tiene una reserva activa para esta copia
-        reserva_existente = self.session.query(Reserva).filter_by(
-            id_copia=copia.id_copia,
+        # Verificar si el usuario ya tiene una reserva activa para este material
+        reserva_existente = self.session.query(Reserva.id_reserva).filter_by(
+            id_material=id_material,
             id_usuario=id_usuario,
             estado="activa"
         ).first()
@@ -165,60 +172,53 @@ class StudentController:
         if reserva_existente:
             raise Exception("Ya tienes una reserva activa para este material")
         
-        # Crear la reserva
+        # Crear la reserva al final de la cola; la copia se asigna al devolverse una
         nueva_reserva = Reserva(
-            id_copia=copia.id_copia,
+            id_material=id_material,
             id_usuario=id_usuario,
-            estado="activa"
+            estado="activa",
+            posicion=next_queue_position(self.session, id_material)
         )
         
         self.session.add(nueva_reserva)
-        self.session.commit()
         
         return nueva_reserva
 
+    @transactional
     def request_loan(self, id_material: int, id_usuario: int, dias: int):
         """Crea una solicitud de préstamo con estado reservado"""
         # Verificar si el usuario tiene multas pendientes
         if self.tiene_multas_pendientes(id_usuario):
             raise Exception("No puedes solicitar préstamos. Tienes multas pendientes por pagar.")
         
-        # Buscar una copia disponible
-        estado_disponible = self.session.query(Estado).filter_by(nombre="disponible").first()
+        id_disponible = reference_cache.estado_id(self.session, "disponible")
+        id_reservado = reference_cache.estado_id(self.session, "reservado")
         
-        if not estado_disponible:
+        if not id_disponible:
             raise Exception("No se encontró el estado 'disponible'")
         
-        copia = self.session.query(Copia).filter_by(
-            id_material=id_material,
-            id_estado=estado_disponible.id_estado
-        ).first()
-        
-        if not copia:
-            raise Exception("No hay copias disponibles")
+        if not id_reservado:
+            raise Exception("No se encontró el estado 'reservado'")
         
-        # Cambiar estado de la copia a "reservado"
-        estado_reservado = self.session.query(Estado).filter_by(nombre="reservado").first()
+        # Tomar una copia disponible y marcarla "reservado" en una sola sentencia
+        id_copia = claim_copy(self.session, id_material, id_disponible, id_reservado)
         
-        if not estado_reservado:
-            raise Exception("No se encontró el estado 'reservado'")
+        if not id_copia:
+            raise Exception("No hay copias disponibles")
         
         # Calcular fecha de devolución
         fecha_devolucion = date.today() + timedelta(days=dias)
         
-        # Crear movimiento con estado por defecto id = 3
+        # Crear movimiento con estado reservado
         nuevo_movimiento = Movimiento(
-            id_copia=copia.id_copia,
+            id_copia=id_copia,
             id_usuario=id_usuario,
-            id_estado=3,
+            id_estado=id_reservado,
             fecha_devolucion=fecha_devolucion,
             detalle=f"Solicitud de préstamo de usuario {id_usuario} por {dias} días"
         )
         
-        copia.id_estado = estado_reservado.id_estado
-        
         self.session.add(nuevo_movimiento)
-        self.session.commit()
         
         return nuevo_movimiento
 
@@ -228,12 +228,29 @@ class StudentController:
     
     def get_user_loans(self, id_usuario: int):
         """Obtiene todos los préstamos de un usuario"""
-        return self.session.query(Prestamo).filter_by(
+        return self.session.query(Prestamo).options(
+            joinedload(Prestamo.copia).joinedload(Copia.material),
+            selectinload(Prestamo.multas),
+        ).filter_by(
             id_usuario=id_usuario
         ).order_by(Prestamo.fecha_prestamo.desc()).all()
 
+    @transactional
     def return_loan(self, prestamo: Prestamo):
-        """Procesa la devolución de un préstamo"""
+        """
+        Procesa la devolución de un préstamo en una sola transacción: cierra el
+        préstamo, genera la multa si hay retraso y, si alguien espera el material,
+        deja la copia reservada para la primera reserva de la cola
+        """
+        if prestamo.estado != "activo":
+            raise ConflictError("El préstamo ya fue devuelto.")
+        
+        id_disponible = reference_cache.estado_id(self.session, "disponible")
+        id_reservado = reference_cache.estado_id(self.session, "reservado")
+        
+        if not id_disponible or not id_reservado:
+            raise Exception("No se encontraron los estados 'disponible' y 'reservado'")
+        
         # Cambiar estado del préstamo
         prestamo.estado = "devuelto"
         prestamo.fecha_devolucion_real = date.today()
@@ -245,29 +262,33 @@ class StudentController:
             # Calcular monto de multa según tabla de valores
             monto_multa = self.calcular_multa(dias_retraso)
             
-          
-            # Crear registro de multa en la tabla Multa
-            nueva_multa = Multa(
-                id_prestamo=prestamo.id_prestamo,
-                id_copia=prestamo.id_copia,
-                id_usuario=prestamo.id_usuario,
-                dias_atraso=dias_retraso,
-                monto=monto_multa,
-                estado_pago='pendiente'
-            )
+            # El job de multas pudo haberla creado ya: se actualiza la misma fila
+            multa = next((m for m in prestamo.multas if m.estado_pago == 'pendiente'), None)
             
-            self.session.add(nueva_multa)
-        
-        # Cambiar estado de la copia a disponible
-        estado_disponible = self.session.query(Estado).filter_by(nombre="disponible").first()
-        
-        if estado_disponible:
-            prestamo.copia.id_estado = estado_disponible.id_estado
-        
-        self.session.commit()
+            if multa:
+                multa.dias_atraso = dias_retraso
+                multa.monto = monto_multa
+            elif not prestamo.multas:
+                # Crear registro de multa en la tabla Multa
+                self.session.add(Multa(
+                    id_prestamo=prestamo.id_prestamo,
+                    id_copia=prestamo.id_copia,
+                    id_usuario=prestamo.id_usuario,
+                    dias_atraso=dias_retraso,
+                    monto=monto_multa,
+                    estado_pago='pendiente'
+                ))
+        
+        # La copia pasa a la cabeza de la cola del material o vuelve a estar disponible
+        if not assign_copy_to_queue(self.session, prestamo.copia, id_reservado):
+            prestamo.copia.id_estado = id_disponible
         
         return prestamo
     
+    def monto_multas_pendientes(self, prestamo: Prestamo) -> float:
+        """Suma las multas pendientes de un préstamo (usa las multas ya cargadas)"""
+        return sum(float(multa.monto) for multa in prestamo.multas if multa.estado_pago == 'pendiente')
+    
     def calcular_multa(self, dias_atraso: int) -> float:
         """
         Calcula el monto de la multa según los días de atraso
@@ -275,23 +296,11 @@ class StudentController:
         2º al 7º día: 2500 COP
         8º día en adelante: 2500 + 100 COP por cada día adicional
         """
-        if dias_atraso == 1:
-            return 1000.0
-        elif 2 <= dias_atraso <= 7:
-            return 2500.0
-        else:  # 8 días o más
-            # 2500 base + 100 por cada día después del 7mo
-            dias_adicionales = dias_atraso - 7
-            return 2500.0 + (dias_adicionales * 100.0)
+        return monto_multa(dias_atraso)
     
     def tiene_multas_pendientes(self, id_usuario: int) -> bool:
         """Verifica si el usuario tiene multas pendientes sin pagar"""
-        multas_pendientes = self.session.query(Multa).filter_by(
-            id_usuario=id_usuario,
-            estado_pago='pendiente'
-        ).count()
-        
-        return multas_pendientes > 0
+        return blocked_users.is_blocked(self.session, id_usuario)
 
     # ========================================
     # MÉTODOS PARA RESERVAS
@@ -299,22 +308,34 @@ class StudentController:
     
     def get_user_reservations(self, id_usuario: int):
         """Obtiene todas las reservas de un usuario"""
-        return self.session.query(Reserva).filter_by(
+        return self.session.query(Reserva).options(
+            joinedload(Reserva.material),
+            joinedload(Reserva.copia),
+        ).filter_by(
             id_usuario=id_usuario
         ).order_by(Reserva.fecha_reserva.desc()).all()
 
+    def get_queue_positions(self, id_usuario: int):
+        """Puesto en la cola de cada reserva en espera del usuario, por id_reserva"""
+        return queue_positions(self.session, id_usuario)
+
+    def get_queue_length(self, id_material: int) -> int:
+        """Cantidad de reservas esperando una copia del material"""
+        return queue_length(self.session, id_material)
+
+    @transactional
     def cancel_reservation(self, reserva: Reserva):
-        """Cancela una reserva"""
-        reserva.estado = "cancelada"
+        """Cancela una reserva activa"""
+        if reserva.estado != "activa":
+            raise ConflictError("La reserva ya no está activa.")
         
-        # Liberar la copia si estaba reservada
-        estado_disponible = self.session.query(Estado).filter_by(nombre="disponible").first()
-        estado_reservado = self.session.query(Estado).filter_by(nombre="reservado").first()
+        reserva.estado = "cancelada"
         
-        if estado_disponible and estado_reservado:
-            if reserva.copia.id_estado == estado_reservado.id_estado:
-                reserva.copia.id_estado = estado_disponible.id_estado
+        # Si ya tenía una copia apartada, pasa a la siguiente reserva o queda disponible
+        id_disponible = reference_cache.estado_id(self.session, "disponible")
+        id_reservado = reference_cache.estado_id(self.session, "reservado")
         
-        self.session.commit()
+        if id_disponible and id_reservado:
+            release_assigned_copy(self.session, reserva, id_reservado, id_disponible)
         
         return reserva
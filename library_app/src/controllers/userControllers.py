@@ -1,14 +1,19 @@
 from sqlalchemy.orm import Session
 from model.usuario import Usuario
+from model.session import transactional
+from model import passwords
+from model.pagination import keyset_page
 
 
 class UserController:
     def __init__(self, session: Session):
         self.session = session
 
-    def get_all_user(self):
-        """Obtiene todos los usuarios"""
-        return self.session.query(Usuario).all()
+    def get_all_user(self, after_id: int = None, limit: int = None):
+        """Obtiene los usuarios ordenados por ID, paginados por llave si se indica `limit`"""
+        return keyset_page(
+            self.session.query(Usuario), Usuario.id_usuario, after_id, limit
+        )
 
     def search_user(self, search_text: str):
         """Buscar usuario por nombre o correo"""
@@ -38,16 +43,17 @@ class UserController:
     #Busqueda de usuarios
     def create_user(self, nombre: str, correo: str, password: str = None):
         """Crea un nuevo usuario"""
-        nuevo_usuario = Usuario(nombre=nombre,correo=correo)
-
-        if password:
-            nuevo_usuario.set_password(password)
+        password_hash = passwords.hash_password(password) if password else None
+        return self._insert_user(nombre, correo, password_hash)
 
+    @transactional
+    def _insert_user(self, nombre: str, correo: str, password_hash: str = None):
+        nuevo_usuario = Usuario(nombre=nombre, correo=correo, password_hash=password_hash)
         self.session.add(nuevo_usuario)
-        self.session.commit()
         return nuevo_usuario
 
     #Modificar usuarios
+    @transactional
     def update_user(self, user_id: int, nombre: str = None, correo: str = None):
         """Actualiza un usuario existente"""
         usuario = self.get_user_by_id(user_id)
@@ -59,16 +65,15 @@ class UserController:
         if correo is not None:
             usuario.correo = correo
 
-        self.session.commit()
         return usuario
     
     #Eliminacion de usuarioo
+    @transactional
     def delete_user(self, user_id: int):
         """Elimina un usuario"""
         usuario = self.get_user_by_id(user_id)
         if usuario:
             self.session.delete(usuario)
-            self.session.commit()
             return True
             
         return False
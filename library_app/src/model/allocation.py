@@ -0,0 +1,154 @@
+from sqlalchemy import func, select, update
+from sqlalchemy.orm import Session
+
+from model.history import record_transitions
+from model.models import Copia, Reserva
+
+
+def claim_copy(session: Session, id_material: int, id_estado_origen: int, id_estado_destino: int):
+    """
+    Toma de forma atómica una copia del material que esté en `id_estado_origen`
+    y la pasa a `id_estado_destino`. Retorna el id de la copia o None si no hay.
+
+    En PostgreSQL la copia candidata se elige con FOR UPDATE SKIP LOCKED: dos
+    solicitudes simultáneas nunca obtienen la misma copia y ninguna espera a la
+    otra, cada una salta a la siguiente copia libre. La condición sobre el
+    estado en el UPDATE descarta además cualquier copia que otro proceso haya
+    cambiado entre la selección y la actualización, y se incrementa la versión
+    para que las sesiones con la copia ya cargada detecten el cambio.
+    """
+    candidata = (
+        select(Copia.id_copia)
+        .where(
+            Copia.id_material == id_material,
+            Copia.id_estado == id_estado_origen,
+        )
+        .order_by(Copia.id_copia)
+        .limit(1)
+        .with_for_update(skip_locked=True)
+        .scalar_subquery()
+    )
+
+    stmt = (
+        update(Copia)
+        .where(
+            Copia.id_copia == candidata,
+            Copia.id_estado == id_estado_origen,
+        )
+        .values(id_estado=id_estado_destino, version=Copia.version + 1)
+        .returning(Copia.id_copia)
+        .execution_options(synchronize_session="fetch")
+    )
+
+    id_copia = session.execute(stmt).scalar_one_or_none()
+    if id_copia:
+        record_transitions(session, [id_copia], id_estado_origen, id_estado_destino)
+    return id_copia
+
+
+# ---------------------------
+# Cola de reservas por material
+# ---------------------------
+def _en_espera(id_material: int):
+    """Condición de la cola: reservas activas del material que aún no tienen copia"""
+    return (
+        Reserva.id_material == id_material,
+        Reserva.estado == "activa",
+        Reserva.id_copia.is_(None),
+    )
+
+
+def next_queue_position(session: Session, id_material: int) -> int:
+    """Posición para una reserva nueva: una más que la última activa del material"""
+    ultima = session.query(func.max(Reserva.posicion)).filter(
+        Reserva.id_material == id_material,
+        Reserva.estado == "activa",
+    ).scalar()
+    return (ultima or 0) + 1
+
+
+def queue_length(session: Session, id_material: int) -> int:
+    return session.query(func.count(Reserva.id_reserva)).filter(*_en_espera(id_material)).scalar()
+
+
+def head_of_queue(session: Session, id_material: int):
+    """
+    Reserva en la cabeza de la cola del material, o None si está vacía.
+    Recorre idx_reserva_cola (id_material, estado, posicion), así que no
+    depende del largo de la cola; SKIP LOCKED hace que dos devoluciones
+    simultáneas atiendan a reservas distintas.
+    """
+    return (
+        session.query(Reserva)
+        .filter(*_en_espera(id_material))
+        .order_by(Reserva.posicion, Reserva.id_reserva)
+        .with_for_update(skip_locked=True)
+        .first()
+    )
+
+
+def assign_copy_to_queue(session: Session, copia: Copia, id_estado_reservado: int):
+    """
+    Asigna la copia (cualquier copia del material) a la cabeza de la cola y la
+    deja en estado reservado. Retorna la reserva atendida o None si nadie espera.
+    """
+    reserva = head_of_queue(session, copia.id_material)
+    if reserva:
+        reserva.id_copia = copia.id_copia
+        copia.id_estado = id_estado_reservado
+    return reserva
+
+
+def release_assigned_copy(session: Session, reserva: Reserva, id_estado_reservado: int, id_estado_disponible: int):
+    """
+    Si la reserva tenía una copia apartada, la suelta y la pasa a la siguiente
+    de la cola o, si nadie espera, la deja disponible. Retorna la reserva que
+    la recibe. La copia solo se entrega si sigue reservada y ninguna otra
+    reserva activa la tiene: así una cancelación repetida no la asigna dos veces.
+    """
+    copia = reserva.copia
+    reserva.copia = None
+    if copia is None or copia.id_estado != id_estado_reservado:
+        return None
+
+    otra = session.query(Reserva.id_reserva).filter(
+        Reserva.id_copia == copia.id_copia,
+        Reserva.estado == "activa",
+        Reserva.id_reserva != reserva.id_reserva,
+    ).first()
+    if otra:
+        return None
+
+    siguiente = assign_copy_to_queue(session, copia, id_estado_reservado)
+    if not siguiente:
+        copia.id_estado = id_estado_disponible
+    return siguiente
+
+
+def queue_positions(session: Session, id_usuario: int) -> dict:
+    """Puesto actual (1 = siguiente) de cada reserva en espera del usuario, por id_reserva"""
+    materiales = select(Reserva.id_material).where(
+        Reserva.id_usuario == id_usuario,
+        Reserva.estado == "activa",
+        Reserva.id_copia.is_(None),
+    )
+    cola = (
+        select(
+            Reserva.id_reserva,
+            Reserva.id_usuario,
+            func.row_number().over(
+                partition_by=Reserva.id_material,
+                order_by=(Reserva.posicion, Reserva.id_reserva),
+            ).label("puesto"),
+        )
+        .where(
+            Reserva.id_material.in_(materiales),
+            Reserva.estado == "activa",
+            Reserva.id_copia.is_(None),
+        )
+        .subquery()
+    )
+    filas = session.execute(
+        select(cola.c.id_reserva, cola.c.puesto).where(cola.c.id_usuario == id_usuario)
+    )
+    return {id_reserva: puesto for id_reserva, puesto in filas}
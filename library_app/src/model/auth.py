@@ -0,0 +1,155 @@
+import base64
+import hashlib
+import hmac
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from dotenv import load_dotenv
+
+
+load_dotenv()
+
+# Secreto para firmar tokens de sesión; si no se define, los tokens quedan deshabilitados
+SESSION_SECRET = os.getenv("SESSION_SECRET")
+SESSION_TOKEN_TTL = int(os.getenv("SESSION_TOKEN_TTL", "900"))
+
+# Intentos fallidos permitidos por usuario (desde una IP) y por IP dentro de la ventana (en segundos)
+LOGIN_MAX_FAILURES = int(os.getenv("LOGIN_MAX_FAILURES", "5"))
+LOGIN_MAX_FAILURES_PER_IP = int(os.getenv("LOGIN_MAX_FAILURES_PER_IP", "20"))
+LOGIN_FAILURE_WINDOW = int(os.getenv("LOGIN_FAILURE_WINDOW", "300"))
+
+
+class SessionTokens:
+    """
+    Tokens de sesión firmados con HMAC-SHA256 y de corta duración.
+    Permiten que una pestaña que se reconecta recupere la sesión sin volver
+    a verificar la contraseña con bcrypt. Incluyen una huella del hash de la
+    contraseña, así que cambiarla invalida los tokens emitidos.
+    """
+
+    def __init__(self, secret: str = None, ttl: int = SESSION_TOKEN_TTL):
+        self.secret = secret.encode('utf-8') if secret else None
+        self.ttl = ttl
+
+    @property
+    def enabled(self) -> bool:
+        return self.secret is not None
+
+    def _firmar(self, payload: bytes) -> str:
+        firma = hmac.new(self.secret, payload, hashlib.sha256).digest()
+        return base64.urlsafe_b64encode(firma).decode('ascii').rstrip("=")
+
+    @staticmethod
+    def _huella(password_hash: str) -> str:
+        return hashlib.sha256((password_hash or "").encode('utf-8')).hexdigest()[:16]
+
+    def issue(self, id_usuario: int, password_hash: str):
+        """Genera un token para el usuario, o None si los tokens están deshabilitados"""
+        if not self.enabled:
+            return None
+
+        expira = int(time.time()) + self.ttl
+        payload = f"{id_usuario}:{expira}:{self._huella(password_hash)}".encode('utf-8')
+        cuerpo = base64.urlsafe_b64encode(payload).decode('ascii').rstrip("=")
+        return f"{cuerpo}.{self._firmar(payload)}"
+
+    def verify(self, token: str):
+        """Retorna (id_usuario, huella) si el token es válido y no ha expirado, o None"""
+        if not self.enabled or not token or "." not in token:
+            return None
+
+        cuerpo, firma = token.rsplit(".", 1)
+        try:
+            payload = base64.urlsafe_b64decode(cuerpo + "=" * (-len(cuerpo) % 4))
+        except (ValueError, TypeError):
+            return None
+
+        if not hmac.compare_digest(self._firmar(payload), firma):
+            return None
+
+        try:
+            id_usuario, expira, huella = payload.decode('utf-8').split(":")
+            if int(expira) < time.time():
+                return None
+            return int(id_usuario), huella
+        except ValueError:
+            return None
+
+    def matches(self, huella: str, password_hash: str) -> bool:
+        return hmac.compare_digest(huella, self._huella(password_hash))
+
+
+class LoginRateLimiter:
+    """
+    Limita en memoria los intentos fallidos de inicio de sesión.
+
+    Los fallos se cuentan por (usuario, IP del cliente), así nadie puede
+    bloquear la cuenta de otro fallando a propósito desde su equipo, y por IP
+    con un límite mayor, para frenar a quien prueba muchos usuarios. Las
+    entradas vencidas se purgan y el número de claves en memoria está acotado.
+    """
+
+    # Claves (usuario, IP) o IP que se recuerdan como máximo; se descartan las menos recientes
+    MAX_CLAVES = 10000
+
+    def __init__(self, max_failures: int = LOGIN_MAX_FAILURES, window: int = LOGIN_FAILURE_WINDOW,
+                 max_failures_ip: int = LOGIN_MAX_FAILURES_PER_IP):
+        self.max_failures = max_failures
+        self.max_failures_ip = max_failures_ip
+        self.window = window
+        self._lock = threading.Lock()
+        self._fallos = OrderedDict()   # clave -> instantes de los fallos; la menos reciente primero
+        self._ultima_purga = time.monotonic()
+
+    def _vigentes(self, clave, ahora) -> int:
+        """Descarta los fallos fuera de la ventana y retorna cuántos quedan"""
+        fallos = self._fallos.get(clave)
+        if fallos is None:
+            return 0
+        while fallos and ahora - fallos[0] > self.window:
+            fallos.popleft()
+        if not fallos:
+            del self._fallos[clave]
+            return 0
+        return len(fallos)
+
+    def _purgar(self, ahora):
+        """Una vez por ventana elimina las claves sin fallos vigentes (usuarios inventados)"""
+        if ahora - self._ultima_purga < self.window:
+            return
+        for clave in list(self._fallos):
+            self._vigentes(clave, ahora)
+        self._ultima_purga = ahora
+
+    @staticmethod
+    def _claves(usuario: str, ip: str = None):
+        return [("usuario", usuario, ip)] + ([("ip", ip)] if ip else [])
+
+    def is_blocked(self, usuario: str, ip: str = None) -> bool:
+        with self._lock:
+            ahora = time.monotonic()
+            if self._vigentes(("usuario", usuario, ip), ahora) >= self.max_failures:
+                return True
+            return bool(ip) and self._vigentes(("ip", ip), ahora) >= self.max_failures_ip
+
+    def register_failure(self, usuario: str, ip: str = None):
+        with self._lock:
+            ahora = time.monotonic()
+            self._purgar(ahora)
+            for clave in self._claves(usuario, ip):
+                self._vigentes(clave, ahora)
+                fallos = self._fallos.setdefault(clave, deque(maxlen=max(self.max_failures, self.max_failures_ip)))
+                fallos.append(ahora)
+                self._fallos.move_to_end(clave)
+            while len(self._fallos) > self.MAX_CLAVES:
+                self._fallos.popitem(last=False)
+
+    def reset(self, usuario: str, ip: str = None):
+        """Tras un login correcto; el contador de la IP se mantiene"""
+        with self._lock:
+            self._fallos.pop(("usuario", usuario, ip), None)
+
+
+session_tokens = SessionTokens(SESSION_SECRET)
+login_rate_limiter = LoginRateLimiter()
@@ -0,0 +1,178 @@
+import threading
+import time
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from model.models import Estado, Rol, Idioma, Multa, SaldoMulta
+
+
+class ReferenceCache:
+    """
+    Caché en memoria de las tablas de referencia (estado, rol, idioma).
+    Se carga una sola vez por proceso y se invalida cuando una sesión
+    modifica alguna de estas tablas o cuando vence el TTL.
+    """
+
+    TABLAS = {
+        "estado": (Estado, "id_estado"),
+        "rol": (Rol, "id_rol"),
+        "idioma": (Idioma, "id_idioma"),
+    }
+
+    def __init__(self, ttl: float = 300.0):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._por_nombre = {}
+        self._por_id = {}
+        self._cargado_en = None
+
+    def _cargar(self, session: Session):
+        por_nombre = {}
+        por_id = {}
+        for tabla, (modelo, pk) in self.TABLAS.items():
+            filas = session.query(getattr(modelo, pk), modelo.nombre).all()
+            por_nombre[tabla] = {nombre: id_ for id_, nombre in filas}
+            por_id[tabla] = {id_: nombre for id_, nombre in filas}
+
+        self._por_nombre = por_nombre
+        self._por_id = por_id
+        self._cargado_en = time.monotonic()
+
+    def _vigente(self):
+        return (
+            self._cargado_en is not None
+            and time.monotonic() - self._cargado_en < self.ttl
+        )
+
+    def _tabla(self, session: Session, tabla: str, indice: str):
+        with self._lock:
+            if not self._vigente():
+                self._cargar(session)
+            return getattr(self, indice)[tabla]
+
+    def invalidate(self):
+        """Descarta los datos en memoria; se recargan en la siguiente consulta"""
+        with self._lock:
+            self._cargado_en = None
+
+    # ---- estado ----
+    def estado_id(self, session: Session, nombre: str):
+        return self._tabla(session, "estado", "_por_nombre").get(nombre)
+
+    def estado_nombre(self, session: Session, id_estado: int):
+        return self._tabla(session, "estado", "_por_id").get(id_estado)
+
+    # ---- rol ----
+    def rol_id(self, session: Session, nombre: str):
+        return self._tabla(session, "rol", "_por_nombre").get(nombre)
+
+    def rol_nombre(self, session: Session, id_rol: int):
+        return self._tabla(session, "rol", "_por_id").get(id_rol)
+
+    # ---- idioma ----
+    def idioma_id(self, session: Session, nombre: str):
+        return self._tabla(session, "idioma", "_por_nombre").get(nombre)
+
+    def idioma_nombre(self, session: Session, id_idioma: int):
+        return self._tabla(session, "idioma", "_por_id").get(id_idioma)
+
+    def idiomas(self, session: Session):
+        """Retorna {id_idioma: nombre} de todos los idiomas"""
+        return dict(self._tabla(session, "idioma", "_por_id"))
+
+
+reference_cache = ReferenceCache()
+
+
+_MODELOS_REFERENCIA = tuple(modelo for modelo, _ in ReferenceCache.TABLAS.values())
+
+
+@event.listens_for(Session, "after_flush")
+def _marcar_cambios_referencia(session, flush_context):
+    """Marca la sesión si se insertan, editan o eliminan filas de referencia"""
+    cambios = list(session.new) + list(session.dirty) + list(session.deleted)
+    if any(isinstance(obj, _MODELOS_REFERENCIA) for obj in cambios):
+        session.info["referencias_modificadas"] = True
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidar_referencias(session):
+    if session.info.pop("referencias_modificadas", False):
+        reference_cache.invalidate()
+
+
+@event.listens_for(Session, "after_rollback")
+def _descartar_marca_referencias(session):
+    session.info.pop("referencias_modificadas", None)
+
+
+class BlockedUsersCache:
+    """
+    Caché en memoria de qué usuarios tienen multas pendientes (bloqueados
+    para préstamos y reservas). En PostgreSQL la consulta es una búsqueda por
+    llave primaria en saldo_multa; se invalida al crear o pagar una multa
+    desde una sesión o cuando vence el TTL (cambios hechos por otros procesos).
+    """
+
+    def __init__(self, ttl: float = 60.0):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._bloqueados = {}
+
+    def _consultar(self, session: Session, id_usuario: int) -> bool:
+        if session.get_bind().dialect.name == "postgresql":
+            pendientes = session.query(SaldoMulta.multas_pendientes).filter(
+                SaldoMulta.id_usuario == id_usuario
+            ).scalar()
+        else:
+            # Sin el trigger de saldo_multa se cuenta directamente sobre multa
+            pendientes = session.query(Multa.id_multa).filter(
+                Multa.id_usuario == id_usuario,
+                Multa.estado_pago == 'pendiente'
+            ).limit(1).count()
+        return bool(pendientes and pendientes > 0)
+
+    def is_blocked(self, session: Session, id_usuario: int) -> bool:
+        with self._lock:
+            entrada = self._bloqueados.get(id_usuario)
+            if entrada and time.monotonic() - entrada[1] < self.ttl:
+                return entrada[0]
+
+        bloqueado = self._consultar(session, id_usuario)
+        with self._lock:
+            self._bloqueados[id_usuario] = (bloqueado, time.monotonic())
+        return bloqueado
+
+    def invalidate(self, ids_usuario=None):
+        """Descarta los usuarios indicados, o todos si no se indican"""
+        with self._lock:
+            if ids_usuario is None:
+                self._bloqueados.clear()
+            else:
+                for id_usuario in ids_usuario:
+                    self._bloqueados.pop(id_usuario, None)
+
+
+blocked_users = BlockedUsersCache()
+
+
+@event.listens_for(Session, "after_flush")
+def _marcar_cambios_multa(session, flush_context):
+    """Anota los usuarios cuyas multas se crearon, pagaron o eliminaron en la sesión"""
+    cambios = list(session.new) + list(session.dirty) + list(session.deleted)
+    usuarios = {obj.id_usuario for obj in cambios if isinstance(obj, Multa)}
+    if usuarios:
+        session.info.setdefault("usuarios_multa", set()).update(usuarios)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidar_bloqueados(session):
+    usuarios = session.info.pop("usuarios_multa", None)
+    if usuarios:
+        blocked_users.invalidate(usuarios)
+
+
+@event.listens_for(Session, "after_rollback")
+def _descartar_marca_multas(session):
+    session.info.pop("usuarios_multa", None)
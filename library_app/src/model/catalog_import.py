@@ -0,0 +1,295 @@
+import csv
+import json
+import os
+import time
+from itertools import islice
+
+from sqlalchemy import insert, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from model.cache import reference_cache
+from model.models import Autor, Copia, Idioma, Material, MaterialAutor
+
+
+# ---------------------------
+# Lectura de registros
+# ---------------------------
+# Campos MARC usados en las líneas JSON: 020 ISBN, 041 idioma, 100/700 autores,
+# 245 título, 260/264 año, 520 descripción, 852 ejemplares
+def _subcampo(valor, codigo="a"):
+    if isinstance(valor, dict):
+        return valor.get(codigo)
+    return valor
+
+
+def _lista(valor):
+    if valor is None:
+        return []
+    return valor if isinstance(valor, list) else [valor]
+
+
+def _anio(valor):
+    digitos = "".join(c for c in str(valor or "") if c.isdigit())
+    return int(digitos[:4]) if len(digitos) >= 4 else None
+
+
+def _registro_marc(linea: dict) -> dict:
+    autores = [_subcampo(a) for a in _lista(linea.get("100")) + _lista(linea.get("700"))]
+    return {
+        "titulo": _subcampo(linea.get("245")),
+        "descripcion": _subcampo(linea.get("520")),
+        "idioma": _subcampo(linea.get("041")),
+        "tipo_material": linea.get("tipo") or "Libro",
+        "año_publicacion": _anio(_subcampo(linea.get("264"), "c") or _subcampo(linea.get("260"), "c")),
+        "isbn": _subcampo(linea.get("020")),
+        "autores": autores,
+        "copias": [
+            {
+                "codigo_copia": _subcampo(e, "p"),
+                "ubicacion": _subcampo(e, "b"),
+                "coleccion": _subcampo(e, "c"),
+            }
+            for e in _lista(linea.get("852"))
+        ],
+    }
+
+
+def _registro_csv(fila: dict) -> dict:
+    """
+    Columnas: titulo, descripcion, idioma, tipo_material, año_publicacion, isbn,
+    autores y codigos_copia (separados por ';'), ubicacion, coleccion
+    """
+    def separar(valor):
+        return [v.strip() for v in (valor or "").split(";") if v.strip()]
+
+    return {
+        "titulo": fila.get("titulo"),
+        "descripcion": fila.get("descripcion") or None,
+        "idioma": fila.get("idioma") or None,
+        "tipo_material": fila.get("tipo_material") or "Libro",
+        "año_publicacion": _anio(fila.get("año_publicacion") or fila.get("anio_publicacion")),
+        "isbn": fila.get("isbn") or None,
+        "autores": separar(fila.get("autores")),
+        "copias": [
+            {
+                "codigo_copia": codigo,
+                "ubicacion": fila.get("ubicacion") or None,
+                "coleccion": fila.get("coleccion") or None,
+            }
+            for codigo in separar(fila.get("codigos_copia"))
+        ],
+    }
+
+
+def read_records(ruta: str, formato: str = None):
+    """
+    Lee el archivo registro por registro (sin cargarlo completo) y retorna
+    pares (número de registro, registro normalizado). El formato se deduce
+    de la extensión: .csv o .jsonl (MARC simplificado).
+    """
+    formato = formato or ("csv" if ruta.lower().endswith(".csv") else "jsonl")
+    with open(ruta, encoding="utf-8", newline="") as archivo:
+        if formato == "csv":
+            for numero, fila in enumerate(csv.DictReader(archivo), start=1):
+                yield numero, _registro_csv(fila)
+        else:
+            for numero, linea in enumerate(archivo, start=1):
+                if linea.strip():
+                    yield numero, _registro_marc(json.loads(linea))
+
+
+# ---------------------------
+# Importador
+# ---------------------------
+def _normalizar(texto):
+    return " ".join(str(texto).split()) if texto else None
+
+
+def _clave_material(titulo, isbn, anio):
+    """Un material se identifica por su ISBN o, si no tiene, por título y año"""
+    if isbn:
+        return ("isbn", isbn.replace("-", "").strip())
+    return ("titulo", titulo.lower(), anio)
+
+
+class CatalogImporter:
+    """
+    Importa el catálogo por lotes: cada lote inserta idiomas y autores nuevos,
+    materiales, relaciones material-autor y copias con un INSERT de muchas filas
+    por tabla y se confirma en una transacción. Idiomas, autores y materiales
+    existentes se deduplican en memoria; tras cada lote se guarda el punto de
+    control para poder reanudar después de una falla.
+    """
+
+    def __init__(self, session: Session, batch_size: int = 1000, checkpoint: str = None):
+        self.session = session
+        self.batch_size = batch_size
+        self.checkpoint = checkpoint
+        dialecto = session.get_bind().dialect.name
+        self._insert = postgresql.insert if dialecto == "postgresql" else sqlite.insert
+
+        self.idiomas = {}
+        self.autores = {}
+        self.materiales = set()
+        self.stats = {"leidos": 0, "materiales": 0, "copias": 0, "duplicados": 0, "rechazados": 0}
+
+    def _cargar_existentes(self):
+        self.idiomas = {nombre: id_ for id_, nombre in self.session.execute(select(Idioma.id_idioma, Idioma.nombre))}
+        self.autores = {nombre: id_ for id_, nombre in self.session.execute(select(Autor.id_autor, Autor.nombre))}
+        self.materiales = {
+            _clave_material(titulo, isbn, anio)
+            for titulo, isbn, anio in self.session.execute(
+                select(Material.titulo, Material.isbn, Material.año_publicacion)
+            )
+        }
+
+    # ---- punto de control ----
+    def _leer_checkpoint(self) -> int:
+        """Retorna el último registro confirmado y recupera los contadores"""
+        if not self.checkpoint or not os.path.exists(self.checkpoint):
+            return 0
+        with open(self.checkpoint, encoding="utf-8") as archivo:
+            datos = json.load(archivo)
+        self.stats.update({k: datos[k] for k in self.stats if k in datos})
+        return datos.get("registro", 0)
+
+    def _guardar_checkpoint(self, registro: int):
+        if not self.checkpoint:
+            return
+        temporal = self.checkpoint + ".tmp"
+        with open(temporal, "w", encoding="utf-8") as archivo:
+            json.dump({"registro": registro, **self.stats}, archivo)
+        os.replace(temporal, self.checkpoint)
+
+    # ---- lote ----
+    def _ids_idiomas(self, nombres):
+        nuevos = sorted(n for n in nombres if n not in self.idiomas)
+        if nuevos:
+            self.session.execute(
+                self._insert(Idioma).on_conflict_do_nothing(index_elements=[Idioma.nombre]),
+                [{"nombre": n} for n in nuevos],
+            )
+            filas = self.session.execute(
+                select(Idioma.id_idioma, Idioma.nombre).where(Idioma.nombre.in_(nuevos))
+            )
+            self.idiomas.update({nombre: id_ for id_, nombre in filas})
+            reference_cache.invalidate()
+
+    def _ids_autores(self, nombres):
+        nuevos = sorted(n for n in nombres if n not in self.autores)
+        if nuevos:
+            filas = self.session.execute(
+                insert(Autor).returning(Autor.id_autor, Autor.nombre, sort_by_parameter_order=True),
+                [{"nombre": n} for n in nuevos],
+            )
+            self.autores.update({nombre: id_ for id_, nombre in filas})
+
+    def _importar_lote(self, lote, id_disponible: int):
+        registros = []
+        for numero, r in lote:
+            titulo = _normalizar(r["titulo"])
+            if not titulo:
+                self.stats["rechazados"] += 1
+                print(f"Registro {numero}: sin título, se omite")
+                continue
+            clave = _clave_material(titulo, r["isbn"], r["año_publicacion"])
+            if clave in self.materiales:
+                self.stats["duplicados"] += 1
+                continue
+            self.materiales.add(clave)
+            r["titulo"] = titulo
+            r["idioma"] = _normalizar(r["idioma"])
+            r["autores"] = list(dict.fromkeys(a for a in map(_normalizar, r["autores"]) if a))
+            registros.append(r)
+
+        if not registros:
+            return
+
+        self._ids_idiomas({r["idioma"] for r in registros if r["idioma"]})
+        self._ids_autores({a for r in registros for a in r["autores"]})
+
+        ids_material = self.session.execute(
+            insert(Material).returning(Material.id_material, sort_by_parameter_order=True),
+            [
+                {
+                    "titulo": r["titulo"][:300],
+                    "descripcion": r["descripcion"],
+                    "id_idioma": self.idiomas.get(r["idioma"]),
+                    "tipo_material": r["tipo_material"][:50],
+                    "año_publicacion": r["año_publicacion"],
+                    "isbn": r["isbn"][:30] if r["isbn"] else None,
+                }
+                for r in registros
+            ],
+        ).scalars().all()
+
+        relaciones = []
+        copias = []
+        for id_material, r in zip(ids_material, registros):
+            relaciones.extend(
+                {"id_material": id_material, "id_autor": self.autores[a], "orden": orden}
+                for orden, a in enumerate(r["autores"], start=1)
+            )
+            copias.extend(
+                {
+                    "id_material": id_material,
+                    "id_estado": id_disponible,
+                    "codigo_copia": c["codigo_copia"] or f"M{id_material}-{n}",
+                    "ubicacion": c["ubicacion"],
+                    "coleccion": c["coleccion"],
+                    "formato": "fisico",
+                }
+                for n, c in enumerate(r["copias"], start=1)
+            )
+
+        if relaciones:
+            self.session.execute(insert(MaterialAutor), relaciones)
+        if copias:
+            # Un código de copia repetido (ya importado) se ignora; sobre la tabla
+            # (no la entidad) para obtener cuántas filas se insertaron
+            resultado = self.session.execute(
+                self._insert(Copia.__table__).on_conflict_do_nothing(index_elements=["codigo_copia"]),
+                copias,
+            )
+            self.stats["copias"] += max(resultado.rowcount, 0)
+
+        self.stats["materiales"] += len(ids_material)
+
+    def run(self, registros):
+        """Importa los registros (pares número/registro) y retorna las estadísticas"""
+        desde = self._leer_checkpoint()
+        if desde:
+            print(f"Reanudando después del registro {desde}")
+
+        self._cargar_existentes()
+        id_disponible = reference_cache.estado_id(self.session, "disponible")
+        if not id_disponible:
+            raise Exception("No se encontró el estado 'disponible'")
+
+        registros = ((n, r) for n, r in registros if n > desde)
+        leidos_antes = self.stats["leidos"]
+        inicio = time.perf_counter()
+        while True:
+            lote = list(islice(registros, self.batch_size))
+            if not lote:
+                break
+            try:
+                self._importar_lote(lote, id_disponible)
+                self.session.commit()
+            except Exception:
+                self.session.rollback()
+                print(f"Falla en el lote que empieza en el registro {lote[0][0]}; "
+                      f"se reanudará desde allí")
+                raise
+
+            self.stats["leidos"] += len(lote)
+            self._guardar_checkpoint(lote[-1][0])
+            transcurrido = time.perf_counter() - inicio
+            print(
+                f"Registro {lote[-1][0]}: {self.stats['materiales']} materiales, "
+                f"{self.stats['copias']} copias, {(self.stats['leidos'] - leidos_antes) / transcurrido:.0f} registros/s"
+            )
+
+        self.stats["segundos"] = time.perf_counter() - inicio
+        return self.stats
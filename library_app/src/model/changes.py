@@ -0,0 +1,71 @@
+import os
+import threading
+
+from dotenv import load_dotenv
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+
+load_dotenv()
+
+# Antigüedad máxima (segundos) de una pestaña en caché; cubre los cambios
+# hechos por otros procesos, que el contador no ve (0 = sin caché)
+VIEW_CACHE_TTL = float(os.getenv("VIEW_CACHE_TTL", "300"))
+
+
+class ChangeCounter:
+    """
+    Contador de cambios por tabla dentro del proceso. Cada commit que
+    inserta, edita o elimina filas de una tabla incrementa su contador;
+    comparar dos lecturas indica si algo cambió entre ellas.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._versiones = {}
+
+    def bump(self, tablas):
+        with self._lock:
+            for tabla in tablas:
+                self._versiones[tabla] = self._versiones.get(tabla, 0) + 1
+
+    def snapshot(self, tablas) -> tuple:
+        """Versión actual de cada tabla indicada"""
+        with self._lock:
+            return tuple(self._versiones.get(tabla, 0) for tabla in tablas)
+
+
+change_counter = ChangeCounter()
+
+
+@event.listens_for(Session, "after_flush")
+def _marcar_tablas_flush(session, flush_context):
+    """Anota las tablas con filas nuevas, editadas o eliminadas por el ORM"""
+    cambios = list(session.new) + list(session.dirty) + list(session.deleted)
+    tablas = {obj.__table__.name for obj in cambios if hasattr(obj, "__table__")}
+    if tablas:
+        session.info.setdefault("tablas_modificadas", set()).update(tablas)
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _marcar_tablas_masivas(orm_execute_state):
+    """Anota las tablas de los INSERT/UPDATE/DELETE masivos, que no pasan por el flush"""
+    if not (orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete):
+        return
+    mapper = orm_execute_state.bind_mapper
+    if mapper is not None:
+        orm_execute_state.session.info.setdefault("tablas_modificadas", set()).add(
+            mapper.local_table.name
+        )
+
+
+@event.listens_for(Session, "after_commit")
+def _incrementar_contadores(session):
+    tablas = session.info.pop("tablas_modificadas", None)
+    if tablas:
+        change_counter.bump(tablas)
+
+
+@event.listens_for(Session, "after_rollback")
+def _descartar_tablas(session):
+    session.info.pop("tablas_modificadas", None)
@@ -0,0 +1,207 @@
+import os
+from datetime import date, timedelta
+
+from dotenv import load_dotenv
+from sqlalchemy import column, func, literal, select, table
+from sqlalchemy.orm import Session
+
+from model.changes import change_counter
+from model.models import Copia, Estado, Material, Multa, Prestamo, Reserva
+
+
+load_dotenv()
+
+# Cada cuántos segundos se refrescan las vistas materializadas (0 = deshabilitado)
+DASHBOARD_REFRESH_INTERVAL = int(os.getenv("DASHBOARD_REFRESH_INTERVAL", "300"))
+
+
+# ---------------------------
+# Métricas (una consulta por vista)
+# ---------------------------
+def _prestamos_por_dia():
+    return (
+        select(
+            Prestamo.fecha_prestamo.label("dia"),
+            func.count(Prestamo.id_prestamo).label("prestamos"),
+        )
+        .group_by(Prestamo.fecha_prestamo)
+    )
+
+
+def _estado_copias():
+    return (
+        select(
+            Estado.nombre.label("estado"),
+            func.count(Copia.id_copia).label("copias"),
+        )
+        .select_from(Estado)
+        .outerjoin(Copia, Copia.id_estado == Estado.id_estado)
+        .group_by(Estado.nombre)
+    )
+
+
+def _resumen():
+    def escalar(consulta):
+        return consulta.scalar_subquery()
+
+    return select(
+        literal(1).label("id"),
+        escalar(
+            select(func.count(Prestamo.id_prestamo)).where(Prestamo.estado == "activo")
+        ).label("prestamos_activos"),
+        escalar(
+            select(func.count(Prestamo.id_prestamo)).where(
+                Prestamo.estado == "activo",
+                Prestamo.fecha_devolucion_prevista < func.current_date(),
+            )
+        ).label("prestamos_vencidos"),
+        escalar(
+            select(func.coalesce(func.sum(Multa.monto), 0)).where(Multa.estado_pago == "pendiente")
+        ).label("multas_pendientes"),
+        escalar(
+            select(func.coalesce(func.sum(Multa.monto), 0)).where(Multa.estado_pago == "pagada")
+        ).label("multas_pagadas"),
+        escalar(
+            select(func.count(Reserva.id_reserva)).where(
+                Reserva.estado == "activa",
+                Reserva.id_copia.is_(None),
+            )
+        ).label("reservas_en_cola"),
+        func.now().label("actualizado"),
+    )
+
+
+def _materiales_solicitados():
+    return (
+        select(
+            Material.id_material,
+            Material.titulo,
+            func.count(Prestamo.id_prestamo).label("prestamos"),
+        )
+        .join(Copia, Copia.id_material == Material.id_material)
+        .join(Prestamo, Prestamo.id_copia == Copia.id_copia)
+        .group_by(Material.id_material, Material.titulo)
+    )
+
+
+def _colas_reserva():
+    return (
+        select(
+            Material.id_material,
+            Material.titulo,
+            func.count(Reserva.id_reserva).label("en_espera"),
+        )
+        .join(Reserva, Reserva.id_material == Material.id_material)
+        .where(Reserva.estado == "activa", Reserva.id_copia.is_(None))
+        .group_by(Material.id_material, Material.titulo)
+    )
+
+
+# nombre de la vista -> (consulta, columna única para REFRESH CONCURRENTLY, índice adicional)
+VISTAS = {
+    "mv_dashboard_prestamos_dia": (_prestamos_por_dia, "dia", None),
+    "mv_dashboard_estado_copias": (_estado_copias, "estado", None),
+    "mv_dashboard_resumen": (_resumen, "id", None),
+    "mv_dashboard_materiales": (_materiales_solicitados, "id_material", "prestamos DESC"),
+    "mv_dashboard_colas": (_colas_reserva, "id_material", "en_espera DESC"),
+}
+
+# Las vistas y sus índices los crea la migración 0010_vistas_dashboard
+_vistas_verificadas = False
+
+
+def _usa_vistas(session: Session) -> bool:
+    return session.get_bind().dialect.name == "postgresql"
+
+
+def ensure_views(session: Session):
+    """
+    Verifica (una vez por proceso, solo lectura) que las vistas materializadas
+    existan; si falta alguna, la base no está migrada
+    """
+    global _vistas_verificadas
+    if _vistas_verificadas or not _usa_vistas(session):
+        return
+
+    existentes = set(session.execute(
+        select(column("matviewname")).select_from(table("pg_matviews"))
+    ).scalars())
+    faltantes = sorted(set(VISTAS) - existentes)
+    if faltantes:
+        raise Exception(
+            f"Faltan las vistas del dashboard ({', '.join(faltantes)}). Ejecute scripts/migrate.py"
+        )
+    _vistas_verificadas = True
+
+
+def refresh_dashboard(session: Session):
+    """Refresca las vistas sin bloquear las lecturas del dashboard"""
+    if not _usa_vistas(session):
+        return
+    ensure_views(session)
+    for nombre in VISTAS:
+        session.connection().exec_driver_sql(f"REFRESH MATERIALIZED VIEW CONCURRENTLY {nombre}")
+        session.commit()
+    # Las pestañas del dashboard en caché deben leer los datos nuevos
+    change_counter.bump(VISTAS)
+
+
+def _leer(session: Session, nombre: str, columnas, where=None, order_by=None, limit=None):
+    """
+    Lee una métrica: en PostgreSQL desde su vista materializada, en otros
+    motores ejecutando la consulta directamente sobre las tablas
+    """
+    if _usa_vistas(session):
+        ensure_views(session)
+        origen = table(nombre, *[column(c) for c in columnas])
+    else:
+        origen = VISTAS[nombre][0]().subquery()
+
+    consulta = select(*[origen.c[c] for c in columnas])
+    if where is not None:
+        consulta = consulta.where(where(origen))
+    if order_by is not None:
+        consulta = consulta.order_by(*order_by(origen))
+    if limit:
+        consulta = consulta.limit(limit)
+    return session.execute(consulta).mappings().all()
+
+
+def resumen(session: Session):
+    filas = _leer(session, "mv_dashboard_resumen", [
+        "prestamos_activos", "prestamos_vencidos", "multas_pendientes",
+        "multas_pagadas", "reservas_en_cola", "actualizado",
+    ])
+    return filas[0] if filas else None
+
+
+def prestamos_por_dia(session: Session, dias: int = 30):
+    desde = date.today() - timedelta(days=dias - 1)
+    return _leer(
+        session, "mv_dashboard_prestamos_dia", ["dia", "prestamos"],
+        where=lambda v: v.c.dia >= desde,
+        order_by=lambda v: (v.c.dia,),
+    )
+
+
+def estado_copias(session: Session):
+    return _leer(
+        session, "mv_dashboard_estado_copias", ["estado", "copias"],
+        order_by=lambda v: (v.c.copias.desc(),),
+    )
+
+
+def materiales_mas_prestados(session: Session, limite: int = 10):
+    return _leer(
+        session, "mv_dashboard_materiales", ["id_material", "titulo", "prestamos"],
+        order_by=lambda v: (v.c.prestamos.desc(), v.c.id_material),
+        limit=limite,
+    )
+
+
+def colas_mas_largas(session: Session, limite: int = 10):
+    return _leer(
+        session, "mv_dashboard_colas", ["id_material", "titulo", "en_espera"],
+        order_by=lambda v: (v.c.en_espera.desc(), v.c.id_material),
+        limit=limite,
+    )
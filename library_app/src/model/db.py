@@ -1,5 +1,6 @@
 
 import os
+import threading
 from dotenv import load_dotenv
 from sqlalchemy.orm import sessionmaker
 from model.models import (
@@ -7,18 +8,63 @@ Base, Idioma, Rol, Autor, Material, MaterialAutor, Copia,
 get_engine
 )
 from model.usuario import *
+from model.migrations import ensure_schema
 
 
 # Cargar env
 load_dotenv()
 DB_URL = os.getenv("DATABASE_URL")
 
+# Configuración del pool de conexiones
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = int(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "-1"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "false").lower() in ("1", "true", "yes")
 
-if not DB_URL:
-    raise RuntimeError("ERROR: No se pudo construir la URL de la base de datos")
 
-engine = get_engine(DB_URL)
-Base.metadata.create_all(engine)
+_engine = None
+_engine_lock = threading.Lock()
 
-Session = sessionmaker(bind=engine)
-session = Session()
+
+def init_engine():
+    """
+    Crea el engine la primera vez que se necesita (no al importar el módulo)
+    y migra si la base no está en la versión actual
+    """
+    global _engine
+    with _engine_lock:
+        if _engine is None:
+            if not DB_URL:
+                raise RuntimeError("ERROR: No se pudo construir la URL de la base de datos")
+
+            engine = get_engine(
+                DB_URL,
+                pool_size=DB_POOL_SIZE,
+                max_overflow=DB_MAX_OVERFLOW,
+                pool_timeout=DB_POOL_TIMEOUT,
+                pool_recycle=DB_POOL_RECYCLE,
+                pool_pre_ping=DB_POOL_PRE_PING,
+            )
+            # Sin create_all en cada inicio: solo se lee la versión del esquema
+            ensure_schema(engine)
+            _engine = engine
+    return _engine
+
+
+def __getattr__(nombre):
+    # `from model.db import engine` sigue funcionando en los scripts
+    if nombre == "engine":
+        return init_engine()
+    raise AttributeError(f"module {__name__!r} has no attribute {nombre!r}")
+
+
+# Fábrica de sesiones: cada conexión de usuario o script abre la suya.
+# La primera sesión inicializa el engine
+_session_factory = sessionmaker()
+
+
+def SessionLocal(**kwargs):
+    if _session_factory.kw.get("bind") is None:
+        _session_factory.configure(bind=init_engine())
+    return _session_factory(**kwargs)
@@ -0,0 +1,185 @@
+import csv
+from datetime import date
+
+from sqlalchemy import Date, DateTime, Integer, Numeric, and_, select, true
+from sqlalchemy.orm import Session
+
+from model.models import Copia, Estado, Material, Movimiento, Multa, Prestamo
+from model.usuario import Usuario
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pyarrow es opcional (extra "reportes"); sin él solo se exporta CSV
+    pa = None
+    pq = None
+
+
+# ---------------------------
+# Consultas (una fila por registro, ya unida con usuario y material)
+# ---------------------------
+def _rango(columna, anio: int):
+    if anio is None:
+        return true()
+    return and_(columna >= date(anio, 1, 1), columna < date(anio + 1, 1, 1))
+
+
+def _prestamos(anio: int = None):
+    return (
+        select(
+            Prestamo.id_prestamo,
+            Prestamo.fecha_prestamo,
+            Prestamo.fecha_devolucion_prevista,
+            Prestamo.fecha_devolucion_real,
+            Prestamo.estado,
+            Usuario.id_usuario,
+            Usuario.nombre.label("usuario"),
+            Usuario.correo,
+            Copia.codigo_copia,
+            Material.id_material,
+            Material.titulo,
+            Material.isbn,
+        )
+        .outerjoin(Usuario, Usuario.id_usuario == Prestamo.id_usuario)
+        .outerjoin(Copia, Copia.id_copia == Prestamo.id_copia)
+        .outerjoin(Material, Material.id_material == Copia.id_material)
+        .where(_rango(Prestamo.fecha_prestamo, anio))
+        .order_by(Prestamo.id_prestamo)
+    )
+
+
+def _multas(anio: int = None):
+    return (
+        select(
+            Multa.id_multa,
+            Multa.id_prestamo,
+            Multa.dias_atraso,
+            Multa.monto,
+            Multa.estado_pago,
+            Multa.fecha_generacion,
+            Multa.fecha_pago,
+            Usuario.id_usuario,
+            Usuario.nombre.label("usuario"),
+            Usuario.correo,
+            Copia.codigo_copia,
+            Material.id_material,
+            Material.titulo,
+            Material.isbn,
+        )
+        .outerjoin(Usuario, Usuario.id_usuario == Multa.id_usuario)
+        .outerjoin(Copia, Copia.id_copia == Multa.id_copia)
+        .outerjoin(Material, Material.id_material == Copia.id_material)
+        .where(_rango(Multa.fecha_generacion, anio))
+        .order_by(Multa.id_multa)
+    )
+
+
+def _movimientos(anio: int = None):
+    return (
+        select(
+            Movimiento.id_movimiento,
+            Movimiento.fecha_solicitud,
+            Movimiento.fecha_devolucion,
+            Estado.nombre.label("estado"),
+            Movimiento.detalle,
+            Usuario.id_usuario,
+            Usuario.nombre.label("usuario"),
+            Usuario.correo,
+            Copia.codigo_copia,
+            Material.id_material,
+            Material.titulo,
+            Material.isbn,
+        )
+        .join(Estado, Estado.id_estado == Movimiento.id_estado)
+        .outerjoin(Usuario, Usuario.id_usuario == Movimiento.id_usuario)
+        .outerjoin(Copia, Copia.id_copia == Movimiento.id_copia)
+        .outerjoin(Material, Material.id_material == Copia.id_material)
+        .where(_rango(Movimiento.fecha_solicitud, anio))
+        .order_by(Movimiento.id_movimiento)
+    )
+
+
+EXPORTS = {
+    "prestamos": _prestamos,
+    "multas": _multas,
+    "movimientos": _movimientos,
+}
+
+
+# ---------------------------
+# Escritura por bloques
+# ---------------------------
+class CsvWriter:
+    def __init__(self, ruta: str, columnas):
+        self._archivo = open(ruta, "w", encoding="utf-8", newline="")
+        self._csv = csv.writer(self._archivo)
+        self._csv.writerow(columnas)
+
+    def write(self, filas):
+        self._csv.writerows(filas)
+
+    def close(self):
+        self._archivo.close()
+
+
+class ParquetWriter:
+    """Escribe cada bloque como un row group; el esquema sale de los tipos de la consulta"""
+
+    def __init__(self, ruta: str, columnas, tipos):
+        if pa is None:
+            raise Exception("La exportación a Parquet requiere pyarrow (extra 'reportes')")
+        self.columnas = list(columnas)
+        self.schema = pa.schema([(c, self._tipo(t)) for c, t in zip(self.columnas, tipos)])
+        self._writer = pq.ParquetWriter(ruta, self.schema)
+
+    @staticmethod
+    def _tipo(tipo):
+        if isinstance(tipo, Integer):
+            return pa.int64()
+        if isinstance(tipo, Numeric):
+            return pa.decimal128(tipo.precision or 18, tipo.scale or 0)
+        if isinstance(tipo, DateTime):
+            return pa.timestamp("us")
+        if isinstance(tipo, Date):
+            return pa.date32()
+        return pa.string()
+
+    def write(self, filas):
+        columnas = list(zip(*filas))
+        self._writer.write_table(pa.Table.from_arrays(
+            [pa.array(valores, type=campo.type) for valores, campo in zip(columnas, self.schema)],
+            schema=self.schema,
+        ))
+
+    def close(self):
+        self._writer.close()
+
+
+def export_table(session: Session, nombre: str, ruta: str, formato: str = "csv",
+                 anio: int = None, chunk_size: int = 10000) -> int:
+    """
+    Exporta `nombre` (prestamos, multas o movimientos) a `ruta` leyendo con un
+    cursor del lado del servidor: las filas llegan en bloques de `chunk_size`
+    y se escriben sin pasar por el mapa de identidad, con memoria constante.
+    Retorna la cantidad de filas exportadas.
+    """
+    consulta = EXPORTS[nombre](anio)
+    columnas = [c.name for c in consulta.selected_columns]
+
+    if formato == "parquet":
+        writer = ParquetWriter(ruta, columnas, [c.type for c in consulta.selected_columns])
+    else:
+        writer = CsvWriter(ruta, columnas)
+
+    total = 0
+    try:
+        resultado = session.execute(
+            consulta,
+            execution_options={"stream_results": True, "yield_per": chunk_size},
+        )
+        for bloque in resultado.partitions():
+            writer.write(bloque)
+            total += len(bloque)
+    finally:
+        writer.close()
+    return total
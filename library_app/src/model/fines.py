@@ -0,0 +1,142 @@
+import os
+from datetime import date
+from functools import lru_cache
+
+from dotenv import load_dotenv
+from sqlalchemy import Date, Integer, and_, case, cast, func, literal, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from model.cache import blocked_users
+from model.models import Multa, Prestamo
+
+
+load_dotenv()
+
+# Cada cuántos segundos corre el job dentro de la app (0 = deshabilitado)
+FINE_ACCRUAL_INTERVAL = int(os.getenv("FINE_ACCRUAL_INTERVAL", "0"))
+
+
+# Tabla de multas (COP)
+MULTA_PRIMER_DIA = 1000
+MULTA_HASTA_SEPTIMO_DIA = 2500
+MULTA_POR_DIA_ADICIONAL = 100
+
+
+def monto_multa(dias_atraso: int) -> float:
+    """
+    Calcula el monto de la multa según los días de atraso
+    1er día: 1000 COP
+    2º al 7º día: 2500 COP
+    8º día en adelante: 2500 + 100 COP por cada día adicional
+    """
+    if dias_atraso < 1:
+        return 0.0
+    elif dias_atraso == 1:
+        return float(MULTA_PRIMER_DIA)
+    elif dias_atraso <= 7:
+        return float(MULTA_HASTA_SEPTIMO_DIA)
+    else:  # 8 días o más
+        return float(MULTA_HASTA_SEPTIMO_DIA + (dias_atraso - 7) * MULTA_POR_DIA_ADICIONAL)
+
+
+@lru_cache(maxsize=None)
+def numpy_module():
+    """
+    NumPy es opcional (extra "reportes"): se importa al primer cálculo
+    vectorizado y no al iniciar la app. Retorna None si no está instalado.
+    """
+    try:
+        import numpy
+    except ImportError:
+        return None
+    return numpy
+
+
+def montos_multa(dias_atraso):
+    """
+    Versión vectorizada de monto_multa: recibe una secuencia o arreglo de días
+    de atraso y retorna los montos en el mismo orden. Con NumPy instalado
+    trabaja sobre arreglos completos sin un ciclo de Python por préstamo.
+    """
+    np = numpy_module()
+    if np is None:
+        return [monto_multa(int(d)) for d in dias_atraso]
+
+    dias = np.asarray(dias_atraso, dtype=np.int64)
+    return np.select(
+        [dias < 1, dias == 1, dias <= 7],
+        [0.0, MULTA_PRIMER_DIA, MULTA_HASTA_SEPTIMO_DIA],
+        default=MULTA_HASTA_SEPTIMO_DIA + (dias - 7) * MULTA_POR_DIA_ADICIONAL,
+    ).astype(np.float64)
+
+
+def monto_multa_sql(dias_atraso):
+    """La misma tabla de monto_multa como expresión SQL CASE"""
+    return case(
+        (dias_atraso < 1, 0),
+        (dias_atraso == 1, MULTA_PRIMER_DIA),
+        (dias_atraso <= 7, MULTA_HASTA_SEPTIMO_DIA),
+        else_=MULTA_HASTA_SEPTIMO_DIA + (dias_atraso - 7) * MULTA_POR_DIA_ADICIONAL,
+    )
+
+
+def _dias_atraso(session: Session, hoy: date):
+    if session.get_bind().dialect.name == "sqlite":
+        return cast(
+            func.julianday(literal(hoy, Date)) - func.julianday(Prestamo.fecha_devolucion_prevista),
+            Integer,
+        )
+    # En PostgreSQL date - date ya es un entero de días
+    return literal(hoy, Date) - Prestamo.fecha_devolucion_prevista
+
+
+def accrue_overdue_fines(session: Session, hoy: date = None) -> int:
+    """
+    Genera o actualiza en una sola sentencia la multa de cada préstamo activo
+    vencido (INSERT ... SELECT ... ON CONFLICT DO UPDATE). Es incremental: solo
+    escribe las multas nuevas y las que cambiaron de días de atraso, y no toca
+    las ya pagadas. Retorna la cantidad de multas escritas.
+    """
+    hoy = hoy or date.today()
+    dias = _dias_atraso(session, hoy).label("dias_atraso")
+
+    vencidos = (
+        select(
+            Prestamo.id_prestamo,
+            Prestamo.id_copia,
+            Prestamo.id_usuario,
+            dias,
+            monto_multa_sql(dias).label("monto"),
+            literal("pendiente").label("estado_pago"),
+        )
+        .where(
+            Prestamo.estado == "activo",
+            Prestamo.fecha_devolucion_prevista < hoy,
+            Prestamo.id_copia.is_not(None),
+            Prestamo.id_usuario.is_not(None),
+        )
+    )
+
+    dialecto = postgresql if session.get_bind().dialect.name == "postgresql" else sqlite
+    stmt = dialecto.insert(Multa).from_select(
+        ["id_prestamo", "id_copia", "id_usuario", "dias_atraso", "monto", "estado_pago"],
+        vencidos,
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[Multa.id_prestamo],
+        set_={
+            "dias_atraso": stmt.excluded.dias_atraso,
+            "monto": stmt.excluded.monto,
+        },
+        where=and_(
+            Multa.estado_pago == "pendiente",
+            Multa.dias_atraso != stmt.excluded.dias_atraso,
+        ),
+    )
+
+    resultado = session.execute(stmt)
+    session.commit()
+    # El upsert no pasa por el ORM: los saldos cambiaron para cualquier usuario
+    blocked_users.invalidate()
+    return resultado.rowcount
@@ -0,0 +1,241 @@
+import atexit
+import logging
+import os
+import queue
+import threading
+import time
+from datetime import date, datetime
+
+from dotenv import load_dotenv
+from sqlalchemy import event, func, inspect, select
+from sqlalchemy.orm import Session
+
+from model.models import Copia, CopiaEvento
+
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Eventos por INSERT y segundos máximos que un evento espera para escribirse
+HISTORY_BATCH_SIZE = int(os.getenv("HISTORY_BATCH_SIZE", "500"))
+HISTORY_FLUSH_INTERVAL = float(os.getenv("HISTORY_FLUSH_INTERVAL", "2"))
+# Espera máxima entre reintentos cuando la base no acepta un lote
+HISTORY_MAX_BACKOFF = 60
+
+
+# ---------------------------
+# Registro de transiciones
+# ---------------------------
+def _evento(session: Session, id_copia: int, anterior, nuevo):
+    return {
+        "id_copia": id_copia,
+        "fecha": datetime.now(),
+        "id_estado_anterior": anterior,
+        "id_estado_nuevo": nuevo,
+        "id_usuario": session.info.get("id_usuario"),
+        "operacion": session.info.get("operacion"),
+    }
+
+
+def record_transitions(session: Session, ids_copia, id_estado_anterior, id_estado_nuevo):
+    """
+    Anota transiciones hechas con UPDATE masivo, que no pasan por el ORM.
+    Se escriben en el historial solo si la transacción se confirma.
+    """
+    eventos = session.info.setdefault("transiciones_copia", [])
+    eventos.extend(
+        _evento(session, id_copia, id_estado_anterior, id_estado_nuevo)
+        for id_copia in ids_copia
+    )
+
+
+@event.listens_for(Session, "after_flush")
+def _registrar_cambios_estado(session, flush_context):
+    """Anota las copias nuevas o cuyo id_estado cambió en el flush"""
+    eventos = []
+    for obj in list(session.new) + list(session.dirty):
+        if not isinstance(obj, Copia):
+            continue
+        historial = inspect(obj).attrs.id_estado.history
+        if not historial.added or historial.added[0] is None:
+            continue
+        anterior = historial.deleted[0] if historial.deleted else None
+        if anterior != historial.added[0]:
+            eventos.append(_evento(session, obj.id_copia, anterior, historial.added[0]))
+    if eventos:
+        session.info.setdefault("transiciones_copia", []).extend(eventos)
+
+
+@event.listens_for(Session, "after_commit")
+def _enviar_transiciones(session):
+    eventos = session.info.pop("transiciones_copia", None)
+    if eventos:
+        history_writer.submit(session.get_bind(), eventos)
+
+
+@event.listens_for(Session, "after_rollback")
+def _descartar_transiciones(session):
+    session.info.pop("transiciones_copia", None)
+
+
+# ---------------------------
+# Particiones (PostgreSQL)
+# ---------------------------
+_particiones = set()
+
+
+def _mes_siguiente(mes: date) -> date:
+    return date(mes.year + (mes.month == 12), mes.month % 12 + 1, 1)
+
+
+def ensure_partitions(conn, meses):
+    """Crea (si faltan) las particiones mensuales de copia_evento para los meses dados"""
+    if conn.dialect.name != "postgresql":
+        return
+    for mes in sorted({date(m.year, m.month, 1) for m in meses}):
+        nombre = f"copia_evento_{mes:%Y%m}"
+        if nombre in _particiones:
+            continue
+        conn.exec_driver_sql(
+            f"CREATE TABLE IF NOT EXISTS {nombre} PARTITION OF copia_evento "
+            f"FOR VALUES FROM ('{mes.isoformat()}') TO ('{_mes_siguiente(mes).isoformat()}')"
+        )
+        _particiones.add(nombre)
+
+
+# ---------------------------
+# Escritura por lotes fuera del request
+# ---------------------------
+class CopyHistoryWriter:
+    """
+    Hilo de fondo que escribe los eventos confirmados en copia_evento con un
+    INSERT de muchas filas por lote (hasta `batch_size` eventos o cada
+    `interval` segundos), para que ninguna operación espere por el historial.
+
+    Si la base rechaza un lote, sus eventos vuelven a la cola y se reintentan
+    con espera creciente. Al salir del proceso se escribe lo pendiente; solo
+    se pierde lo que esté en la cola si el proceso termina abruptamente.
+    """
+
+    def __init__(self, batch_size: int = HISTORY_BATCH_SIZE, interval: float = HISTORY_FLUSH_INTERVAL):
+        self.batch_size = batch_size
+        self.interval = interval
+        self._cola = queue.Queue()
+        self._lock = threading.Lock()
+        self._vaciar = threading.Event()
+        self._thread = None
+
+    def submit(self, engine, eventos):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="copy-history", daemon=True)
+                self._thread.start()
+        for evento in eventos:
+            self._cola.put((engine, evento))
+
+    def _tomar_lote(self):
+        lote = [self._cola.get()]
+        limite = time.monotonic() + self.interval
+        while len(lote) < self.batch_size and not self._vaciar.is_set():
+            restante = limite - time.monotonic()
+            if restante <= 0:
+                break
+            try:
+                lote.append(self._cola.get(timeout=restante))
+            except queue.Empty:
+                break
+        return lote
+
+    def _run(self):
+        intentos = 0
+        while True:
+            lote = self._tomar_lote()
+            fallidos = self._escribir(lote)
+            # Los fallidos vuelven a la cola antes de marcar el lote como atendido
+            for item in fallidos:
+                self._cola.put(item)
+            for _ in lote:
+                self._cola.task_done()
+
+            if fallidos:
+                intentos += 1
+                espera = min(self.interval * 2 ** intentos, HISTORY_MAX_BACKOFF)
+                # Durante flush() se reintenta a más tardar cada segundo
+                if self._vaciar.wait(espera):
+                    time.sleep(min(espera, 1))
+            else:
+                intentos = 0
+
+    def _escribir(self, lote):
+        """Escribe el lote agrupado por engine; retorna los (engine, evento) que fallaron"""
+        por_engine = {}
+        for engine, evento in lote:
+            por_engine.setdefault(engine, []).append(evento)
+
+        fallidos = []
+        for engine, eventos in por_engine.items():
+            try:
+                with engine.begin() as conn:
+                    ensure_partitions(conn, [e["fecha"] for e in eventos])
+                    conn.execute(CopiaEvento.__table__.insert(), self._con_id(conn, eventos))
+            except Exception:
+                # La partición pudo revertirse junto con el lote: se vuelve a verificar
+                _particiones.clear()
+                logger.exception("No se pudieron escribir %d eventos del historial; se reintentarán", len(eventos))
+                fallidos.extend((engine, evento) for evento in eventos)
+        return fallidos
+
+    @staticmethod
+    def _con_id(conn, eventos):
+        """En PostgreSQL el id sale de la secuencia; en SQLite se numera dentro de la transacción"""
+        if conn.dialect.name == "postgresql":
+            return eventos
+        siguiente = conn.execute(select(func.coalesce(func.max(CopiaEvento.id), 0))).scalar() + 1
+        return [dict(evento, id=siguiente + i) for i, evento in enumerate(eventos)]
+
+    def pending(self) -> int:
+        return self._cola.unfinished_tasks
+
+    def flush(self, timeout: float = 10.0):
+        """Espera a que se escriban los eventos pendientes (al salir y en scripts)"""
+        limite = time.monotonic() + timeout
+        self._vaciar.set()
+        try:
+            while self.pending() and time.monotonic() < limite:
+                time.sleep(0.05)
+        finally:
+            self._vaciar.clear()
+        if self.pending():
+            logger.error("Quedaron %d eventos del historial sin escribir", self.pending())
+
+
+history_writer = CopyHistoryWriter()
+atexit.register(history_writer.flush)
+
+
+# ---------------------------
+# Consultas
+# ---------------------------
+def copy_history(session: Session, id_copia: int, desde: datetime = None, hasta: datetime = None):
+    """Transiciones de una copia, más recientes primero (usa el índice id_copia, fecha)"""
+    consulta = select(CopiaEvento).where(CopiaEvento.id_copia == id_copia)
+    if desde is not None:
+        consulta = consulta.where(CopiaEvento.fecha >= desde)
+    if hasta is not None:
+        consulta = consulta.where(CopiaEvento.fecha < hasta)
+    return session.execute(
+        consulta.order_by(CopiaEvento.fecha.desc(), CopiaEvento.id.desc())
+    ).scalars().all()
+
+
+def transitions_between(session: Session, desde: datetime, hasta: datetime):
+    """
+    Todas las transiciones del rango [desde, hasta); en PostgreSQL solo se
+    leen las particiones de esos meses
+    """
+    return session.execute(
+        select(CopiaEvento)
+        .where(CopiaEvento.fecha >= desde, CopiaEvento.fecha < hasta)
+        .order_by(CopiaEvento.fecha, CopiaEvento.id)
+    ).scalars().all()
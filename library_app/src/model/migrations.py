@@ -0,0 +1,349 @@
+"""
+Migraciones versionadas del esquema.
+
+Cada migración es una función que recibe la conexión; las aplicadas se
+registran en la tabla schema_version. Para cambiar el esquema se agrega una
+entrada al final de MIGRATIONS (nunca se editan las ya publicadas). Los
+pasos propios de PostgreSQL no hacen nada en otros motores, donde el
+esquema completo lo crea create_all en la primera migración.
+"""
+from datetime import date
+
+from sqlalchemy import Column, DateTime, MetaData, String, Table, func, inspect, select, text
+from sqlalchemy.dialects import postgresql, sqlite
+
+from model.base import Base
+from model.dashboard import VISTAS
+from model.history import ensure_partitions
+from model.models import CopiaEvento, Estado, Rol, SaldoMulta
+# Registra la tabla usuario en Base.metadata (create_all y las vistas la necesitan)
+import model.usuario  # noqa: F401
+
+
+# Fuera de Base.metadata: create_all no la toca y existe antes de migrar
+_metadata = MetaData()
+schema_version = Table(
+    "schema_version",
+    _metadata,
+    Column("revision", String(50), primary_key=True),
+    Column("aplicada_en", DateTime, server_default=func.now()),
+)
+
+# Clave del pg_advisory_xact_lock que serializa migraciones concurrentes
+_LOCK_MIGRACIONES = 724511
+
+ESTADOS = ["disponible", "prestado", "reservado", "dañado"]
+ROLES = ["estudiante", "profesor", "bibliotecario"]
+
+# Trigger de PostgreSQL que aplica a saldo_multa la diferencia de cada cambio en multa
+# (incluye el upsert masivo del job de multas, que no pasa por el ORM)
+SALDO_MULTA_DDL = (
+    """
+    CREATE OR REPLACE FUNCTION actualizar_saldo_multa() RETURNS trigger AS $$
+    BEGIN
+        IF TG_OP IN ('UPDATE', 'DELETE') AND OLD.estado_pago = 'pendiente' THEN
+            UPDATE saldo_multa
+            SET multas_pendientes = multas_pendientes - 1,
+                monto_pendiente = monto_pendiente - OLD.monto
+            WHERE id_usuario = OLD.id_usuario;
+        END IF;
+        IF TG_OP IN ('INSERT', 'UPDATE') AND NEW.estado_pago = 'pendiente' THEN
+            INSERT INTO saldo_multa (id_usuario, multas_pendientes, monto_pendiente)
+            VALUES (NEW.id_usuario, 1, NEW.monto)
+            ON CONFLICT (id_usuario) DO UPDATE
+            SET multas_pendientes = saldo_multa.multas_pendientes + 1,
+                monto_pendiente = saldo_multa.monto_pendiente + EXCLUDED.monto_pendiente;
+        END IF;
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql;
+    """,
+    "DROP TRIGGER IF EXISTS trg_saldo_multa ON multa;",
+    """
+    CREATE TRIGGER trg_saldo_multa
+    AFTER INSERT OR UPDATE OF estado_pago, monto, id_usuario OR DELETE ON multa
+    FOR EACH ROW EXECUTE FUNCTION actualizar_saldo_multa();
+    """,
+    """
+    INSERT INTO saldo_multa (id_usuario, multas_pendientes, monto_pendiente)
+    SELECT id_usuario, COUNT(*), SUM(monto)
+    FROM multa
+    WHERE estado_pago = 'pendiente'
+    GROUP BY id_usuario
+    ON CONFLICT (id_usuario) DO UPDATE
+    SET multas_pendientes = EXCLUDED.multas_pendientes,
+        monto_pendiente = EXCLUDED.monto_pendiente;
+    """,
+)
+
+
+def _es_postgres(conn) -> bool:
+    return conn.dialect.name == "postgresql"
+
+
+def _ejecutar(conn, *sentencias):
+    for sentencia in sentencias:
+        conn.exec_driver_sql(sentencia)
+
+
+def _agregar_restriccion(conn, tabla: str, nombre: str, definicion: str):
+    """ALTER TABLE ... ADD CONSTRAINT solo si la restricción no existe"""
+    existe = conn.execute(
+        text("SELECT 1 FROM pg_constraint WHERE conname = :nombre"), {"nombre": nombre}
+    ).first()
+    if not existe:
+        conn.exec_driver_sql(f"ALTER TABLE {tabla} ADD CONSTRAINT {nombre} {definicion}")
+
+
+def _verificar_unicos(conn, tabla: str, columna: str, indice: str):
+    """Falla con un mensaje claro si hay valores repetidos que impedirían crear `indice`"""
+    repetidos = conn.execute(text(
+        f"SELECT {columna} FROM {tabla} GROUP BY {columna} HAVING COUNT(*) > 1 ORDER BY {columna}"
+    )).scalars().all()
+    if repetidos:
+        raise Exception(
+            f"No se puede crear el índice único {indice}: hay {len(repetidos)} valores repetidos "
+            f"en {tabla}.{columna} ({', '.join(map(str, repetidos[:20]))}"
+            f"{', ...' if len(repetidos) > 20 else ''}). Corríjalos y vuelva a ejecutar scripts/migrate.py"
+        )
+
+
+def _insertar_faltantes(conn, modelo, nombres):
+    """Un solo INSERT ... ON CONFLICT DO NOTHING con todos los nombres"""
+    dialecto = postgresql if _es_postgres(conn) else sqlite
+    conn.execute(
+        dialecto.insert(modelo.__table__).on_conflict_do_nothing(index_elements=["nombre"]),
+        [{"nombre": nombre} for nombre in nombres],
+    )
+
+
+# ---------------------------
+# Migraciones
+# ---------------------------
+def _0001_esquema(conn):
+    Base.metadata.create_all(conn)
+
+
+def _0002_datos_referencia(conn):
+    _insertar_faltantes(conn, Estado, ESTADOS)
+    _insertar_faltantes(conn, Rol, ROLES)
+
+
+def _0003_versiones(conn):
+    # Control de concurrencia optimista
+    if not _es_postgres(conn):
+        return
+    _ejecutar(conn, *(
+        f"ALTER TABLE {tabla} ADD COLUMN IF NOT EXISTS version INTEGER NOT NULL DEFAULT 1"
+        for tabla in ("copia", "prestamo", "reserva", "movimiento")
+    ))
+
+
+def _0004_cola_reservas(conn):
+    if not _es_postgres(conn):
+        return
+    _ejecutar(
+        conn,
+        "ALTER TABLE reserva ADD COLUMN IF NOT EXISTS id_material INTEGER "
+        "REFERENCES material(id_material) ON DELETE CASCADE",
+        "ALTER TABLE reserva ADD COLUMN IF NOT EXISTS posicion INTEGER",
+        """
+        UPDATE reserva r SET id_material = c.id_material
+        FROM copia c
+        WHERE r.id_copia = c.id_copia AND r.id_material IS NULL
+        """,
+        # Las reservas activas antiguas apuntaban a una copia prestada cualquiera:
+        # pasan a esperar en la cola salvo que la copia ya esté apartada (reservado)
+        """
+        UPDATE reserva r SET id_copia = NULL
+        FROM copia c JOIN estado e ON c.id_estado = e.id_estado
+        WHERE r.id_copia = c.id_copia AND r.estado = 'activa' AND e.nombre <> 'reservado'
+        """,
+        """
+        UPDATE reserva r SET posicion = o.puesto
+        FROM (
+            SELECT id_reserva,
+                   ROW_NUMBER() OVER (PARTITION BY id_material ORDER BY fecha_reserva, id_reserva) AS puesto
+            FROM reserva
+        ) o
+        WHERE r.id_reserva = o.id_reserva AND r.posicion IS NULL
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_reserva_cola ON reserva(id_material, estado, posicion)",
+    )
+
+
+def _0005_multas(conn):
+    if not _es_postgres(conn):
+        return
+    _agregar_restriccion(conn, "multa", "uq_multa_prestamo", "UNIQUE (id_prestamo)")
+    _ejecutar(
+        conn,
+        "CREATE INDEX IF NOT EXISTS idx_prestamo_estado_vencimiento ON prestamo(estado, fecha_devolucion_prevista)",
+        "CREATE INDEX IF NOT EXISTS idx_multa_usuario_estado ON multa(id_usuario, estado_pago)",
+    )
+
+
+def _0006_restricciones_indices(conn):
+    if not _es_postgres(conn):
+        return
+    _agregar_restriccion(conn, "material", "chk_anio_publicacion", "CHECK (año_publicacion >= 1500)")
+    # Los nombres repetidos se renombran a mano: no se fusionan usuarios automáticamente
+    _verificar_unicos(conn, "usuario", "nombre", "ix_usuario_nombre")
+    _ejecutar(
+        conn,
+        "CREATE INDEX IF NOT EXISTS idx_material_titulo ON material(titulo)",
+        "CREATE INDEX IF NOT EXISTS idx_prestamo_usuario ON prestamo(id_usuario)",
+        "CREATE INDEX IF NOT EXISTS idx_copia_estado ON copia(id_estado)",
+        "CREATE INDEX IF NOT EXISTS idx_reserva_usuario ON reserva(id_usuario)",
+        # Login por nombre de usuario (mismo nombre que genera Usuario.nombre index=True)
+        "CREATE UNIQUE INDEX IF NOT EXISTS ix_usuario_nombre ON usuario(nombre)",
+    )
+
+
+def _0007_busqueda(conn):
+    # Debe coincidir con la expresión de model/search.py
+    if not _es_postgres(conn):
+        return
+    _ejecutar(
+        conn,
+        "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+        "CREATE INDEX IF NOT EXISTS idx_material_titulo_trgm ON material USING gin (titulo gin_trgm_ops)",
+        "CREATE INDEX IF NOT EXISTS idx_material_isbn_trgm ON material USING gin (isbn gin_trgm_ops)",
+        "CREATE INDEX IF NOT EXISTS idx_autor_nombre_trgm ON autor USING gin (nombre gin_trgm_ops)",
+        """
+        CREATE INDEX IF NOT EXISTS idx_material_fts ON material
+        USING gin (to_tsvector('simple', titulo || ' ' || coalesce(descripcion, '')))
+        """,
+    )
+
+
+def _0008_vistas(conn):
+    if not _es_postgres(conn):
+        return
+    _ejecutar(
+        conn,
+        """
+        CREATE OR REPLACE VIEW vista_material_disponible AS
+        SELECT
+            m.titulo,
+            c.codigo_copia,
+            e.nombre AS estado
+        FROM material m
+        JOIN copia c ON m.id_material = c.id_material
+        JOIN estado e ON c.id_estado = e.id_estado
+        WHERE e.nombre = 'disponible'
+        """,
+        """
+        CREATE OR REPLACE VIEW vista_prestamos_activos AS
+        SELECT
+            u.nombre,
+            m.titulo,
+            p.fecha_prestamo,
+            p.fecha_devolucion_prevista
+        FROM prestamo p
+        JOIN usuario u ON p.id_usuario = u.id_usuario
+        JOIN copia c ON p.id_copia = c.id_copia
+        JOIN material m ON c.id_material = m.id_material
+        WHERE p.fecha_devolucion_real IS NULL
+        """,
+    )
+
+
+def _0009_historial_copias(conn):
+    # Tabla particionada por mes en PostgreSQL; el escritor del historial
+    # crea las particiones de meses futuros a medida que las necesita
+    CopiaEvento.__table__.create(conn, checkfirst=True)
+    if _es_postgres(conn):
+        # Los INSERT hechos fuera de SQLAlchemy también toman el id de la secuencia
+        conn.exec_driver_sql(
+            "ALTER TABLE copia_evento ALTER COLUMN id SET DEFAULT nextval('copia_evento_id_seq')"
+        )
+    hoy = date.today()
+    ensure_partitions(conn, [hoy, date(hoy.year + (hoy.month == 12), hoy.month % 12 + 1, 1)])
+
+
+def _0010_vistas_dashboard(conn):
+    # Se crean con datos: la primera apertura del dashboard ya lee agregados
+    if not _es_postgres(conn):
+        return
+    for nombre, (consulta, unica, orden) in VISTAS.items():
+        sql = consulta().compile(dialect=conn.dialect, compile_kwargs={"literal_binds": True})
+        _ejecutar(
+            conn,
+            f"CREATE MATERIALIZED VIEW IF NOT EXISTS {nombre} AS {sql}",
+            # REFRESH ... CONCURRENTLY necesita un índice único
+            f"CREATE UNIQUE INDEX IF NOT EXISTS uq_{nombre} ON {nombre} ({unica})",
+        )
+        if orden:
+            _ejecutar(conn, f"CREATE INDEX IF NOT EXISTS idx_{nombre}_orden ON {nombre} ({orden})")
+
+
+def _0011_saldo_multa(conn):
+    # Las bases creadas antes de esta migración no tienen la tabla
+    SaldoMulta.__table__.create(conn, checkfirst=True)
+    if _es_postgres(conn):
+        _ejecutar(conn, *SALDO_MULTA_DDL)
+
+
+MIGRATIONS = [
+    ("0001_esquema", _0001_esquema),
+    ("0002_datos_referencia", _0002_datos_referencia),
+    ("0003_versiones", _0003_versiones),
+    ("0004_cola_reservas", _0004_cola_reservas),
+    ("0005_multas", _0005_multas),
+    ("0006_restricciones_indices", _0006_restricciones_indices),
+    ("0007_busqueda", _0007_busqueda),
+    ("0008_vistas", _0008_vistas),
+    ("0009_historial_copias", _0009_historial_copias),
+    ("0010_vistas_dashboard", _0010_vistas_dashboard),
+    ("0011_saldo_multa", _0011_saldo_multa),
+]
+
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+
+# ---------------------------
+# Ejecución
+# ---------------------------
+def applied_revisions(conn) -> set:
+    if not inspect(conn).has_table("schema_version"):
+        return set()
+    return set(conn.execute(select(schema_version.c.revision)).scalars())
+
+
+def current_revision(conn):
+    aplicadas = applied_revisions(conn)
+    return max(aplicadas) if aplicadas else None
+
+
+def upgrade(engine) -> list:
+    """
+    Aplica en orden las migraciones pendientes, todas en una transacción.
+    En PostgreSQL un advisory lock evita que dos procesos migren a la vez.
+    Retorna las revisiones aplicadas.
+    """
+    with engine.begin() as conn:
+        if _es_postgres(conn):
+            conn.execute(select(func.pg_advisory_xact_lock(_LOCK_MIGRACIONES)))
+        _metadata.create_all(conn)
+
+        aplicadas = applied_revisions(conn)
+        nuevas = []
+        for revision, migracion in MIGRATIONS:
+            if revision in aplicadas:
+                continue
+            migracion(conn)
+            conn.execute(schema_version.insert().values(revision=revision))
+            nuevas.append(revision)
+    return nuevas
+
+
+def ensure_schema(engine):
+    """
+    Al iniciar: si la base ya está en SCHEMA_VERSION no hace nada más que
+    leer la versión (sin create_all); si no, aplica las migraciones pendientes.
+    """
+    with engine.connect() as conn:
+        if current_revision(conn) == SCHEMA_VERSION:
+            return []
+    return upgrade(engine)
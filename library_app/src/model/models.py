@@ -2,13 +2,15 @@
 import hashlib
 import bcrypt
 from sqlalchemy import (
-    create_engine, Column, Integer, String, Date, DateTime, Text,
-    ForeignKey, Numeric, CheckConstraint, UniqueConstraint
+    create_engine, Column, BigInteger, Integer, String, Date, DateTime, Text,
+    ForeignKey, Numeric, CheckConstraint, UniqueConstraint, Index, Sequence
 )
+from sqlalchemy.engine import make_url
 from sqlalchemy.orm import declarative_base, relationship, sessionmaker
 from sqlalchemy.sql import func
 
 from model.base import Base
+from model.pool import InstrumentedQueuePool
 
 
 class Idioma(Base):
@@ -92,6 +94,10 @@ class Copia(Base):
     formato = Column(String(30), default='fisico')
     fecha_adquisicion = Column(Date, server_default=func.current_date())
 
+    # Control de concurrencia optimista: cada UPDATE/DELETE verifica la versión leída
+    version = Column(Integer, nullable=False, default=1, server_default="1")
+    __mapper_args__ = {"version_id_col": version}
+
     # relaciones
     material = relationship("Material", back_populates="copias")
     estado_rel = relationship("Estado", back_populates="copias")
@@ -104,6 +110,10 @@ class Copia(Base):
 
 class Prestamo(Base):
     __tablename__ = 'prestamo'
+    # Préstamos activos vencidos (job de multas en model/fines.py)
+    __table_args__ = (
+        Index('idx_prestamo_estado_vencimiento', 'estado', 'fecha_devolucion_prevista'),
+    )
     id_prestamo = Column(Integer, primary_key=True)
     id_copia = Column(Integer, ForeignKey('copia.id_copia', ondelete='RESTRICT'))
     id_usuario = Column(Integer, ForeignKey('usuario.id_usuario', ondelete='RESTRICT'))
@@ -112,18 +122,32 @@ class Prestamo(Base):
     fecha_devolucion_real = Column(Date, nullable=True)
     estado = Column(String(20), nullable=False)
 
+    version = Column(Integer, nullable=False, default=1, server_default="1")
+    __mapper_args__ = {"version_id_col": version}
+
     copia = relationship("Copia", back_populates="prestamos")
     usuario = relationship("Usuario", back_populates="prestamos")
     multas = relationship("Multa", back_populates="prestamo")
 
 class Reserva(Base):
     __tablename__ = 'reserva'
+    # Cola FIFO por material: la cabeza es la reserva activa sin copia con menor posición
+    __table_args__ = (
+        Index('idx_reserva_cola', 'id_material', 'estado', 'posicion'),
+    )
     id_reserva = Column(Integer, primary_key=True)
+    id_material = Column(Integer, ForeignKey('material.id_material', ondelete='CASCADE'))
+    # Copia asignada al llegar a la cabeza de la cola (NULL mientras espera)
     id_copia = Column(Integer, ForeignKey('copia.id_copia', ondelete='RESTRICT'))
     id_usuario = Column(Integer, ForeignKey('usuario.id_usuario', ondelete='RESTRICT'))
     fecha_reserva = Column(DateTime, server_default=func.now())
     estado = Column(String(20), nullable=False)
+    posicion = Column(Integer)
+
+    version = Column(Integer, nullable=False, default=1, server_default="1")
+    __mapper_args__ = {"version_id_col": version}
 
+    material = relationship("Material")
     copia = relationship("Copia", back_populates="reservas")
     usuario = relationship("Usuario", back_populates="reservas")
 
@@ -136,6 +160,9 @@ class Movimiento(Base):
     fecha_solicitud = Column(DateTime, server_default=func.now(), nullable=False)
     fecha_devolucion = Column(Date, nullable=False)
     detalle = Column(Text)
+
+    version = Column(Integer, nullable=False, default=1, server_default="1")
+    __mapper_args__ = {"version_id_col": version}
     
     # relaciones
     estado = relationship("Estado", back_populates="movimientos")
@@ -144,6 +171,11 @@ class Movimiento(Base):
 
 class Multa(Base):
     __tablename__ = 'multa'
+    # Una multa por préstamo: el job de multas la actualiza mientras el préstamo siga vencido
+    __table_args__ = (
+        UniqueConstraint('id_prestamo', name='uq_multa_prestamo'),
+        Index('idx_multa_usuario_estado', 'id_usuario', 'estado_pago'),
+    )
     id_multa = Column(Integer, primary_key=True)
     id_prestamo = Column(Integer, ForeignKey('prestamo.id_prestamo', ondelete='RESTRICT'), nullable=False)
     id_copia = Column(Integer, ForeignKey('copia.id_copia', ondelete='RESTRICT'), nullable=False)
@@ -159,9 +191,60 @@ class Multa(Base):
     copia_rel = relationship("Copia")
     usuario = relationship("Usuario")
 
+
+class SaldoMulta(Base):
+    """Resumen por usuario de sus multas pendientes, mantenido por trigger sobre multa (migración 0011)"""
+    __tablename__ = 'saldo_multa'
+    id_usuario = Column(Integer, ForeignKey('usuario.id_usuario', ondelete='CASCADE'), primary_key=True)
+    multas_pendientes = Column(Integer, nullable=False, default=0, server_default="0")
+    monto_pendiente = Column(Numeric(12,2), nullable=False, default=0, server_default="0")
+
+
+
+class CopiaEvento(Base):
+    """
+    Historial de cambios de estado de las copias (solo se agregan filas).
+    En PostgreSQL la tabla está particionada por mes; model/history.py crea
+    las particiones y escribe los eventos por lotes.
+    """
+    __tablename__ = 'copia_evento'
+    __table_args__ = (
+        Index('idx_copia_evento_copia_fecha', 'id_copia', 'fecha'),
+        Index('idx_copia_evento_fecha', 'fecha'),
+        {"postgresql_partition_by": "RANGE (fecha)"},
+    )
+    # La llave de una tabla particionada debe incluir la columna de partición.
+    # En PostgreSQL id sale de la secuencia; en SQLite (sin secuencias) lo asigna el escritor del historial
+    id = Column(BigInteger().with_variant(Integer, "sqlite"), Sequence("copia_evento_id_seq"), primary_key=True)
+    fecha = Column(DateTime, primary_key=True)
+    # Sin FK a copia: el historial se conserva aunque la copia se elimine
+    id_copia = Column(Integer, nullable=False)
+    id_estado_anterior = Column(Integer, nullable=True)
+    id_estado_nuevo = Column(Integer, nullable=False)
+    id_usuario = Column(Integer, nullable=True)
+    operacion = Column(String(100), nullable=True)
+
 # helper to create engine/session externally
-def get_engine(connection_string):
-    return create_engine(connection_string, echo=False, future=True)
+def get_engine(connection_string, pool_size=5, max_overflow=10, pool_timeout=30,
+               pool_recycle=-1, pool_pre_ping=False):
+    """
+    Crea el engine con un pool instrumentado (ver model.pool.get_pool_stats).
+    SQLite conserva el pool por defecto de SQLAlchemy.
+    """
+    if make_url(connection_string).get_backend_name() == "sqlite":
+        return create_engine(connection_string, echo=False, future=True)
+
+    return create_engine(
+        connection_string,
+        echo=False,
+        future=True,
+        poolclass=InstrumentedQueuePool,
+        pool_size=pool_size,
+        max_overflow=max_overflow,
+        pool_timeout=pool_timeout,
+        pool_recycle=pool_recycle,
+        pool_pre_ping=pool_pre_ping,
+    )
 
 def get_session(engine):
     return sessionmaker(bind=engine, autoflush=False, future=True)()
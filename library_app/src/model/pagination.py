@@ -0,0 +1,16 @@
+def keyset_page(query, key_column, after_id=None, limit=None, descending=False):
+    """
+    Paginación por llave (keyset): retorna las filas que siguen a `after_id`
+    en el orden de `key_column`. A diferencia de OFFSET, el costo no crece
+    con el número de página porque la base usa el índice de la llave.
+    Sin `limit` retorna todas las filas restantes.
+    """
+    if after_id is not None:
+        query = query.filter(key_column < after_id if descending else key_column > after_id)
+
+    query = query.order_by(key_column.desc() if descending else key_column.asc())
+
+    if limit:
+        query = query.limit(limit)
+
+    return query.all()
@@ -0,0 +1,66 @@
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+import bcrypt
+from dotenv import load_dotenv
+
+
+load_dotenv()
+
+# Factor de costo de bcrypt (2^rounds iteraciones) y tamaño del pool de procesos
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+PASSWORD_WORKERS = int(os.getenv("PASSWORD_WORKERS", str(os.cpu_count() or 1)))
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor():
+    """Pool de procesos compartido, creado la primera vez que se necesita"""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ProcessPoolExecutor(max_workers=PASSWORD_WORKERS)
+        return _executor
+
+
+def shutdown():
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=False, cancel_futures=True)
+            _executor = None
+
+
+# Funciones que corren en los procesos del pool (deben ser de nivel de módulo)
+def _hash(password: str, rounds: int) -> str:
+    salt = bcrypt.gensalt(rounds=rounds)
+    return bcrypt.hashpw(password.encode('utf-8'), salt).decode('utf-8')
+
+
+def _check(password: str, password_hash: str) -> bool:
+    return bcrypt.checkpw(password.encode('utf-8'), password_hash.encode('utf-8'))
+
+
+def hash_rounds(password_hash: str):
+    """Factor de costo guardado en un hash bcrypt ($2b$12$...), o None si no se reconoce"""
+    try:
+        return int(password_hash.split("$")[2])
+    except (AttributeError, IndexError, ValueError):
+        return None
+
+
+def needs_rehash(password_hash: str) -> bool:
+    """True si el hash se generó con un costo distinto del configurado en BCRYPT_ROUNDS"""
+    return hash_rounds(password_hash) != BCRYPT_ROUNDS
+
+
+# ---- API síncrona: el hilo que llama espera, pero el cálculo ocurre en otro proceso ----
+def hash_password(password: str, rounds: int = None) -> str:
+    return _get_executor().submit(_hash, password, rounds or BCRYPT_ROUNDS).result()
+
+
+def check_password(password: str, password_hash: str) -> bool:
+    return _get_executor().submit(_check, password, password_hash).result()
+
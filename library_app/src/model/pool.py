@@ -0,0 +1,105 @@
+import bisect
+import logging
+import os
+import threading
+import time
+
+from sqlalchemy.pool import QueuePool
+
+
+logger = logging.getLogger(__name__)
+
+# Segundos entre cada línea de log con las métricas del pool (0 = deshabilitado)
+POOL_STATS_INTERVAL = int(os.getenv("POOL_STATS_INTERVAL", "60"))
+
+
+class PoolStats:
+    """
+    Métricas del pool de conexiones: conexiones en uso, overflow,
+    tiempo de espera acumulado e histograma de latencia de checkout.
+    """
+
+    # Límites superiores de cada cubeta del histograma, en milisegundos
+    BUCKETS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 5000)
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.histogram = [0] * (len(self.BUCKETS_MS) + 1)
+
+    def record_wait(self, segundos: float):
+        ms = segundos * 1000
+        with self._lock:
+            self.checkouts += 1
+            self.wait_total += segundos
+            self.wait_max = max(self.wait_max, segundos)
+            self.histogram[bisect.bisect_left(self.BUCKETS_MS, ms)] += 1
+
+    def record_timeout(self):
+        with self._lock:
+            self.timeouts += 1
+
+    def snapshot(self, pool):
+        """Retorna un diccionario con el estado actual del pool y las métricas acumuladas"""
+        with self._lock:
+            etiquetas = [f"<={b}ms" for b in self.BUCKETS_MS] + [f">{self.BUCKETS_MS[-1]}ms"]
+            return {
+                "size": pool.size(),
+                "checked_out": pool.checkedout(),
+                "checked_in": pool.checkedin(),
+                "overflow": pool.overflow(),
+                "checkouts": self.checkouts,
+                "timeouts": self.timeouts,
+                "wait_total_s": round(self.wait_total, 4),
+                "wait_avg_ms": round(self.wait_total * 1000 / self.checkouts, 3) if self.checkouts else 0.0,
+                "wait_max_ms": round(self.wait_max * 1000, 3),
+                "checkout_latency_histogram": dict(zip(etiquetas, self.histogram)),
+            }
+
+
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool que mide cuánto espera cada checkout por una conexión libre"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.stats = PoolStats()
+
+    def _do_get(self):
+        inicio = time.perf_counter()
+        try:
+            conexion = super()._do_get()
+        except Exception:
+            self.stats.record_timeout()
+            raise
+        self.stats.record_wait(time.perf_counter() - inicio)
+        return conexion
+
+    def recreate(self):
+        nuevo = super().recreate()
+        nuevo.stats = self.stats
+        return nuevo
+
+
+def get_pool_stats(engine):
+    """Métricas del pool de un engine creado con get_engine, o None si no está instrumentado"""
+    stats = getattr(engine.pool, "stats", None)
+    if stats is None:
+        return None
+    return stats.snapshot(engine.pool)
+
+
+def log_pool_stats(session):
+    """Escribe en el log las métricas del pool del engine de la sesión (sin pedir una conexión)"""
+    stats = get_pool_stats(session.get_bind())
+    if stats is None:
+        return
+    logger.info(
+        "pool: en_uso=%s libres=%s overflow=%s checkouts=%s timeouts=%s "
+        "espera_prom=%sms espera_max=%sms histograma=%s",
+        stats["checked_out"], stats["checked_in"], stats["overflow"], stats["checkouts"],
+        stats["timeouts"], stats["wait_avg_ms"], stats["wait_max_ms"],
+        stats["checkout_latency_histogram"],
+    )
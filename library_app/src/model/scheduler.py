@@ -0,0 +1,41 @@
+import logging
+import threading
+
+
+logger = logging.getLogger(__name__)
+
+
+class PeriodicJob:
+    """
+    Ejecuta `job(session)` cada `interval` segundos en un hilo de fondo, con
+    una sesión nueva en cada corrida. Con `interval` <= 0 no hace nada.
+    """
+
+    def __init__(self, name: str, session_factory, job, interval: int):
+        self.name = name
+        self.session_factory = session_factory
+        self.job = job
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self.interval <= 0 or self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        while not self._stop.is_set():
+            session = self.session_factory()
+            try:
+                self.job(session)
+            except Exception:
+                session.rollback()
+                logger.exception("Error en la tarea %s", self.name)
+            finally:
+                session.close()
+            self._stop.wait(self.interval)
@@ -0,0 +1,235 @@
+import bisect
+import re
+import threading
+import unicodedata
+from collections import defaultdict
+
+from sqlalchemy import Float, Integer, case, event, false, func, literal, literal_column, select, union
+from sqlalchemy.orm import Session
+
+from model.models import Material, MaterialAutor, Autor
+
+
+# Expresión indexada en PostgreSQL (ver la migración 0007_busqueda en model/migrations.py);
+# debe coincidir exactamente con la del índice idx_material_fts
+def _documento_material():
+    return func.to_tsvector(
+        literal_column("'simple'"),
+        Material.titulo.op("||")(literal_column("' '")).op("||")(
+            func.coalesce(Material.descripcion, literal_column("''"))
+        ),
+    )
+
+
+def normalizar(texto: str) -> str:
+    """Minúsculas y sin tildes, para comparar 'años' con 'anos'"""
+    texto = unicodedata.normalize("NFKD", texto or "")
+    return "".join(c for c in texto if not unicodedata.combining(c)).lower()
+
+
+def tokenizar(texto: str):
+    return [t for t in re.split(r"\W+", normalizar(texto)) if t]
+
+
+def texto_isbn(isbn: str) -> str:
+    """ISBN tal cual y solo con dígitos, para que '978-84' y '97884' coincidan"""
+    return f"{isbn or ''} {re.sub(r'[^0-9Xx]', '', isbn or '')}"
+
+
+class InvertedIndex:
+    """
+    Índice invertido en memoria sobre título, descripción, autores e ISBN.
+    Se usa cuando la base no es PostgreSQL (por ejemplo SQLite en pruebas).
+    Los términos de la consulta se buscan por prefijo para soportar
+    búsqueda mientras se escribe.
+    """
+
+    PESOS = {"titulo": 3.0, "isbn": 3.0, "autor": 2.0, "descripcion": 1.0}
+
+    def __init__(self):
+        self._postings = defaultdict(dict)  # termino -> {id_material: peso}
+        self._terminos = []
+
+    def build(self, session: Session):
+        autores = defaultdict(list)
+        filas = (
+            session.query(MaterialAutor.id_material, Autor.nombre)
+            .join(Autor, MaterialAutor.id_autor == Autor.id_autor)
+            .all()
+        )
+        for id_material, nombre in filas:
+            autores[id_material].append(nombre)
+
+        materiales = session.query(
+            Material.id_material, Material.titulo, Material.descripcion, Material.isbn
+        ).all()
+        for id_material, titulo, descripcion, isbn in materiales:
+            campos = {
+                "titulo": titulo,
+                "descripcion": descripcion,
+                "autor": " ".join(autores[id_material]),
+                "isbn": texto_isbn(isbn),
+            }
+            for campo, texto in campos.items():
+                for termino in tokenizar(texto):
+                    posting = self._postings[termino]
+                    posting[id_material] = max(posting.get(id_material, 0.0), self.PESOS[campo])
+
+        self._terminos = sorted(self._postings)
+
+    def _coincidencias(self, termino: str):
+        """{id_material: puntaje} para los términos que empiezan por `termino`"""
+        resultado = {}
+        i = bisect.bisect_left(self._terminos, termino)
+        while i < len(self._terminos) and self._terminos[i].startswith(termino):
+            indexado = self._terminos[i]
+            factor = 1.0 if indexado == termino else 0.5
+            for id_material, peso in self._postings[indexado].items():
+                resultado[id_material] = max(resultado.get(id_material, 0.0), peso * factor)
+            i += 1
+        return resultado
+
+    def search(self, texto: str):
+        """Lista de (id_material, puntaje) que contienen todos los términos, ordenada por puntaje"""
+        terminos = tokenizar(texto)
+        if not terminos:
+            return []
+
+        puntajes = None
+        for termino in terminos:
+            coincidencias = self._coincidencias(termino)
+            if puntajes is None:
+                puntajes = coincidencias
+            else:
+                puntajes = {
+                    id_material: puntaje + coincidencias[id_material]
+                    for id_material, puntaje in puntajes.items()
+                    if id_material in coincidencias
+                }
+            if not puntajes:
+                return []
+
+        return sorted(puntajes.items(), key=lambda item: (-item[1], item[0]))
+
+
+class MaterialSearch:
+    """
+    Búsqueda ordenada por relevancia sobre materiales.
+    En PostgreSQL usa pg_trgm y tsvector; en otros motores usa un
+    índice invertido en memoria que se reconstruye cuando cambia el catálogo.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._index = None
+        self._bind = None
+
+    def invalidate(self):
+        with self._lock:
+            self._index = None
+
+    def _inverted_index(self, session: Session):
+        bind = session.get_bind()
+        with self._lock:
+            if self._index is None or self._bind is not bind:
+                index = InvertedIndex()
+                index.build(session)
+                self._index = index
+                self._bind = bind
+            return self._index
+
+    @staticmethod
+    def full_text(session: Session) -> bool:
+        """True si la búsqueda usa tsvector/pg_trgm en la base en lugar del índice en memoria"""
+        return session.get_bind().dialect.name == "postgresql"
+
+    def _postgres_ranking(self, texto: str):
+        patron = f"%{texto}%"
+        consulta = func.plainto_tsquery(literal_column("'simple'"), texto)
+        documento = _documento_material()
+
+        rank = (
+            func.greatest(
+                func.similarity(Material.titulo, texto),
+                func.coalesce(func.max(func.similarity(Autor.nombre, texto)), 0),
+                func.ts_rank(documento, consulta),
+            )
+            + case((Material.isbn == texto, 1.0), else_=0.0)
+        )
+
+        # Cada rama filtra una sola tabla para que use su propio índice GIN
+        candidatos = union(
+            select(Material.id_material).where(
+                Material.titulo.ilike(patron)
+                | Material.isbn.ilike(patron)
+                | documento.op("@@")(consulta)
+            ),
+            select(MaterialAutor.id_material)
+            .join(Autor, Autor.id_autor == MaterialAutor.id_autor)
+            .where(Autor.nombre.ilike(patron)),
+        )
+
+        return (
+            select(Material.id_material.label("id_material"), rank.label("rank"))
+            .select_from(Material)
+            .outerjoin(MaterialAutor, MaterialAutor.id_material == Material.id_material)
+            .outerjoin(Autor, Autor.id_autor == MaterialAutor.id_autor)
+            .where(Material.id_material.in_(candidatos))
+            .group_by(Material.id_material)
+            .subquery("busqueda")
+        )
+
+    def ranking(self, session: Session, texto: str):
+        """
+        Subconsulta (id_material, rank) con los materiales que coinciden con `texto`.
+        Se puede unir a cualquier consulta sobre material y ordenar por rank.
+        """
+        texto = (texto or "").strip()
+
+        if self.full_text(session):
+            return self._postgres_ranking(texto)
+
+        resultados = self._inverted_index(session).search(texto)
+        if not resultados:
+            return (
+                select(
+                    literal(0, Integer).label("id_material"),
+                    literal(0.0, Float).label("rank"),
+                )
+                .where(false())
+                .subquery("busqueda")
+            )
+
+        puntajes = dict(resultados)
+        return (
+            select(
+                Material.id_material.label("id_material"),
+                case(puntajes, value=Material.id_material, else_=0.0).label("rank"),
+            )
+            .where(Material.id_material.in_(list(puntajes)))
+            .subquery("busqueda")
+        )
+
+
+material_search = MaterialSearch()
+
+
+_MODELOS_CATALOGO = (Material, MaterialAutor, Autor)
+
+
+@event.listens_for(Session, "after_flush")
+def _marcar_cambios_catalogo(session, flush_context):
+    cambios = list(session.new) + list(session.dirty) + list(session.deleted)
+    if any(isinstance(obj, _MODELOS_CATALOGO) for obj in cambios):
+        session.info["catalogo_modificado"] = True
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidar_indice(session):
+    if session.info.pop("catalogo_modificado", False):
+        material_search.invalidate()
+
+
+@event.listens_for(Session, "after_rollback")
+def _descartar_marca_catalogo(session):
+    session.info.pop("catalogo_modificado", None)
@@ -0,0 +1,100 @@
+import functools
+from contextlib import contextmanager
+
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.exc import StaleDataError
+
+
+class ConflictError(Exception):
+    """Otro usuario modificó el registro (control de concurrencia optimista por versión)"""
+
+    def __init__(self, message="El registro fue modificado por otro usuario. Se recargaron los datos; intente de nuevo."):
+        super().__init__(message)
+
+
+def check_version(obj, version):
+    """
+    Compara la versión que vio el usuario al abrir la pantalla con la del
+    registro recién leído; si otro usuario lo cambió entretanto, ConflictError.
+    """
+    if version is not None and obj.version != version:
+        raise ConflictError()
+
+
+@contextmanager
+def transaction(session: Session):
+    """
+    Unidad de trabajo sobre una sesión existente: confirma al salir y
+    revierte ante cualquier error. Los bloques anidados se integran en
+    la transacción del bloque externo. Un conflicto de versión se reporta
+    como ConflictError.
+    """
+    profundidad = session.info.get("tx_depth", 0)
+    session.info["tx_depth"] = profundidad + 1
+    try:
+        yield session
+        if profundidad == 0:
+            session.commit()
+    except StaleDataError as e:
+        if profundidad == 0:
+            session.rollback()
+            raise ConflictError() from e
+        raise
+    except Exception:
+        if profundidad == 0:
+            session.rollback()
+        raise
+    finally:
+        session.info["tx_depth"] = profundidad
+        if profundidad == 0:
+            session.info.pop("operacion", None)
+
+
+@contextmanager
+def session_scope(session_factory):
+    """Crea una sesión de corta vida para un trabajo puntual y la cierra al terminar"""
+    session = session_factory()
+    try:
+        with transaction(session):
+            yield session
+    finally:
+        session.close()
+
+
+@contextmanager
+def read_scope(bind):
+    """
+    Sesión de corta vida para lecturas hechas fuera del hilo del handler (una
+    Session no es thread-safe). No confirma nada: al cerrarse, los objetos
+    leídos quedan desconectados con sus atributos ya cargados.
+    """
+    session = Session(bind=bind)
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+def transactional(method):
+    """
+    Ejecuta un método de controlador dentro de una transacción sobre self.session.
+    El nombre del método externo queda en session.info["operacion"] (historial de copias).
+    """
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with transaction(self.session):
+            self.session.info.setdefault("operacion", method.__qualname__)
+            return method(self, *args, **kwargs)
+    return wrapper
+
+
+def release_identity_map(session: Session):
+    """
+    Cierra la transacción de lectura: la conexión vuelve al pool y los
+    objetos cargados se expiran, para que la siguiente lectura traiga datos
+    frescos y el mapa de identidad no retenga filas de pantallas anteriores.
+    No hace nada si hay cambios sin confirmar o un bloque transaction() abierto.
+    """
+    if session.new or session.dirty or session.deleted or session.info.get("tx_depth"):
+        return
+    session.rollback()
@@ -3,14 +3,13 @@ from sqlalchemy import *
 from sqlalchemy.orm import  relationship, sessionmaker
 from sqlalchemy.sql import func
 from model.base import Base
-
-import bcrypt
+from model import passwords
 
 
 class Usuario(Base):
     __tablename__ = 'usuario'
     id_usuario = Column(Integer, primary_key=True)
-    nombre = Column(String(100), nullable=False)
+    nombre = Column(String(100), nullable=False, unique=True, index=True)
     correo = Column(String(150), nullable=False, unique=True)
     fecha_registro = Column(Date, server_default=func.current_date())
     password_hash = Column(String(200), nullable=True)
@@ -27,13 +26,12 @@ class Usuario(Base):
 
 
     def set_password(self, password: str):
-        """Genera un hash seguro con bcrypt."""
-        salt = bcrypt.gensalt()
-        self.password_hash = bcrypt.hashpw(password.encode('utf-8'), salt).decode('utf-8')
+        """Genera un hash seguro con bcrypt (calculado en el pool de procesos)."""
+        self.password_hash = passwords.hash_password(password)
 
     def check_password(self, password: str) -> bool:
-        """Verifica la contraseña usando bcrypt."""
+        """Verifica la contraseña usando bcrypt (calculado en el pool de procesos)."""
         if not self.password_hash:
             return False
 
-        return bcrypt.checkpw(password.encode('utf-8'), self.password_hash.encode('utf-8'))
+        return passwords.check_password(password, self.password_hash)
@@ -0,0 +1,37 @@
+"""
+Genera o actualiza las multas de todos los préstamos activos vencidos.
+
+Pensado para correr periódicamente (cron, tarea programada):
+    python scripts/accrue_fines.py
+    python scripts/accrue_fines.py --fecha 2025-03-01
+"""
+import sys
+import os
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(BASE_DIR)
+
+import argparse
+import time
+from datetime import date
+
+from model.db import SessionLocal
+from model.fines import accrue_overdue_fines
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Job de multas por atraso")
+    parser.add_argument("--fecha", type=date.fromisoformat, default=None,
+                        help="Fecha de corte (por defecto, hoy)")
+    args = parser.parse_args()
+
+    session = SessionLocal()
+    try:
+        inicio = time.perf_counter()
+        escritas = accrue_overdue_fines(session, args.fecha)
+        print(f"Multas actualizadas: {escritas} en {time.perf_counter() - inicio:.2f}s")
+    finally:
+        session.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""
+Mide el arranque en frío de la app, cada medición en un intérprete nuevo:
+
+  1. import app             (lo que corre antes de que Flet sirva páginas)
+  2. imports de /login      (controlador de autenticación, vista de login y model.db)
+  3. servidor listo         (desde lanzar app.py hasta que responde HTTP en APP_PORT)
+
+    python scripts/bench_startup.py
+    python scripts/bench_startup.py --repeticiones 10 --objetivo 1.0
+
+Retorna 1 si el servidor tarda más que --objetivo segundos en estar listo.
+"""
+import sys
+import os
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(BASE_DIR)
+
+import argparse
+import socket
+import statistics
+import subprocess
+import time
+import urllib.request
+
+
+IMPORT_APP = "import app"
+IMPORT_LOGIN = (
+    "import app\n"
+    "from controllers.authControllers import AuthController\n"
+    "from view.loginView import LoginView\n"
+    "from model.db import SessionLocal\n"
+)
+
+
+def medir_import(codigo: str, repeticiones: int) -> float:
+    """Mediana de segundos que tarda un intérprete nuevo en ejecutar `codigo`"""
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        subprocess.run([sys.executable, "-c", codigo], cwd=BASE_DIR, check=True)
+        tiempos.append(time.perf_counter() - inicio)
+    return statistics.median(tiempos)
+
+
+def puerto_libre() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def medir_servidor(timeout: float) -> float:
+    """Segundos desde lanzar app.py hasta la primera respuesta HTTP"""
+    puerto = puerto_libre()
+    entorno = dict(os.environ, APP_PORT=str(puerto), BROWSER="true")
+    inicio = time.perf_counter()
+    proceso = subprocess.Popen(
+        [sys.executable, "app.py"], cwd=BASE_DIR, env=entorno,
+        stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+    )
+    try:
+        while time.perf_counter() - inicio < timeout:
+            if proceso.poll() is not None:
+                raise Exception(f"app.py terminó: {proceso.stderr.read().decode(errors='replace')[-500:]}")
+            try:
+                urllib.request.urlopen(f"http://127.0.0.1:{puerto}/", timeout=1)
+                return time.perf_counter() - inicio
+            except OSError:
+                time.sleep(0.02)
+        raise Exception(f"El servidor no respondió en {timeout}s")
+    finally:
+        proceso.terminate()
+        proceso.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de arranque de la app")
+    parser.add_argument("--repeticiones", type=int, default=5)
+    parser.add_argument("--objetivo", type=float, default=1.0, help="Segundos máximos hasta servir /login")
+    parser.add_argument("--timeout", type=float, default=30.0)
+    args = parser.parse_args()
+
+    print(f"import app:          {medir_import(IMPORT_APP, args.repeticiones):.3f}s")
+    print(f"imports de /login:   {medir_import(IMPORT_LOGIN, args.repeticiones):.3f}s")
+
+    try:
+        listo = statistics.median(medir_servidor(args.timeout) for _ in range(args.repeticiones))
+    except Exception as e:
+        print("No se pudo medir el servidor:", e)
+        return 1
+
+    print(f"servidor listo:      {listo:.3f}s (objetivo {args.objetivo:.1f}s)")
+    return 0 if listo <= args.objetivo else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,69 @@
+"""
+Verifica que las tres implementaciones de la tabla de multas coincidan:
+monto_multa (escalar), montos_multa (vectorizada) y monto_multa_sql (CASE).
+
+Por defecto evalúa el CASE en SQLite en memoria; con --db usa DATABASE_URL.
+    python scripts/check_fine_rules.py --max-dias 3650
+"""
+import sys
+import os
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(BASE_DIR)
+
+import argparse
+import time
+
+from sqlalchemy import create_engine, literal, select
+
+from model import fines
+
+
+def montos_sql(engine, max_dias: int):
+    """Evalúa el CASE sobre la serie 0..max_dias en una sola consulta"""
+    serie = select(literal(0).label("d")).cte("serie", recursive=True)
+    serie = serie.union_all(select(serie.c.d + 1).where(serie.c.d < max_dias))
+    consulta = select(serie.c.d, fines.monto_multa_sql(serie.c.d)).order_by(serie.c.d)
+    with engine.connect() as conn:
+        return [float(monto) for _, monto in conn.execute(consulta)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Verificación de la tabla de multas")
+    parser.add_argument("--max-dias", type=int, default=3650)
+    parser.add_argument("--db", action="store_true", help="Evaluar el CASE en DATABASE_URL")
+    args = parser.parse_args()
+
+    dias = list(range(0, args.max_dias + 1))
+
+    inicio = time.perf_counter()
+    escalar = [fines.monto_multa(d) for d in dias]
+    t_escalar = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    vectorizada = [float(m) for m in fines.montos_multa(dias)]
+    t_vectorizada = time.perf_counter() - inicio
+
+    if args.db:
+        from model.db import engine
+    else:
+        engine = create_engine("sqlite://")
+    sql = montos_sql(engine, args.max_dias)
+
+    errores = 0
+    for nombre, valores in (("vectorizada", vectorizada), ("sql", sql)):
+        diferencias = [(d, e, v) for d, e, v in zip(dias, escalar, valores) if e != v]
+        if len(valores) != len(escalar):
+            print(f"{nombre}: {len(valores)} valores, se esperaban {len(escalar)}")
+            errores += 1
+        for d, e, v in diferencias[:10]:
+            print(f"{nombre}: {d} días -> {v}, se esperaba {e}")
+        errores += len(diferencias)
+
+    motor = "NumPy" if fines.numpy_module() is not None else "Python puro"
+    print(f"Escalar: {t_escalar * 1000:.1f} ms  Vectorizada ({motor}): {t_vectorizada * 1000:.1f} ms")
+    print("OK: las tres implementaciones coinciden" if not errores else f"FALLO: {errores} diferencias")
+    return 0 if not errores else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
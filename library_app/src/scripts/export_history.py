@@ -0,0 +1,43 @@
+"""
+Exporta préstamos, multas y movimientos (con usuario y material) a CSV o
+Parquet, leyendo por bloques con un cursor del lado del servidor.
+
+    python scripts/export_history.py --anio 2024
+    python scripts/export_history.py --anio 2024 --formato parquet --tablas prestamos multas
+"""
+import sys
+import os
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(BASE_DIR)
+
+import argparse
+import time
+
+from model.db import SessionLocal
+from model.export import EXPORTS, export_table
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Exportación del historial para auditoría")
+    parser.add_argument("--anio", type=int, default=None, help="Año a exportar (por defecto, todo)")
+    parser.add_argument("--formato", choices=["csv", "parquet"], default="csv")
+    parser.add_argument("--tablas", nargs="+", choices=list(EXPORTS), default=list(EXPORTS))
+    parser.add_argument("--destino", default=".", help="Carpeta de salida")
+    parser.add_argument("--bloque", type=int, default=10000, help="Filas por bloque")
+    args = parser.parse_args()
+
+    os.makedirs(args.destino, exist_ok=True)
+    session = SessionLocal()
+    try:
+        for nombre in args.tablas:
+            sufijo = f"_{args.anio}" if args.anio else ""
+            ruta = os.path.join(args.destino, f"{nombre}{sufijo}.{args.formato}")
+            inicio = time.perf_counter()
+            filas = export_table(session, nombre, ruta, args.formato, args.anio, args.bloque)
+            print(f"{ruta}: {filas} filas en {time.perf_counter() - inicio:.1f}s")
+    finally:
+        session.close()
+
+
+if __name__ == "__main__":
+    main()
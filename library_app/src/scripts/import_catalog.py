@@ -0,0 +1,51 @@
+"""
+Importa un catálogo completo (materiales, autores, idiomas y copias) desde
+CSV o JSON lines con campos MARC, por lotes y con punto de control.
+
+    python scripts/import_catalog.py catalogo.csv
+    python scripts/import_catalog.py catalogo.jsonl --lote 5000
+
+Si el proceso falla, volver a ejecutarlo con el mismo --checkpoint reanuda
+desde el último lote confirmado. Los materiales ya existentes (mismo ISBN,
+o mismo título y año) se omiten.
+"""
+import sys
+import os
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(BASE_DIR)
+
+import argparse
+
+from model.db import SessionLocal
+from model.catalog_import import CatalogImporter, read_records
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Importación masiva del catálogo")
+    parser.add_argument("archivo", help="Archivo .csv o .jsonl")
+    parser.add_argument("--formato", choices=["csv", "jsonl"], default=None,
+                        help="Por defecto se deduce de la extensión")
+    parser.add_argument("--lote", type=int, default=1000, help="Registros por transacción")
+    parser.add_argument("--checkpoint", default=None,
+                        help="Archivo del punto de control (por defecto <archivo>.checkpoint)")
+    args = parser.parse_args()
+
+    checkpoint = args.checkpoint or args.archivo + ".checkpoint"
+    session = SessionLocal()
+    try:
+        importador = CatalogImporter(session, batch_size=args.lote, checkpoint=checkpoint)
+        stats = importador.run(read_records(args.archivo, args.formato))
+    finally:
+        session.close()
+
+    print(
+        f"Importación terminada: {stats['materiales']} materiales, {stats['copias']} copias, "
+        f"{stats['duplicados']} duplicados, {stats['rechazados']} rechazados "
+        f"en {stats['segundos']:.1f}s"
+    )
+    if os.path.exists(checkpoint):
+        os.remove(checkpoint)
+
+
+if __name__ == "__main__":
+    main()
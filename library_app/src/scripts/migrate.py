@@ -0,0 +1,46 @@
+"""
+Aplica las migraciones pendientes del esquema y los datos de referencia
+(estados y roles). Es idempotente: sin pendientes no hace nada.
+
+    python scripts/migrate.py
+    python scripts/migrate.py --estado
+"""
+import sys
+import os
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(BASE_DIR)
+
+import argparse
+
+from sqlalchemy import create_engine
+from dotenv import load_dotenv
+
+from model.migrations import MIGRATIONS, applied_revisions, upgrade
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Migraciones del esquema")
+    parser.add_argument("--estado", action="store_true", help="Solo listar las revisiones y su estado")
+    args = parser.parse_args()
+
+    # Conexión directa: importar model.db ya migraría al iniciar
+    load_dotenv()
+    if not os.getenv("DATABASE_URL"):
+        raise RuntimeError("ERROR: No se pudo construir la URL de la base de datos")
+    engine = create_engine(os.getenv("DATABASE_URL"))
+
+    if args.estado:
+        with engine.connect() as conn:
+            aplicadas = applied_revisions(conn)
+        for revision, _ in MIGRATIONS:
+            print(f"[{'x' if revision in aplicadas else ' '}] {revision}")
+        return
+
+    nuevas = upgrade(engine)
+    for revision in nuevas:
+        print(f"Aplicada {revision}")
+    print("Esquema al día" if not nuevas else f"{len(nuevas)} migraciones aplicadas")
+
+
+if __name__ == "__main__":
+    main()
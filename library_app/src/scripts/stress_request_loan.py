@@ -0,0 +1,149 @@
+"""
+Prueba de estrés de StudentController.request_loan.
+
+Lanza N solicitudes de préstamo en paralelo (un hilo y una sesión por
+solicitud) sobre un material temporal con K copias disponibles y verifica que
+ninguna copia quede asignada dos veces y que se asignen exactamente min(N, K).
+Si la verificación falla termina con código de salida 1.
+
+Uso:
+    python scripts/stress_request_loan.py --solicitantes 50 --copias 10
+"""
+import sys
+import os
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(BASE_DIR)
+
+import argparse
+import threading
+import time
+import uuid
+from collections import Counter
+
+from model.db import SessionLocal
+from model.models import Material, Copia, Movimiento
+from model.usuario import Usuario
+from model.cache import reference_cache
+from controllers.studentController import StudentController
+
+
+def preparar(copias: int):
+    """Crea un usuario y un material temporales con `copias` copias disponibles"""
+    sufijo = uuid.uuid4().hex[:8]
+    session = SessionLocal()
+    try:
+        id_disponible = reference_cache.estado_id(session, "disponible")
+        if not id_disponible:
+            raise Exception("No se encontró el estado 'disponible' (ejecute scripts/migrate.py)")
+
+        usuario = Usuario(nombre=f"stress_{sufijo}", correo=f"stress_{sufijo}@example.com")
+        material = Material(titulo=f"Stress {sufijo}", tipo_material="Libro")
+        session.add_all([usuario, material])
+        session.flush()
+
+        session.add_all([
+            Copia(id_material=material.id_material, codigo_copia=f"ST-{sufijo}-{i}", id_estado=id_disponible)
+            for i in range(copias)
+        ])
+        session.commit()
+        return usuario.id_usuario, material.id_material
+    finally:
+        session.close()
+
+
+def limpiar(id_usuario: int, id_material: int):
+    session = SessionLocal()
+    try:
+        ids_copias = [c.id_copia for c in session.query(Copia.id_copia).filter_by(id_material=id_material)]
+        session.query(Movimiento).filter(Movimiento.id_copia.in_(ids_copias)).delete(synchronize_session=False)
+        session.query(Copia).filter_by(id_material=id_material).delete(synchronize_session=False)
+        session.query(Material).filter_by(id_material=id_material).delete(synchronize_session=False)
+        session.query(Usuario).filter_by(id_usuario=id_usuario).delete(synchronize_session=False)
+        session.commit()
+    finally:
+        session.close()
+
+
+def ejecutar(solicitantes: int, id_usuario: int, id_material: int):
+    """Lanza las solicitudes a la vez y retorna (asignadas, rechazadas, errores)"""
+    barrera = threading.Barrier(solicitantes)
+    lock = threading.Lock()
+    asignadas, rechazadas, errores = [], [], []
+
+    def solicitar():
+        session = SessionLocal()
+        try:
+            barrera.wait()
+            movimiento = StudentController(session).request_loan(id_material, id_usuario, 7)
+            with lock:
+                asignadas.append(movimiento.id_copia)
+        except Exception as e:
+            with lock:
+                if str(e) == "No hay copias disponibles":
+                    rechazadas.append(e)
+                else:
+                    errores.append(e)
+        finally:
+            session.close()
+
+    hilos = [threading.Thread(target=solicitar) for _ in range(solicitantes)]
+    for h in hilos:
+        h.start()
+    for h in hilos:
+        h.join()
+
+    return asignadas, rechazadas, errores
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Prueba de estrés de asignación de copias")
+    parser.add_argument("--solicitantes", type=int, default=50)
+    parser.add_argument("--copias", type=int, default=10)
+    args = parser.parse_args()
+
+    id_usuario, id_material = preparar(args.copias)
+    try:
+        inicio = time.perf_counter()
+        asignadas, rechazadas, errores = ejecutar(args.solicitantes, id_usuario, id_material)
+        duracion = time.perf_counter() - inicio
+
+        # Verificación contra la base: cada copia con a lo sumo un movimiento
+        session = SessionLocal()
+        try:
+            movimientos = (
+                session.query(Movimiento.id_copia)
+                .join(Copia, Copia.id_copia == Movimiento.id_copia)
+                .filter(Copia.id_material == id_material)
+                .all()
+            )
+        finally:
+            session.close()
+
+        por_copia = Counter(id_copia for (id_copia,) in movimientos)
+        duplicadas = {c: n for c, n in por_copia.items() if n > 1}
+        # Verificación de lo que recibió cada solicitante: dos no pueden llevarse la misma copia
+        entregadas = Counter(asignadas)
+        repetidas = {c: n for c, n in entregadas.items() if n > 1}
+        esperadas = min(args.solicitantes, args.copias)
+
+        print(f"Solicitudes: {args.solicitantes}  Copias: {args.copias}  Tiempo: {duracion:.2f}s")
+        print(f"Asignadas: {len(asignadas)}  Sin copia: {len(rechazadas)}  Errores: {len(errores)}")
+        for e in errores[:5]:
+            print(f"  Error: {e}")
+
+        ok = (
+            not duplicadas and not repetidas and not errores
+            and len(por_copia) == esperadas == len(entregadas) == len(asignadas)
+        )
+        if duplicadas:
+            print(f"Copias asignadas más de una vez: {duplicadas}")
+        if repetidas:
+            print(f"Copias entregadas a más de un solicitante: {repetidas}")
+        print("OK: sin asignaciones duplicadas" if ok else "FALLO")
+        return 0 if ok else 1
+    finally:
+        limpiar(id_usuario, id_material)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
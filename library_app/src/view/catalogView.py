@@ -2,9 +2,15 @@ import flet as ft
 from sqlalchemy.orm import Session
 from model.models import Copia, Material, Estado
 from controllers.studentController import StudentController
+from model.cache import reference_cache
+from model.search import material_search, texto_isbn
+from view.debouncedSearch import DebouncedSearch, contains_all_terms
 
 
 class CatalogView(ft.Column):
+    # Tablas que muestra la pestaña; su cambio invalida la vista en caché
+    TABLAS = ("material", "copia", "reserva", "autor", "material_autor")
+
     def __init__(self, session: Session, page: ft.Page, user):
         super().__init__()
         self.session = session
@@ -13,9 +19,17 @@ class CatalogView(ft.Column):
         self.controller = StudentController(session)
         
         # Controles de búsqueda
+        # Con texto completo de PostgreSQL (palabras completas, orden por relevancia)
+        # el filtro en memoria no coincide con la consulta: siempre se vuelve a consultar
+        self.search = DebouncedSearch(
+            session,
+            search=self.search_materials,
+            render=self.render_materials,
+            refine=None if material_search.full_text(session) else self.refine_materials,
+        )
         self.search_field = ft.TextField(
             hint_text="Buscar por título o autor...",
-            on_change=self.search_materials,
+            on_change=self.search.on_change,
             expand=True
         )
         
@@ -45,15 +59,18 @@ class CatalogView(ft.Column):
     
     def load_available_materials(self):
         """Carga todos los materiales que tienen copias disponibles o prestadas"""
+        self.search.reset()
+        self.render_materials(self.controller.get_all_materials_with_copies())
+    
+    def render_materials(self, materiales_info):
+        """Dibuja la tabla con los materiales y sus conteos de copias"""
         self.table.rows.clear()
         
-        materiales_info = self.controller.get_all_materials_with_copies()
-        
         for item in materiales_info:
             material = item['material']
             copias_disponibles = item['copias_disponibles']
             copias_prestadas = item['copias_prestadas']
-            autores = self.controller.get_material_authors(material)
+            autores = item['autores']
             
             # Crear botones de acción
             acciones = ft.Row([], spacing=5)
@@ -94,75 +111,39 @@ class CatalogView(ft.Column):
         
         self.page.update()
     
-    def search_materials(self, e):
-        """Busca materiales por título o autor"""
-        text = self.search_field.value
-        
+    def search_materials(self, session, text):
+        """Busca materiales por título, autor o ISBN"""
+        controller = StudentController(session)
         if not text:
-            self.load_available_materials()
-            return
-        
-        self.table.rows.clear()
-        
-        materiales_info = self.controller.search_materials_with_copies(text)
-        
-        for item in materiales_info:
-            material = item['material']
-            copias_disponibles = item['copias_disponibles']
-            copias_prestadas = item['copias_prestadas']
-            autores = self.controller.get_material_authors(material)
-            
-            # Crear botones de acción
-            acciones = ft.Row([], spacing=5)
-            
-            # Botón solicitar si hay disponibles
-            if copias_disponibles > 0:
-                acciones.controls.append(
-                    ft.TextButton(
-                        "Solicitar",
-                        icon=ft.Icons.ADD_CIRCLE,
-                        on_click=lambda e, m=material: self.request_loan(m)
-                    )
-                )
-            
-            # Botón reservar si hay prestadas
-            if copias_prestadas > 0:
-                acciones.controls.append(
-                    ft.TextButton(
-                        "Reservar",
-                        icon=ft.Icons.BOOKMARK_ADD,
-                        on_click=lambda e, m=material: self.request_reservation(m)
-                    )
-                )
-            
-            self.table.rows.append(
-                ft.DataRow(
-                    cells=[
-                        ft.DataCell(ft.Text(material.titulo)),
-                        ft.DataCell(ft.Text(autores or "N/A")),
-                        ft.DataCell(ft.Text(material.isbn or "N/A")),
-                        ft.DataCell(ft.Text(str(material.año_publicacion or "N/A"))),
-                        ft.DataCell(ft.Text(str(copias_disponibles))),
-                        ft.DataCell(ft.Text(str(copias_prestadas))),
-                        ft.DataCell(acciones),
-                    ]
-                )
+            return controller.get_all_materials_with_copies()
+        return controller.search_materials_with_copies(text)
+    
+    def refine_materials(self, materiales_info, text):
+        """Filtra en memoria un resultado previo cuando el texto solo se extendió"""
+        return [
+            item for item in materiales_info
+            if contains_all_terms(
+                text,
+                item['material'].titulo,
+                item['autores'],
+                texto_isbn(item['material'].isbn),
+                item['material'].descripcion,
             )
-        
-        self.page.update()
+        ]
     
     def request_loan(self, material: Material):
         """Solicita un préstamo de una copia disponible del material"""
         
-        # Buscar una copia disponible
-        estado_disponible = self.session.query(Estado).filter_by(nombre="disponible").first()
+        # Solo se verifica que haya alguna copia disponible: cuál se entrega lo
+        # decide request_loan al confirmar, y se muestra después
+        id_disponible = reference_cache.estado_id(self.session, "disponible")
         
-        copia = self.session.query(Copia).filter_by(
+        hay_copia = self.session.query(Copia.id_copia).filter_by(
             id_material=material.id_material,
-            id_estado=estado_disponible.id_estado
+            id_estado=id_disponible
         ).first()
         
-        if not copia:
+        if not hay_copia:
             self.show_dialog_message("Error", "No hay copias disponibles", error=True)
             return
         
@@ -178,8 +159,6 @@ class CatalogView(ft.Column):
             title=ft.Text("Solicitar Préstamo"),
             content=ft.Column([
                 ft.Text(f"Material: {material.titulo}"),
-                ft.Text(f"Código de copia: {copia.codigo_copia}"),
-                ft.Text(f"Ubicación: {copia.ubicacion or 'N/A'}"),
                 ft.Divider(),
                 dias_prestamo,
             ], tight=True),
@@ -197,16 +176,24 @@ class CatalogView(ft.Column):
                     return
                 
                 # Usar el controlador para crear el préstamo
-                self.controller.request_loan(
+                movimiento = self.controller.request_loan(
                     id_material=material.id_material,
                     id_usuario=self.user.id_usuario,
                     dias=dias
                 )
                 
                 dialog.open = False
-                self.show_message("Préstamo solicitado exitosamente")
                 self.load_available_materials()
                 
+                # La copia que realmente se apartó (puede no ser la primera disponible)
+                copia = movimiento.copia_rel
+                self.show_dialog_message(
+                    "Préstamo solicitado",
+                    f"Material: {material.titulo}\n"
+                    f"Código de copia: {copia.codigo_copia}\n"
+                    f"Ubicación: {copia.ubicacion or 'N/A'}"
+                )
+                
             except ValueError:
                 self.show_dialog_message("Error de validación", "Ingrese un número válido de días", error=True)
             except Exception as ex:
@@ -221,27 +208,17 @@ class CatalogView(ft.Column):
     def request_reservation(self, material: Material):
         """Solicita una reserva de una copia prestada del material"""
         
-        # Buscar una copia prestada
-        estado_prestado = self.session.query(Estado).filter_by(nombre="prestado").first()
-        
-        copia = self.session.query(Copia).filter_by(
-            id_material=material.id_material,
-            id_estado=estado_prestado.id_estado
-        ).first()
-        
-        if not copia:
-            self.show_dialog_message("Error", "No hay copias prestadas para reservar", error=True)
-            return
+        # La reserva es por material: se entra a la cola y se asigna la primera copia devuelta
+        en_espera = self.controller.get_queue_length(material.id_material)
         
         # Mostrar diálogo de confirmación
         dialog = ft.AlertDialog(
             title=ft.Text("Confirmar Reserva"),
             content=ft.Column([
                 ft.Text(f"Material: {material.titulo}"),
-                ft.Text(f"Código de copia: {copia.codigo_copia}"),
-                ft.Text(f"Ubicación: {copia.ubicacion or 'N/A'}"),
+                ft.Text(f"Personas en espera: {en_espera}"),
                 ft.Divider(),
-                ft.Text("Esta copia está prestada. Se creará una reserva."),
+                ft.Text("Las copias están prestadas. Se le agregará a la cola de reservas y se le asignará la primera copia que se devuelva."),
             ], tight=True),
             actions=[
                 ft.ElevatedButton("Confirmar"),
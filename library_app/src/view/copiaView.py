@@ -2,8 +2,13 @@ import flet as ft
 from model.models import Copia, Material, Estado
 from sqlalchemy.orm import Session
 from controllers.copiaController import CopiaController
+from model.session import ConflictError
+from view.pagedTable import PagedTable
 
 class CopiaView(ft.Column):
+    # Tablas que muestra la pestaña; su cambio invalida la vista en caché
+    TABLAS = ("copia", "material", "estado")
+
 
     def __init__(self, session: Session, page: ft.Page):
         super().__init__()
@@ -28,7 +33,8 @@ class CopiaView(ft.Column):
         )
 
         # Tabla
-        self.table = ft.DataTable(
+        self.table = PagedTable(
+            page=self.page,
             columns=[
                 ft.DataColumn(ft.Text("ID")),
                 ft.DataColumn(ft.Text("Código")),
@@ -40,7 +46,9 @@ class CopiaView(ft.Column):
                 ft.DataColumn(ft.Text("Formato")),
                 ft.DataColumn(ft.Text("Acciones")),
             ],
-            rows=[],
+            fetch_page=self.controller.get_all_copias,
+            build_row=self.build_row,
+            key=lambda c: c.id_copia,
             expand=True
 
         )
@@ -58,33 +66,28 @@ class CopiaView(ft.Column):
     # Cargar tabla
     # ----------------------------
     def load_data(self):
-        self.table.rows.clear()
-
-        copias = self.controller.get_all_copias()
-
-        for c in copias:
-            self.table.rows.append(
-                ft.DataRow(
-                    cells=[
-                        ft.DataCell(ft.Text(str(c.id_copia))),
-                        ft.DataCell(ft.Text(c.codigo_copia)),
-                        ft.DataCell(ft.Text(self.controller.get_copia_material_title(c))),
-                        ft.DataCell(ft.Text(self.controller.get_copia_material_isbn(c))),
-                        ft.DataCell(ft.Text(self.controller.get_copia_estado_nombre(c))),
-                        ft.DataCell(ft.Text(c.coleccion or "")),
-                        ft.DataCell(ft.Text(c.ubicacion or "")),
-                        ft.DataCell(ft.Text(c.formato)),
-                        ft.DataCell(
-                            ft.Row([
-                                ft.IconButton(ft.Icons.EDIT, on_click=lambda _, cid=c.id_copia: self.open_edit_dialog(cid)),
-                                ft.IconButton(ft.Icons.DELETE, on_click=lambda _, cop=c: self.delete_item(cop)),
-                            ])
-                        ),
-                    ]
-                )
-            )
-
-        self.page.update()
+        self.table.reload()
+
+    def build_row(self, c):
+        return ft.DataRow(
+            cells=[
+                ft.DataCell(ft.Text(str(c.id_copia))),
+                ft.DataCell(ft.Text(c.codigo_copia)),
+                ft.DataCell(ft.Text(self.controller.get_copia_material_title(c))),
+                ft.DataCell(ft.Text(self.controller.get_copia_material_isbn(c))),
+                ft.DataCell(ft.Text(self.controller.get_copia_estado_nombre(c))),
+                ft.DataCell(ft.Text(c.coleccion or "")),
+                ft.DataCell(ft.Text(c.ubicacion or "")),
+                ft.DataCell(ft.Text(c.formato)),
+                ft.DataCell(
+                    ft.Row([
+                        ft.IconButton(ft.Icons.EDIT, on_click=lambda _, cid=c.id_copia: self.open_edit_dialog(cid)),
+                        ft.IconButton(ft.Icons.HISTORY, tooltip="Historial", on_click=lambda _, cop=c: self.open_history_dialog(cop)),
+                        ft.IconButton(ft.Icons.DELETE, on_click=lambda _, cop=c, v=c.version: self.delete_item(cop, v)),
+                    ])
+                ),
+            ]
+        )
 
     # ----------------------------
     # Crear copia
@@ -173,6 +176,8 @@ class CopiaView(ft.Column):
         copia = self.controller.get_copia_by_id(copia_id)
         if not copia:
             return
+        # Versión que ve el usuario; al guardar se rechaza si otro la cambió
+        version = copia.version
 
         materiales = self.controller.get_all_materiales()
         estado_all = self.controller.get_all_estados()
@@ -228,15 +233,19 @@ class CopiaView(ft.Column):
         )
 
         def save(_):
-            self.controller.update_copia(
-                copia_id=copia_id,
-                id_material=int(material_dd.value),
-                codigo_copia=codigo.value,
-                ubicacion=ubicacion.value,
-                coleccion=coleccion.value,
-                id_estado=int(estado.value),
-                formato=formato.value
-            )
+            try:
+                self.controller.update_copia(
+                    copia_id=copia_id,
+                    id_material=int(material_dd.value),
+                    codigo_copia=codigo.value,
+                    ubicacion=ubicacion.value,
+                    coleccion=coleccion.value,
+                    id_estado=int(estado.value),
+                    formato=formato.value,
+                    version=version
+                )
+            except ConflictError as ex:
+                self.show_conflict(ex)
             
             dialog.open = False
             self.load_data()
@@ -248,6 +257,54 @@ class CopiaView(ft.Column):
         dialog.open = True
         self.page.open(dialog)
 
-    def delete_item(self, copia):
-        self.controller.delete_copia(copia.id_copia)
-        self.load_data()
\ No newline at end of file
+    # ----------------------------
+    # Historial de estados
+    # ----------------------------
+    def open_history_dialog(self, copia):
+        eventos = self.controller.get_historial(copia.id_copia)
+
+        tabla = ft.DataTable(
+            columns=[
+                ft.DataColumn(ft.Text("Fecha")),
+                ft.DataColumn(ft.Text("Anterior")),
+                ft.DataColumn(ft.Text("Nuevo")),
+                ft.DataColumn(ft.Text("Usuario")),
+                ft.DataColumn(ft.Text("Operación")),
+            ],
+            rows=[
+                ft.DataRow(cells=[
+                    ft.DataCell(ft.Text(e["fecha"].strftime("%d/%m/%Y %H:%M"))),
+                    ft.DataCell(ft.Text(e["anterior"])),
+                    ft.DataCell(ft.Text(e["nuevo"])),
+                    ft.DataCell(ft.Text(e["usuario"])),
+                    ft.DataCell(ft.Text(e["operacion"])),
+                ])
+                for e in eventos
+            ],
+        )
+
+        dialog = ft.AlertDialog(
+            title=ft.Text(f"Historial de {copia.codigo_copia} (últimos 90 días)"),
+            content=ft.Column(
+                [tabla] if eventos else [ft.Text("Sin cambios de estado registrados")],
+                scroll="auto",
+                height=400,
+            ),
+            actions=[ft.TextButton("Cerrar", on_click=lambda _: self.close_dialog(dialog))],
+        )
+        self.page.dialog = dialog
+        dialog.open = True
+        self.page.open(dialog)
+
+    def delete_item(self, copia, version=None):
+        try:
+            self.controller.delete_copia(copia.id_copia, version)
+        except ConflictError as ex:
+            self.show_conflict(ex)
+        self.load_data()
+
+    def show_conflict(self, ex):
+        self.page.snack.content = ft.Text(str(ex))
+        self.page.snack.bgcolor = "red"
+        self.page.snack.open = True
+        self.page.update()
\ No newline at end of file
@@ -0,0 +1,186 @@
+import flet as ft
+from datetime import datetime
+from sqlalchemy.orm import Session
+from controllers.dashboardController import DashboardController
+from model.dashboard import VISTAS
+
+
+class DashboardView(ft.Column):
+    # Tablas que muestra la pestaña; su cambio invalida la vista en caché
+    TABLAS = ("prestamo", "copia", "multa", "reserva", "material", "estado", *VISTAS)
+
+    def __init__(self, session: Session, page: ft.Page):
+        super().__init__(scroll="auto", expand=True)
+        self.session = session
+        self.page = page
+        self.controller = DashboardController(session)
+
+        self.cards = ft.Row(wrap=True, spacing=10)
+        self.actualizado_text = ft.Text("", size=12, color="grey")
+
+        self.chart = ft.BarChart(
+            bar_groups=[],
+            left_axis=ft.ChartAxis(labels_size=40),
+            bottom_axis=ft.ChartAxis(labels_size=30),
+            horizontal_grid_lines=ft.ChartGridLines(color="grey300", width=1),
+            interactive=True,
+            height=250,
+        )
+
+        self.table_estados = ft.DataTable(
+            columns=[
+                ft.DataColumn(ft.Text("Estado")),
+                ft.DataColumn(ft.Text("Copias"), numeric=True),
+            ],
+            rows=[],
+        )
+        self.table_materiales = ft.DataTable(
+            columns=[
+                ft.DataColumn(ft.Text("Material")),
+                ft.DataColumn(ft.Text("Préstamos"), numeric=True),
+            ],
+            rows=[],
+        )
+        self.table_colas = ft.DataTable(
+            columns=[
+                ft.DataColumn(ft.Text("Material")),
+                ft.DataColumn(ft.Text("En Espera"), numeric=True),
+            ],
+            rows=[],
+        )
+
+        self.controls = [
+            ft.Row(
+                [
+                    ft.Text("Dashboard", size=24, weight="bold"),
+                    ft.Row([
+                        self.actualizado_text,
+                        ft.ElevatedButton("Actualizar", icon=ft.Icons.REFRESH, on_click=self.refresh),
+                    ]),
+                ],
+                alignment="spaceBetween",
+            ),
+            ft.Divider(),
+            self.cards,
+            ft.Divider(),
+            ft.Text("Préstamos por Día (últimos 30 días)", size=18, weight="bold"),
+            self.chart,
+            ft.Divider(),
+            ft.Row(
+                [
+                    self.seccion("Estado de Copias", self.table_estados),
+                    self.seccion("Materiales Más Prestados", self.table_materiales),
+                    self.seccion("Colas de Reserva", self.table_colas),
+                ],
+                vertical_alignment="start",
+                wrap=True,
+            ),
+        ]
+
+        self.load_dashboard()
+
+    def seccion(self, titulo: str, tabla: ft.DataTable):
+        return ft.Column([ft.Text(titulo, size=18, weight="bold"), tabla])
+
+    def card(self, titulo: str, valor: str, color: str):
+        return ft.Container(
+            content=ft.Column([
+                ft.Text(titulo, size=12, color="grey"),
+                ft.Text(valor, size=22, weight="bold", color=color),
+            ]),
+            padding=15,
+            border_radius=8,
+            border=ft.border.all(1, "grey300"),
+            width=200,
+        )
+
+    # ---------------------------
+    # Carga de métricas
+    # ---------------------------
+    def load_dashboard(self):
+        """Carga todas las métricas del dashboard"""
+        try:
+            self.load_resumen()
+            self.load_prestamos_por_dia()
+            self.load_tablas()
+        except Exception as e:
+            self.session.rollback()
+            self.show_message(f"Error al cargar el dashboard: {str(e)}", error=True)
+
+    def load_resumen(self):
+        resumen = self.controller.get_resumen()
+        self.cards.controls.clear()
+        if resumen is None:
+            return
+
+        self.cards.controls.extend([
+            self.card("Préstamos Activos", str(resumen["prestamos_activos"]), "blue"),
+            self.card("Préstamos Vencidos", str(resumen["prestamos_vencidos"]), "red"),
+            self.card("Multas Pendientes", f"${float(resumen['multas_pendientes']):,.0f}", "orange"),
+            self.card("Multas Pagadas", f"${float(resumen['multas_pagadas']):,.0f}", "green"),
+            self.card("Reservas en Cola", str(resumen["reservas_en_cola"]), "purple"),
+        ])
+
+        actualizado = resumen["actualizado"]
+        if isinstance(actualizado, datetime):
+            actualizado = actualizado.strftime("%d/%m/%Y %H:%M")
+        self.actualizado_text.value = f"Actualizado: {actualizado}"
+
+    def load_prestamos_por_dia(self):
+        filas = self.controller.get_prestamos_por_dia()
+        maximo = max((f["prestamos"] for f in filas), default=0)
+
+        self.chart.bar_groups = [
+            ft.BarChartGroup(
+                x=i,
+                bar_rods=[
+                    ft.BarChartRod(
+                        from_y=0,
+                        to_y=fila["prestamos"],
+                        width=12,
+                        color="blue",
+                        tooltip=f"{fila['dia']}: {fila['prestamos']}",
+                    )
+                ],
+            )
+            for i, fila in enumerate(filas)
+        ]
+        self.chart.bottom_axis.labels = [
+            ft.ChartAxisLabel(value=i, label=ft.Text(str(fila["dia"])[5:], size=10))
+            for i, fila in enumerate(filas)
+            if i % 5 == 0
+        ]
+        self.chart.max_y = maximo + 1
+
+    def load_tablas(self):
+        self.table_estados.rows = [
+            ft.DataRow(cells=[ft.DataCell(ft.Text(f["estado"])), ft.DataCell(ft.Text(str(f["copias"])))])
+            for f in self.controller.get_estado_copias()
+        ]
+        self.table_materiales.rows = [
+            ft.DataRow(cells=[ft.DataCell(ft.Text(f["titulo"])), ft.DataCell(ft.Text(str(f["prestamos"])))])
+            for f in self.controller.get_materiales_mas_prestados()
+        ]
+        self.table_colas.rows = [
+            ft.DataRow(cells=[ft.DataCell(ft.Text(f["titulo"])), ft.DataCell(ft.Text(str(f["en_espera"])))])
+            for f in self.controller.get_colas_mas_largas()
+        ]
+
+    def refresh(self, e):
+        """Refresca las vistas materializadas y recarga las métricas"""
+        try:
+            self.controller.refresh()
+        except Exception as ex:
+            self.session.rollback()
+            self.show_message(f"Error al actualizar: {str(ex)}", error=True)
+            return
+        self.load_dashboard()
+        self.page.update()
+
+    def show_message(self, message, error=False):
+        self.page.snack_bar = ft.SnackBar(
+            content=ft.Text(message),
+            bgcolor=ft.Colors.RED if error else ft.Colors.GREEN
+        )
+        self.page.snack_bar.open = True
+        self.page.update()
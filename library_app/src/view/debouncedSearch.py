@@ -0,0 +1,107 @@
+import threading
+
+from sqlalchemy.orm import Session
+
+from model.search import tokenizar
+from model.session import read_scope
+
+
+def contains_all_terms(texto: str, *campos) -> bool:
+    """
+    True si cada palabra de `texto` es prefijo de alguna palabra de los campos
+    (sin tildes ni mayúsculas), el mismo criterio del índice invertido en memoria
+    """
+    palabras = tokenizar(" ".join(str(c) for c in campos if c))
+    return all(any(p.startswith(termino) for p in palabras) for termino in tokenizar(texto))
+
+
+class DebouncedSearch:
+    """
+    Búsqueda incremental para un TextField:
+    - espera a que el usuario deje de escribir (`delay` segundos) antes de consultar,
+    - descarta resultados de consultas que quedaron obsoletas por una tecla posterior,
+    - si el nuevo texto solo extiende el anterior, filtra en memoria el resultado
+      previo con `refine` en lugar de volver a consultar la base de datos.
+
+    La consulta corre en el hilo del temporizador, en paralelo con los handlers
+    que usan la sesión de la página; por eso `search(session, texto)` recibe una
+    sesión propia de corta vida sobre el mismo engine que `session`.
+    `render(resultados)` los dibuja y `refine(resultados, texto)` (opcional)
+    filtra un resultado previo; si retorna None se consulta la base de datos.
+    El filtro en memoria conserva el orden del resultado previo, así que solo
+    debe usarse si coincide con lo que retornaría la consulta.
+    """
+
+    def __init__(self, session: Session, search, render, refine=None, delay: float = 0.3):
+        self.search = search
+        self.render = render
+        self.refine = refine
+        self.delay = delay
+        self._bind = session.get_bind()
+
+        self._lock = threading.Lock()
+        self._query_lock = threading.Lock()
+        self._timer = None
+        self._generation = 0
+        self._last_text = None
+        self._last_results = None
+
+    def on_change(self, e):
+        """Handler para `on_change` del TextField"""
+        self.submit(e.control.value or "")
+
+    def submit(self, texto: str):
+        with self._lock:
+            self._generation += 1
+            generation = self._generation
+            if self._timer:
+                self._timer.cancel()
+            self._timer = threading.Timer(self.delay, self._run, args=(generation, texto))
+            self._timer.daemon = True
+            self._timer.start()
+
+    def cancel(self):
+        with self._lock:
+            self._generation += 1
+            if self._timer:
+                self._timer.cancel()
+                self._timer = None
+
+    def reset(self):
+        """Olvida el último resultado, por ejemplo después de crear o editar filas"""
+        with self._lock:
+            self._last_text = None
+            self._last_results = None
+
+    def _is_current(self, generation):
+        with self._lock:
+            return generation == self._generation
+
+    def _can_refine(self, texto: str):
+        return (
+            self.refine is not None
+            and self._last_results is not None
+            and self._last_text
+            and texto.strip() != self._last_text.strip()
+            and texto.startswith(self._last_text)
+        )
+
+    def _run(self, generation, texto):
+        # Una sola consulta en curso por vista; las obsoletas se descartan al terminar
+        with self._query_lock:
+            if not self._is_current(generation):
+                return
+
+            resultados = None
+            if self._can_refine(texto):
+                resultados = self.refine(self._last_results, texto)
+            if resultados is None:
+                with read_scope(self._bind) as session:
+                    resultados = self.search(session, texto)
+
+            if not self._is_current(generation):
+                return
+
+            self._last_text = texto
+            self._last_results = resultados
+            self.render(resultados)
@@ -1,9 +1,18 @@
+import importlib
 import flet as ft
-from view.materialView import MaterialView
-from view.copiaView import CopiaView
-from view.prestamoView import PrestamoView
-from view.userView import UserView
-from view.reservaView import ReservaView
+from model.session import release_identity_map
+from view.viewCache import TabViewCache
+
+
+# (módulo, clase) de cada pestaña; la vista se importa al abrirla por primera vez
+TAB_VIEWS = [
+    ("view.userView", "UserView"),
+    ("view.materialView", "MaterialView"),
+    ("view.copiaView", "CopiaView"),
+    ("view.prestamoView", "PrestamoView"),
+    ("view.reservaView", "ReservaView"),
+    ("view.dashboardView", "DashboardView"),
+]
 
 class LibrarianView(ft.View):
     def __init__(self, page, auth_controller, on_logout):
@@ -48,12 +57,12 @@ class LibrarianView(ft.View):
             expand=True
         )
         self.controls.append(self.content_area)
+
+        # Vistas ya construidas; solo se recargan si cambiaron sus tablas
+        self.view_cache = TabViewCache()
         
         # Cargar la primera pestaña por defecto
-        self.content_area.content = UserView(
-            session=self.auth.session,
-            page=self.page
-        )
+        self.content_area.content = self.get_tab_view(0)
         
     
     # ---------------------------
@@ -62,37 +71,21 @@ class LibrarianView(ft.View):
     def tab_change(self, e):
         
         index = e.control.selected_index or 0
-        
-        
-        if index == 0:
-             self.content_area.content = UserView(
-            session=self.auth.session,
-                page=self.page
-            )
-        elif index == 1:
-            self.content_area.content = MaterialView(
-            session=self.auth.session,
-                page=self.page
-            )
-        elif index == 2:
-            self.content_area.content = CopiaView(
-            session=self.auth.session,
-                page=self.page
-            )
-        elif index == 3:
-            self.content_area.content = PrestamoView(
-                session=self.auth.session,
-                page=self.page
-            )
-        elif index == 4:
-            self.content_area.content = ReservaView(
-                session=self.auth.session,
-                page=self.page
-            )
+        release_identity_map(self.auth.session)
 
+        self.content_area.content = self.get_tab_view(index)
 
         self.page.update()
 
+    def get_tab_view(self, index: int):
+        """Retorna la vista de la pestaña, reutilizando la anterior si sigue vigente"""
+        modulo, clase = TAB_VIEWS[index]
+        vista_cls = getattr(importlib.import_module(modulo), clase)
+        return self.view_cache.get(
+            vista_cls,
+            lambda: vista_cls(session=self.auth.session, page=self.page)
+        )
+
     def logout(self, e):
         self.auth.logout()
         self.on_logout()
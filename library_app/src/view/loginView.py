@@ -83,7 +83,9 @@ class LoginView(ft.View):
         user = self.username.value.strip()
         pwd = self.password.value.strip()
 
-        ok = self.controller.login(user, pwd)
+        # Handler síncrono: Flet lo corre en su pool de hilos y bcrypt en el pool de procesos
+        client_ip = self.page.client_ip
+        ok = self.controller.login(user, pwd, client_ip)
 
         if ok:
             self.page.snack.content = ft.Text("Inicio de sesión correcto.")
@@ -92,6 +94,12 @@ class LoginView(ft.View):
             self.page.update()
             self.on_login_success()
 
+        elif self.controller.is_locked(user, client_ip):
+            self.page.snack.content = ft.Text("Demasiados intentos fallidos. Intente de nuevo más tarde.")
+            self.page.snack.bgcolor = "red"
+            self.page.snack.open = True
+            self.page.update()
+
         else:
             self.page.snack.content = ft.Text("Usuario o contraseña incorrectos.")
             self.page.snack.bgcolor = "red"
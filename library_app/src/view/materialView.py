@@ -2,9 +2,16 @@ import flet as ft
 from sqlalchemy.orm import Session
 from model.models import Material, Autor, Idioma
 from controllers.materialController import MaterialController
+from model.cache import reference_cache
+from model.search import material_search, texto_isbn
+from view.debouncedSearch import DebouncedSearch, contains_all_terms
+from view.pagedTable import PagedTable
 
 
 class MaterialView(ft.Column):
+    # Tablas que muestra la pestaña; su cambio invalida la vista en caché
+    TABLAS = ("material", "idioma", "autor", "material_autor")
+
     def __init__(self, session: Session, page: ft.Page):
         super().__init__()
         self.session = session
@@ -12,9 +19,17 @@ class MaterialView(ft.Column):
         self.controller = MaterialController(session)
 
         # ---- Controles UI ----
+        # Con texto completo de PostgreSQL (palabras completas, orden por relevancia)
+        # el filtro en memoria no coincide con la consulta: siempre se vuelve a consultar
+        self.search = DebouncedSearch(
+            session,
+            search=self.search_materials,
+            render=self.render_materials,
+            refine=None if material_search.full_text(session) else self.refine_materials,
+        )
         self.search_field = ft.TextField(
-            hint_text="Buscar por título...",
-            on_change=self.search_materials,
+            hint_text="Buscar por título, autor o ISBN...",
+            on_change=self.search.on_change,
             expand=True
         )
 
@@ -24,7 +39,8 @@ class MaterialView(ft.Column):
             on_click=self.open_create_modal
         )
 
-        self.table = ft.DataTable(
+        self.table = PagedTable(
+            page=self.page,
             columns=[
                 ft.DataColumn(ft.Text("ID")),
                 ft.DataColumn(ft.Text("Título")),
@@ -34,7 +50,9 @@ class MaterialView(ft.Column):
                 ft.DataColumn(ft.Text("ISBN")),
                 ft.DataColumn(ft.Text("Acciones")),
             ],
-            rows=[],
+            fetch_page=self.controller.get_all_materials,
+            build_row=self.build_row,
+            key=lambda m: m.id_material,
             expand=True
         )
 
@@ -49,79 +67,65 @@ class MaterialView(ft.Column):
     #                  CARGAR MATERIALES
     # --------------------------------------------------------
     def load_materials(self):
-        materiales = self.controller.get_all_materials()
-
-        self.table.rows = []
-        for m in materiales:
-            autores = self.controller.get_material_authors(m)
-            
-            # Obtener idioma si existe
-            idiomas = self.controller.get_all_idiomas()
-            idioma_nombre = ""
-            if m.id_idioma:
-                idioma = next((i for i in idiomas if i.id_idioma == m.id_idioma), None)
-                idioma_nombre = idioma.nombre if idioma else ""
-
-            self.table.rows.append(
-                ft.DataRow(
-                    cells=[
-                        ft.DataCell(ft.Text(str(m.id_material))),
-                        ft.DataCell(ft.Text(m.titulo)),
-                        ft.DataCell(ft.Text(idioma_nombre)),
-                        ft.DataCell(ft.Text(str(m.año_publicacion or ""))),
-                        ft.DataCell(ft.Text(autores)),
-                        ft.DataCell(ft.Text(m.isbn or "")),
-                        ft.DataCell(
-                            ft.IconButton(
-                                icon=ft.Icons.VISIBILITY,
-                                tooltip="Ver detalles",
-                                on_click=lambda e, mat=m: self.open_detail_modal(mat)
-                            )
-                        ),
-                    ]
-                )
-            )
-        self.page.update()
+        self.search.reset()
+        self.table.reload()
+
+    def render_materials(self, resultado):
+        # Sin texto de búsqueda se vuelve a la lista paginada
+        paginado, materiales = resultado
+        if paginado:
+            self.table.reload(materiales)
+        else:
+            self.table.set_rows(materiales)
+
+    def build_row(self, m):
+        autores = self.controller.get_material_authors(m)
+        
+        # Obtener idioma si existe
+        idioma_nombre = self.controller.get_idioma_nombre(m.id_idioma) or ""
+
+        return ft.DataRow(
+            cells=[
+                ft.DataCell(ft.Text(str(m.id_material))),
+                ft.DataCell(ft.Text(m.titulo)),
+                ft.DataCell(ft.Text(idioma_nombre)),
+                ft.DataCell(ft.Text(str(m.año_publicacion or ""))),
+                ft.DataCell(ft.Text(autores)),
+                ft.DataCell(ft.Text(m.isbn or "")),
+                ft.DataCell(
+                    ft.IconButton(
+                        icon=ft.Icons.VISIBILITY,
+                        tooltip="Ver detalles",
+                        on_click=lambda e, mat=m: self.open_detail_modal(mat)
+                    )
+                ),
+            ]
+        )
 
     # --------------------------------------------------------
     #                  BUSCAR MATERIALES
     # --------------------------------------------------------
-    def search_materials(self, e):
-        text = self.search_field.value
-
-        materiales = self.controller.search_materials(text)
-
-        self.table.rows = []
-        for m in materiales:
-            autores = self.controller.get_material_authors(m)
-            
-            # Obtener idioma si existe
-            idiomas = self.controller.get_all_idiomas()
-            idioma_nombre = ""
-            if m.id_idioma:
-                idioma = next((i for i in idiomas if i.id_idioma == m.id_idioma), None)
-                idioma_nombre = idioma.nombre if idioma else ""
-            
-            self.table.rows.append(
-                ft.DataRow(
-                    cells=[
-                        ft.DataCell(ft.Text(str(m.id_material))),
-                        ft.DataCell(ft.Text(m.titulo)),
-                        ft.DataCell(ft.Text(idioma_nombre)),
-                        ft.DataCell(ft.Text(str(m.año_publicacion or ""))),
-                        ft.DataCell(ft.Text(autores)),
-                        ft.DataCell(ft.Text(m.isbn or "")),
-                        ft.DataCell(
-                            ft.IconButton(
-                                icon=ft.Icons.VISIBILITY,
-                                tooltip="Ver detalles",
-                                on_click=lambda e, mat=m: self.open_detail_modal(mat)
-                            )
-                        ),
-                    ]
-                )
+    def search_materials(self, session, text):
+        # (paginado, materiales): sin texto se pide la primera página de la lista
+        controller = MaterialController(session)
+        # build_row lee los idiomas de la caché: si venció, se recarga aquí y no con la sesión de la página
+        reference_cache.idiomas(session)
+        if not text or not text.strip():
+            return True, controller.get_all_materials(limit=self.table.page_size)
+        return False, controller.search_materials(text)
+
+    def refine_materials(self, resultado, text):
+        _, materiales = resultado
+        return False, [
+            m for m in materiales
+            if contains_all_terms(
+                text,
+                m.titulo,
+                texto_isbn(m.isbn),
+                m.descripcion,
+                self.controller.get_material_authors(m),
             )
-        self.page.update()
+        ]
 
     # --------------------------------------------------------
     #              MODAL PARA DETALLE + EDITAR + BORRAR
@@ -130,11 +134,7 @@ class MaterialView(ft.Column):
         autores = self.controller.get_material_authors(material)
         
         # Obtener idioma si existe
-        idiomas = self.controller.get_all_idiomas()
-        idioma_nombre = "Desconocido"
-        if material.id_idioma:
-            idioma = next((i for i in idiomas if i.id_idioma == material.id_idioma), None)
-            idioma_nombre = idioma.nombre if idioma else "Desconocido"
+        idioma_nombre = self.controller.get_idioma_nombre(material.id_idioma) or "Desconocido"
 
         dialog = ft.AlertDialog(
             modal=True,
@@ -274,25 +274,16 @@ class MaterialView(ft.Column):
             año = int(anio.value) if anio.value.isdigit() else None
             id_idioma = int(idioma.value) if idioma.value else None
             
-            from model.models import MaterialAutor
-            
-            nuevo = self.controller.create_material(
+            self.controller.create_material(
                 titulo=titulo.value,
                 descripcion=descripcion.value,
                 año_publicacion=año,
                 id_idioma=id_idioma,
                 tipo_material="Libro",
-                isbn=isbn.value
+                isbn=isbn.value,
+                id_autor=int(autor_dropdown.value) if autor_dropdown.value else None
             )
 
-            if autor_dropdown.value:
-                relacion = MaterialAutor(
-                    id_material=nuevo.id_material,
-                    id_autor=int(autor_dropdown.value),
-                )
-                self.session.add(relacion)
-                self.session.commit()
-
             dialog.open = False
             self.load_materials()
             self.page.update()
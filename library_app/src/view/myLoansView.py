@@ -2,9 +2,13 @@ import flet as ft
 from sqlalchemy.orm import Session
 from model.models import Prestamo
 from controllers.studentController import StudentController
+from model.session import ConflictError
 
 
 class MyLoansView(ft.Column):
+    # Tablas que muestra la pestaña; su cambio invalida la vista en caché
+    TABLAS = ("prestamo", "multa", "copia", "movimiento")
+
     def __init__(self, session: Session, page: ft.Page, user):
         super().__init__()
         self.session = session
@@ -64,7 +68,7 @@ class MyLoansView(ft.Column):
                         ft.DataCell(ft.Text(str(prestamo.fecha_prestamo))),
                         ft.DataCell(ft.Text(str(prestamo.fecha_devolucion_prevista))),
                         ft.DataCell(ft.Text(prestamo.estado)),
-                        ft.DataCell(ft.Text(f"${prestamo.multa or 0}")),
+                        ft.DataCell(ft.Text(f"${self.controller.monto_multas_pendientes(prestamo):.2f}")),
                         ft.DataCell(acciones),
                     ]
                 )
@@ -91,6 +95,11 @@ class MyLoansView(ft.Column):
                 self.show_message("Material devuelto exitosamente")
                 self.load_loans()
                 
+            except ConflictError as ex:
+                dialog.open = False
+                self.show_message(str(ex), error=True)
+                self.load_loans()
+                
             except Exception as ex:
                 self.show_message(f"Error al devolver: {str(ex)}", error=True)
         
@@ -2,9 +2,13 @@ import flet as ft
 from sqlalchemy.orm import Session
 from model.models import Reserva
 from controllers.studentController import StudentController
+from model.session import ConflictError
 
 
 class MyReservationsView(ft.Column):
+    # Tablas que muestra la pestaña; su cambio invalida la vista en caché
+    TABLAS = ("reserva", "copia")
+
     def __init__(self, session: Session, page: ft.Page, user):
         super().__init__()
         self.session = session
@@ -16,6 +20,7 @@ class MyReservationsView(ft.Column):
             columns=[
                 ft.DataColumn(ft.Text("Material")),
                 ft.DataColumn(ft.Text("Código")),
+                ft.DataColumn(ft.Text("Puesto en Cola")),
                 ft.DataColumn(ft.Text("Fecha Reserva")),
                 ft.DataColumn(ft.Text("Estado")),
                 ft.DataColumn(ft.Text("Acciones")),
@@ -38,9 +43,17 @@ class MyReservationsView(ft.Column):
         self.table.rows.clear()
         
         reservas = self.controller.get_user_reservations(self.user.id_usuario)
+        puestos = self.controller.get_queue_positions(self.user.id_usuario)
         
         for reserva in reservas:
-            material_titulo = reserva.copia.material.titulo if reserva.copia and reserva.copia.material else "N/A"
+            material_titulo = reserva.material.titulo if reserva.material else "N/A"
+            
+            if reserva.estado != "activa":
+                puesto = "-"
+            elif reserva.copia:
+                puesto = "Lista para retirar"
+            else:
+                puesto = str(puestos.get(reserva.id_reserva, "-"))
             
             acciones = ft.Row([])
             
@@ -58,6 +71,7 @@ class MyReservationsView(ft.Column):
                     cells=[
                         ft.DataCell(ft.Text(material_titulo)),
                         ft.DataCell(ft.Text(reserva.copia.codigo_copia if reserva.copia else "N/A")),
+                        ft.DataCell(ft.Text(puesto)),
                         ft.DataCell(ft.Text(str(reserva.fecha_reserva))),
                         ft.DataCell(ft.Text(reserva.estado)),
                         ft.DataCell(acciones),
@@ -74,6 +88,10 @@ class MyReservationsView(ft.Column):
             self.show_message("Reserva cancelada")
             self.load_reservations()
             
+        except ConflictError as ex:
+            self.show_message(str(ex), error=True)
+            self.load_reservations()
+            
         except Exception as ex:
             self.show_message(f"Error al cancelar: {str(ex)}", error=True)
     
@@ -0,0 +1,142 @@
+import threading
+
+import flet as ft
+
+
+class PagedTable(ft.Column):
+    """
+    DataTable paginada por llave que carga páginas al hacer scroll.
+
+    Solo mantiene `max_pages` páginas en el árbol de controles: al bajar se
+    descarta la página superior y al volver arriba se vuelve a pedir, de modo
+    que el navegador nunca recibe la tabla completa.
+
+    `fetch_page(after_id, limit)` retorna una lista de objetos,
+    `build_row(obj)` construye su ft.DataRow y `key(obj)` retorna la llave
+    que se pasa como `after_id` para pedir la página siguiente.
+    """
+
+    ROW_HEIGHT = 48
+    SCROLL_THRESHOLD = 200
+
+    def __init__(self, page: ft.Page, columns, fetch_page, build_row, key,
+                 page_size: int = 50, max_pages: int = 3, **kwargs):
+        self.table = ft.DataTable(
+            columns=columns,
+            rows=[],
+            data_row_min_height=self.ROW_HEIGHT,
+            data_row_max_height=self.ROW_HEIGHT,
+        )
+        super().__init__(
+            controls=[self.table],
+            scroll="auto",
+            on_scroll=self._on_scroll,
+            on_scroll_interval=100,
+            **kwargs
+        )
+        self.page = page
+        self.fetch_page = fetch_page
+        self.build_row = build_row
+        self.key = key
+        self.page_size = page_size
+        self.max_pages = max_pages
+
+        self._lock = threading.Lock()
+        self._paged = True
+        self._cursors = []      # cursor (after_id) con el que se pidió cada página
+        self._window = []       # páginas visibles: (indice, filas)
+
+    # ---------------------------
+    # API pública
+    # ---------------------------
+    def reload(self, items=None):
+        """Vuelve a la primera página en modo paginado; `items` es esa página si ya se consultó"""
+        with self._lock:
+            self._paged = True
+            self._cursors = [None]
+            self._window = [(0, self._load_page(0, items))]
+            self._render()
+
+    def set_rows(self, items):
+        """Muestra una lista fija (por ejemplo resultados de búsqueda) sin paginar"""
+        with self._lock:
+            self._paged = False
+            self._window = [(0, [self.build_row(item) for item in items])]
+            self._render()
+
+    def prepend(self, items):
+        """
+        Agrega filas nuevas al inicio sin recargar la tabla. Solo aplica si la
+        primera página está a la vista; si no, aparecerán al volver arriba.
+        """
+        with self._lock:
+            if not items or not self._window or self._window[0][0] != 0:
+                return
+            _, filas = self._window[0]
+            self._window[0] = (0, [self.build_row(item) for item in items] + filas)
+            self._render()
+
+    # ---------------------------
+    # Carga de páginas
+    # ---------------------------
+    def _load_page(self, indice, items=None):
+        """Pide la página `indice` y retorna sus filas; registra el cursor de la siguiente"""
+        if items is None:
+            items = self.fetch_page(self._cursors[indice], self.page_size)
+
+        # Una página completa puede tener siguiente; una incompleta es la última
+        if len(items) == self.page_size and indice + 1 == len(self._cursors):
+            self._cursors.append(self.key(items[-1]))
+
+        return [self.build_row(item) for item in items]
+
+    def _render(self):
+        self.table.rows = [fila for _, filas in self._window for fila in filas]
+        self.page.update()
+
+    def _next_page(self):
+        siguiente = self._window[-1][0] + 1 if self._window else 0
+        if siguiente >= len(self._cursors):
+            return False
+
+        filas = self._load_page(siguiente)
+        if not filas:
+            del self._cursors[siguiente:]
+            return False
+
+        self._window.append((siguiente, filas))
+        descartadas = 0
+        if len(self._window) > self.max_pages:
+            _, primeras = self._window.pop(0)
+            descartadas = len(primeras)
+
+        self._render()
+        if descartadas:
+            # Compensa el desplazamiento de las filas que salieron por arriba
+            self.scroll_to(delta=-descartadas * self.ROW_HEIGHT, duration=0)
+        return True
+
+    def _previous_page(self):
+        if not self._window or self._window[0][0] == 0:
+            return False
+
+        anterior = self._window[0][0] - 1
+        filas = self._load_page(anterior)
+        self._window.insert(0, (anterior, filas))
+        if len(self._window) > self.max_pages:
+            self._window.pop()
+
+        self._render()
+        self.scroll_to(delta=len(filas) * self.ROW_HEIGHT, duration=0)
+        return True
+
+    def _on_scroll(self, e: ft.OnScrollEvent):
+        if not self._paged or not self._lock.acquire(blocking=False):
+            return
+        try:
+            if e.pixels >= e.max_scroll_extent - self.SCROLL_THRESHOLD:
+                self._next_page()
+            elif e.pixels <= e.min_scroll_extent + self.SCROLL_THRESHOLD:
+                self._previous_page()
+        finally:
+            self._lock.release()
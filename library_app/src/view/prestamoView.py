@@ -2,9 +2,14 @@ import flet as ft
 from sqlalchemy.orm import Session
 from controllers.prestamoController import PrestamoController
 from model.models import Movimiento
+from model.session import ConflictError
+from view.pagedTable import PagedTable
 
 
 class PrestamoView(ft.Column):
+    # Tablas que muestra la pestaña; su cambio invalida la vista en caché
+    TABLAS = ("movimiento", "prestamo", "copia", "usuario", "material")
+
     def __init__(self, session: Session, page: ft.Page):
         super().__init__()
         self.session = session
@@ -24,10 +29,26 @@ class PrestamoView(ft.Column):
                 ft.DataColumn(ft.Text("Acciones")),
             ],
             rows=[],
+            show_checkbox_column=True,
+        )
+        
+        # Acciones sobre las solicitudes seleccionadas
+        self.btn_aprobar_sel = ft.ElevatedButton(
+            "Aprobar seleccionadas",
+            icon=ft.Icons.CHECK_CIRCLE,
+            disabled=True,
+            on_click=lambda e: self.procesar_seleccion(aprobar=True)
+        )
+        self.btn_rechazar_sel = ft.ElevatedButton(
+            "Rechazar seleccionadas",
+            icon=ft.Icons.CANCEL,
+            disabled=True,
+            on_click=lambda e: self.procesar_seleccion(aprobar=False)
         )
         
         # Tabla de préstamos activos
-        self.table_prestamos = ft.DataTable(
+        self.table_prestamos = PagedTable(
+            page=self.page,
             columns=[
                 ft.DataColumn(ft.Text("ID Préstamo")),
                 ft.DataColumn(ft.Text("Material")),
@@ -38,7 +59,10 @@ class PrestamoView(ft.Column):
                 ft.DataColumn(ft.Text("Estado")),
                 ft.DataColumn(ft.Text("Multa")),
             ],
-            rows=[],
+            fetch_page=self.controller.get_prestamos_activos,
+            build_row=self.build_prestamo_row,
+            key=lambda p: p.id_prestamo,
+            expand=True
         )
         
         self.controls = [
@@ -46,6 +70,7 @@ class PrestamoView(ft.Column):
             ft.Divider(),
             
             ft.Text("Solicitudes Pendientes de Aprobación", size=18, weight="bold"),
+            ft.Row([self.btn_aprobar_sel, self.btn_rechazar_sel]),
             ft.Container(
                 content=ft.Column([self.table_solicitudes], scroll="auto"),
                 height=300
@@ -55,7 +80,7 @@ class PrestamoView(ft.Column):
             
             ft.Text("Préstamos Activos", size=18, weight="bold"),
             ft.Container(
-                content=ft.Column([self.table_prestamos], scroll="auto"),
+                content=self.table_prestamos,
                 expand=True
             )
         ]
@@ -65,99 +90,168 @@ class PrestamoView(ft.Column):
     
     def load_solicitudes(self):
         """Carga las solicitudes pendientes (movimientos con estado reservado)"""
-        self.table_solicitudes.rows.clear()
-        
         movimientos = self.controller.get_movimientos_pendientes()
+        self.table_solicitudes.rows = [self.build_solicitud_row(mov) for mov in movimientos]
+        self.update_selection_buttons()
         
-        for mov in movimientos:
-            # Obtener información del material a través de la copia
-            material_titulo = "N/A"
-            codigo_copia = "N/A"
-            estado_nombre = "N/A"
-            usuario_nombre = "N/A"
-            
-            if mov.copia_rel:
-                codigo_copia = mov.copia_rel.codigo_copia
-                if mov.copia_rel.material:
-                    material_titulo = mov.copia_rel.material.titulo
-            
-            if mov.estado:
-                estado_nombre = mov.estado.nombre
-            
-            if mov.usuario:
-                usuario_nombre = mov.usuario.nombre
-            
-            self.table_solicitudes.rows.append(
-                ft.DataRow(
-                    cells=[
-                        ft.DataCell(ft.Text(str(mov.id_movimiento))),
-                        ft.DataCell(ft.Text(material_titulo)),
-                        ft.DataCell(ft.Text(codigo_copia)),
-                        ft.DataCell(ft.Text(usuario_nombre)),
-                        ft.DataCell(ft.Text(str(mov.fecha_solicitud.strftime("%Y-%m-%d %H:%M") if mov.fecha_solicitud else "N/A"))),
-                        ft.DataCell(ft.Text(str(mov.fecha_devolucion))),
-                        ft.DataCell(ft.Text(estado_nombre)),
-                        ft.DataCell(
-                            ft.Row([
-                                ft.IconButton(
-                                    icon=ft.Icons.CHECK_CIRCLE,
-                                    icon_color="green",
-                                    tooltip="Aprobar préstamo",
-                                    on_click=lambda e, m=mov: self.aprobar_prestamo(m)
-                                ),
-                                ft.IconButton(
-                                    icon=ft.Icons.CANCEL,
-                                    icon_color="red",
-                                    tooltip="Rechazar solicitud",
-                                    on_click=lambda e, m=mov: self.rechazar_solicitud(m)
-                                ),
-                            ])
+        self.page.update()
+    
+    def build_solicitud_row(self, mov: Movimiento):
+        # Obtener información del material a través de la copia
+        material_titulo = "N/A"
+        codigo_copia = "N/A"
+        estado_nombre = "N/A"
+        usuario_nombre = "N/A"
+        
+        if mov.copia_rel:
+            codigo_copia = mov.copia_rel.codigo_copia
+            if mov.copia_rel.material:
+                material_titulo = mov.copia_rel.material.titulo
+        
+        if mov.estado:
+            estado_nombre = mov.estado.nombre
+        
+        if mov.usuario:
+            usuario_nombre = mov.usuario.nombre
+        
+        return ft.DataRow(
+            data=mov.id_movimiento,
+            selected=False,
+            on_select_changed=self.toggle_solicitud,
+            cells=[
+                ft.DataCell(ft.Text(str(mov.id_movimiento))),
+                ft.DataCell(ft.Text(material_titulo)),
+                ft.DataCell(ft.Text(codigo_copia)),
+                ft.DataCell(ft.Text(usuario_nombre)),
+                ft.DataCell(ft.Text(str(mov.fecha_solicitud.strftime("%Y-%m-%d %H:%M") if mov.fecha_solicitud else "N/A"))),
+                ft.DataCell(ft.Text(str(mov.fecha_devolucion))),
+                ft.DataCell(ft.Text(estado_nombre)),
+                ft.DataCell(
+                    ft.Row([
+                        ft.IconButton(
+                            icon=ft.Icons.CHECK_CIRCLE,
+                            icon_color="green",
+                            tooltip="Aprobar préstamo",
+                            on_click=lambda e, m=mov: self.aprobar_prestamo(m)
                         ),
-                    ]
+                        ft.IconButton(
+                            icon=ft.Icons.CANCEL,
+                            icon_color="red",
+                            tooltip="Rechazar solicitud",
+                            on_click=lambda e, m=mov: self.rechazar_solicitud(m)
+                        ),
+                    ])
+                ),
+            ]
+        )
+    
+    # ---------------------------
+    # Selección múltiple
+    # ---------------------------
+    def toggle_solicitud(self, e):
+        e.control.selected = not e.control.selected
+        self.update_selection_buttons()
+        self.page.update()
+    
+    def selected_ids(self):
+        return [row.data for row in self.table_solicitudes.rows if row.selected]
+    
+    def update_selection_buttons(self):
+        ninguna = not any(row.selected for row in self.table_solicitudes.rows)
+        self.btn_aprobar_sel.disabled = ninguna
+        self.btn_rechazar_sel.disabled = ninguna
+    
+    def remove_solicitudes(self, ids):
+        """Quita de la tabla solo las filas procesadas, sin volver a consultar"""
+        ids = set(ids)
+        self.table_solicitudes.rows = [row for row in self.table_solicitudes.rows if row.data not in ids]
+        self.update_selection_buttons()
+    
+    def procesar_seleccion(self, aprobar: bool):
+        ids = self.selected_ids()
+        if not ids:
+            return
+        
+        accion = "aprobar" if aprobar else "rechazar"
+        dialog = ft.AlertDialog(
+            title=ft.Text("Confirmar Aprobación" if aprobar else "Confirmar Rechazo"),
+            content=ft.Text(f"¿Desea {accion} {len(ids)} solicitud(es) seleccionada(s)?"),
+            actions=[
+                ft.ElevatedButton(
+                    "Confirmar",
+                    on_click=lambda _: self.confirmar_seleccion(dialog, ids, aprobar)
+                ),
+                ft.TextButton(
+                    "Cancelar",
+                    on_click=lambda _: self.close_dialog(dialog)
                 )
+            ]
+        )
+        
+        self.page.dialog = dialog
+        dialog.open = True
+        self.page.open(dialog)
+    
+    def confirmar_seleccion(self, dialog, ids, aprobar: bool):
+        try:
+            if aprobar:
+                procesados, prestamos = self.controller.aprobar_prestamos(ids)
+                self.table_prestamos.prepend(prestamos)
+            else:
+                procesados = self.controller.rechazar_solicitudes(ids)
+            
+            dialog.open = False
+            # Las no procesadas ya no estaban pendientes: también salen de la tabla
+            self.remove_solicitudes(ids)
+            
+            omitidas = len(ids) - len(procesados)
+            mensaje = f"{len(procesados)} solicitud(es) {'aprobada(s)' if aprobar else 'rechazada(s)'}."
+            if omitidas:
+                mensaje += f"\n{omitidas} ya habían sido procesadas por otro usuario."
+            self.show_dialog_message(
+                "Préstamos Aprobados" if aprobar else "Solicitudes Rechazadas",
+                mensaje,
+                error=not aprobar or bool(omitidas)
             )
+            
+        except Exception as ex:
+            self.show_dialog_message("Error al Procesar Solicitudes", f"Error al procesar las solicitudes: {str(ex)}", error=True)
         
         self.page.update()
     
     def load_prestamos(self):
         """Carga los préstamos activos"""
-        self.table_prestamos.rows.clear()
+        self.table_prestamos.reload()
+    
+    def build_prestamo_row(self, prestamo):
+        material_titulo = "N/A"
+        codigo_copia = "N/A"
+        usuario_nombre = "N/A"
         
-        prestamos = self.controller.get_prestamos_activos()
+        if prestamo.copia and prestamo.copia.material:
+            material_titulo = prestamo.copia.material.titulo
+            codigo_copia = prestamo.copia.codigo_copia
         
-        for prestamo in prestamos:
-            material_titulo = "N/A"
-            codigo_copia = "N/A"
-            usuario_nombre = "N/A"
-            
-            if prestamo.copia and prestamo.copia.material:
-                material_titulo = prestamo.copia.material.titulo
-                codigo_copia = prestamo.copia.codigo_copia
-            
-            if prestamo.usuario:
-                usuario_nombre = prestamo.usuario.nombre
-            
-            # Obtener el monto total de multas pendientes para este préstamo
-            monto_multa = 0
-            if prestamo.multas:
-                monto_multa = sum(float(multa.monto) for multa in prestamo.multas if multa.estado_pago == 'pendiente')
-            
-            self.table_prestamos.rows.append(
-                ft.DataRow(
-                    cells=[
-                        ft.DataCell(ft.Text(str(prestamo.id_prestamo))),
-                        ft.DataCell(ft.Text(material_titulo)),
-                        ft.DataCell(ft.Text(codigo_copia)),
-                        ft.DataCell(ft.Text(usuario_nombre)),
-                        ft.DataCell(ft.Text(str(prestamo.fecha_prestamo))),
-                        ft.DataCell(ft.Text(str(prestamo.fecha_devolucion_prevista))),
-                        ft.DataCell(ft.Text(prestamo.estado)),
-                        ft.DataCell(ft.Text(f"${monto_multa:.2f}")),
-                    ]
-                )
-            )
+        if prestamo.usuario:
+            usuario_nombre = prestamo.usuario.nombre
         
-        self.page.update()
+        # Obtener el monto total de multas pendientes para este préstamo
+        monto_multa = 0
+        if prestamo.multas:
+            monto_multa = sum(float(multa.monto) for multa in prestamo.multas if multa.estado_pago == 'pendiente')
+        
+        return ft.DataRow(
+            cells=[
+                ft.DataCell(ft.Text(str(prestamo.id_prestamo))),
+                ft.DataCell(ft.Text(material_titulo)),
+                ft.DataCell(ft.Text(codigo_copia)),
+                ft.DataCell(ft.Text(usuario_nombre)),
+                ft.DataCell(ft.Text(str(prestamo.fecha_prestamo))),
+                ft.DataCell(ft.Text(str(prestamo.fecha_devolucion_prevista))),
+                ft.DataCell(ft.Text(prestamo.estado)),
+                ft.DataCell(ft.Text(f"${monto_multa:.2f}")),
+            ]
+        )
     
     def aprobar_prestamo(self, movimiento: Movimiento):
         """Aprueba un préstamo, cambia el estado y crea el registro en Prestamo"""
@@ -182,12 +276,18 @@ class PrestamoView(ft.Column):
     
     def confirmar_aprobacion(self, dialog, movimiento: Movimiento):
         try:
-            self.controller.aprobar_prestamo(movimiento.id_movimiento)
+            prestamo = self.controller.aprobar_prestamo(movimiento.id_movimiento)
             
             dialog.open = False
             self.show_dialog_message("Préstamo Aprobado", "El préstamo ha sido aprobado correctamente.")
             
-            # Recargar las tablas
+            # Actualizar solo las filas afectadas
+            self.remove_solicitudes([movimiento.id_movimiento])
+            self.table_prestamos.prepend([prestamo])
+            
+        except ConflictError as ex:
+            dialog.open = False
+            self.show_dialog_message("Solicitud Modificada", str(ex), error=True)
             self.load_solicitudes()
             self.load_prestamos()
             
@@ -224,7 +324,12 @@ class PrestamoView(ft.Column):
             dialog.open = False
             self.show_dialog_message("Solicitud Rechazada", "La solicitud ha sido rechazada correctamente.", error=True)
             
-            # Recargar las tablas
+            # Actualizar solo la fila afectada
+            self.remove_solicitudes([movimiento.id_movimiento])
+            
+        except ConflictError as ex:
+            dialog.open = False
+            self.show_dialog_message("Solicitud Modificada", str(ex), error=True)
             self.load_solicitudes()
             self.load_prestamos()
             
@@ -2,9 +2,14 @@ import flet as ft
 from sqlalchemy.orm import Session
 from controllers.reservaController import ReservaController
 from model.models import Reserva
+from model.session import ConflictError
+from view.pagedTable import PagedTable
 
 
 class ReservaView(ft.Column):
+    # Tablas que muestra la pestaña; su cambio invalida la vista en caché
+    TABLAS = ("reserva", "copia", "material", "usuario")
+
     def __init__(self, session: Session, page: ft.Page):
         super().__init__()
         self.session = session
@@ -27,7 +32,8 @@ class ReservaView(ft.Column):
         )
         
         # Tabla de todas las reservas
-        self.table_todas = ft.DataTable(
+        self.table_todas = PagedTable(
+            page=self.page,
             columns=[
                 ft.DataColumn(ft.Text("ID")),
                 ft.DataColumn(ft.Text("Material")),
@@ -36,7 +42,10 @@ class ReservaView(ft.Column):
                 ft.DataColumn(ft.Text("Fecha Reserva")),
                 ft.DataColumn(ft.Text("Estado")),
             ],
-            rows=[],
+            fetch_page=self.controller.get_all_reservas,
+            build_row=self.build_historial_row,
+            key=lambda r: r.id_reserva,
+            expand=True
         )
         
         self.controls = [
@@ -53,7 +62,7 @@ class ReservaView(ft.Column):
             
             ft.Text("Historial de Reservas", size=18, weight="bold"),
             ft.Container(
-                content=ft.Column([self.table_todas], scroll="auto"),
+                content=self.table_todas,
                 expand=True
             )
         ]
@@ -69,14 +78,14 @@ class ReservaView(ft.Column):
         
         for reserva in reservas:
             material_titulo = "N/A"
-            codigo_copia = "N/A"
             usuario_nombre = "N/A"
             usuario_email = "N/A"
             
-            if reserva.copia:
-                codigo_copia = reserva.copia.codigo_copia
-                if reserva.copia.material:
-                    material_titulo = reserva.copia.material.titulo
+            if reserva.material:
+                material_titulo = reserva.material.titulo
+            
+            # Sin copia asignada la reserva sigue esperando en la cola del material
+            codigo_copia = reserva.copia.codigo_copia if reserva.copia else "En cola"
             
             if reserva.usuario:
                 usuario_nombre = reserva.usuario.nombre
@@ -98,13 +107,13 @@ class ReservaView(ft.Column):
                                     icon=ft.Icons.CHECK_CIRCLE,
                                     icon_color="green",
                                     tooltip="Completar reserva",
-                                    on_click=lambda e, r=reserva: self.completar_reserva(r)
+                                    on_click=lambda e, r=reserva, v=reserva.version: self.completar_reserva(r, v)
                                 ),
                                 ft.IconButton(
                                     icon=ft.Icons.CANCEL,
                                     icon_color="red",
                                     tooltip="Cancelar reserva",
-                                    on_click=lambda e, r=reserva: self.cancelar_reserva(r)
+                                    on_click=lambda e, r=reserva, v=reserva.version: self.cancelar_reserva(r, v)
                                 ),
                             ])
                         ),
@@ -116,51 +125,46 @@ class ReservaView(ft.Column):
     
     def load_todas_reservas(self):
         """Carga todas las reservas"""
-        self.table_todas.rows.clear()
+        self.table_todas.reload()
+    
+    def build_historial_row(self, reserva):
+        material_titulo = "N/A"
+        codigo_copia = "N/A"
+        usuario_nombre = "N/A"
         
-        reservas = self.controller.get_all_reservas()
+        if reserva.material:
+            material_titulo = reserva.material.titulo
         
-        for reserva in reservas:
-            material_titulo = "N/A"
-            codigo_copia = "N/A"
-            usuario_nombre = "N/A"
-            
-            if reserva.copia:
-                codigo_copia = reserva.copia.codigo_copia
-                if reserva.copia.material:
-                    material_titulo = reserva.copia.material.titulo
-            
-            if reserva.usuario:
-                usuario_nombre = reserva.usuario.nombre
-            
-            self.table_todas.rows.append(
-                ft.DataRow(
-                    cells=[
-                        ft.DataCell(ft.Text(str(reserva.id_reserva))),
-                        ft.DataCell(ft.Text(material_titulo, max_lines=2)),
-                        ft.DataCell(ft.Text(codigo_copia)),
-                        ft.DataCell(ft.Text(usuario_nombre)),
-                        ft.DataCell(ft.Text(str(reserva.fecha_reserva.strftime("%Y-%m-%d %H:%M") if reserva.fecha_reserva else "N/A"))),
-                        ft.DataCell(ft.Text(reserva.estado)),
-                    ]
-                )
-            )
+        if reserva.copia:
+            codigo_copia = reserva.copia.codigo_copia
         
-        self.page.update()
+        if reserva.usuario:
+            usuario_nombre = reserva.usuario.nombre
+        
+        return ft.DataRow(
+            cells=[
+                ft.DataCell(ft.Text(str(reserva.id_reserva))),
+                ft.DataCell(ft.Text(material_titulo, max_lines=2)),
+                ft.DataCell(ft.Text(codigo_copia)),
+                ft.DataCell(ft.Text(usuario_nombre)),
+                ft.DataCell(ft.Text(str(reserva.fecha_reserva.strftime("%Y-%m-%d %H:%M") if reserva.fecha_reserva else "N/A"))),
+                ft.DataCell(ft.Text(reserva.estado)),
+            ]
+        )
     
-    def completar_reserva(self, reserva: Reserva):
+    def completar_reserva(self, reserva: Reserva, version: int = None):
         """Completa una reserva"""
         dialog = ft.AlertDialog(
             title=ft.Text("Confirmar Completar Reserva"),
             content=ft.Text(
                 f"¿El usuario {reserva.usuario.nombre if reserva.usuario else 'N/A'} "
                 f"ha recogido el material?\n\n"
-                f"Material: {reserva.copia.material.titulo if reserva.copia and reserva.copia.material else 'N/A'}"
+                f"Material: {reserva.material.titulo if reserva.material else 'N/A'}"
             ),
             actions=[
                 ft.ElevatedButton(
                     "Confirmar",
-                    on_click=lambda _: self.confirmar_completar(dialog, reserva)
+                    on_click=lambda _: self.confirmar_completar(dialog, reserva, version)
                 ),
                 ft.TextButton(
                     "Cancelar",
@@ -173,9 +177,9 @@ class ReservaView(ft.Column):
         dialog.open = True
         self.page.update()
     
-    def confirmar_completar(self, dialog, reserva: Reserva):
+    def confirmar_completar(self, dialog, reserva: Reserva, version: int = None):
         try:
-            self.controller.completar_reserva(reserva.id_reserva)
+            self.controller.completar_reserva(reserva.id_reserva, version)
             
             dialog.open = False
             self.show_message("Reserva completada exitosamente")
@@ -184,24 +188,30 @@ class ReservaView(ft.Column):
             self.load_reservas_activas()
             self.load_todas_reservas()
             
+        except ConflictError as ex:
+            dialog.open = False
+            self.show_message(str(ex), error=True)
+            self.load_reservas_activas()
+            self.load_todas_reservas()
+            
         except Exception as ex:
             self.show_message(f"Error al completar reserva: {str(ex)}", error=True)
         
         self.page.update()
     
-    def cancelar_reserva(self, reserva: Reserva):
+    def cancelar_reserva(self, reserva: Reserva, version: int = None):
         """Cancela una reserva"""
         dialog = ft.AlertDialog(
             title=ft.Text("Confirmar Cancelación"),
             content=ft.Text(
                 f"¿Desea cancelar esta reserva?\n\n"
                 f"Usuario: {reserva.usuario.nombre if reserva.usuario else 'N/A'}\n"
-                f"Material: {reserva.copia.material.titulo if reserva.copia and reserva.copia.material else 'N/A'}"
+                f"Material: {reserva.material.titulo if reserva.material else 'N/A'}"
             ),
             actions=[
                 ft.ElevatedButton(
                     "Confirmar",
-                    on_click=lambda _: self.confirmar_cancelar(dialog, reserva)
+                    on_click=lambda _: self.confirmar_cancelar(dialog, reserva, version)
                 ),
                 ft.TextButton(
                     "Cancelar",
@@ -214,9 +224,9 @@ class ReservaView(ft.Column):
         dialog.open = True
         self.page.update()
     
-    def confirmar_cancelar(self, dialog, reserva: Reserva):
+    def confirmar_cancelar(self, dialog, reserva: Reserva, version: int = None):
         try:
-            self.controller.cancelar_reserva(reserva.id_reserva)
+            self.controller.cancelar_reserva(reserva.id_reserva, version)
             
             dialog.open = False
             self.show_message("Reserva cancelada")
@@ -225,6 +235,12 @@ class ReservaView(ft.Column):
             self.load_reservas_activas()
             self.load_todas_reservas()
             
+        except ConflictError as ex:
+            dialog.open = False
+            self.show_message(str(ex), error=True)
+            self.load_reservas_activas()
+            self.load_todas_reservas()
+            
         except Exception as ex:
             self.show_message(f"Error al cancelar reserva: {str(ex)}", error=True)
         
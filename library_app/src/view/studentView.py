@@ -1,8 +1,8 @@
 import flet as ft
 from view.catalogView import CatalogView
-from view.myLoansView import MyLoansView
-from view.myReservationsView import MyReservationsView
 from sqlalchemy.orm import Session
+from model.session import release_identity_map
+from view.viewCache import TabViewCache
 
 
 
@@ -45,12 +45,16 @@ class StudentView(ft.View):
         
         self.content_area = ft.Container(expand=True)
         self.controls.append(self.content_area)
+
+        # Vistas ya construidas; solo se recargan si cambiaron sus tablas
+        self.view_cache = TabViewCache()
         
         # Cargar la primera pestaña por defecto
         self.load_catalog()
     
     def tab_change(self, e):
         index = e.control.selected_index
+        release_identity_map(self.session)
         
         if index == 0:
             self.load_catalog()
@@ -65,19 +69,31 @@ class StudentView(ft.View):
     # PESTAÑA: CATÁLOGO DE MATERIALES
     # ========================================
     def load_catalog(self):
-        self.content_area.content = CatalogView(self.session, self.page, self.auth.current_user)
+        self.content_area.content = self.view_cache.get(
+            CatalogView,
+            lambda: CatalogView(self.session, self.page, self.auth.current_user)
+        )
     
     # ========================================
     # PESTAÑA: MIS PRÉSTAMOS
     # ========================================
     def load_my_loans(self):
-        self.content_area.content = MyLoansView(self.session, self.page, self.auth.current_user)
+        # Se importa al abrir la pestaña por primera vez
+        from view.myLoansView import MyLoansView
+        self.content_area.content = self.view_cache.get(
+            MyLoansView,
+            lambda: MyLoansView(self.session, self.page, self.auth.current_user)
+        )
     
     # ========================================
     # PESTAÑA: MIS RESERVAS
     # ========================================
     def load_my_reservations(self):
-        self.content_area.content = MyReservationsView(self.session, self.page, self.auth.current_user)
+        from view.myReservationsView import MyReservationsView
+        self.content_area.content = self.view_cache.get(
+            MyReservationsView,
+            lambda: MyReservationsView(self.session, self.page, self.auth.current_user)
+        )
     
     def logout(self, e):
         self.auth.logout()
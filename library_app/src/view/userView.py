@@ -2,9 +2,14 @@ import flet as ft
 from sqlalchemy.orm import Session
 from model.models import Material, Autor, Idioma
 from controllers.userControllers import UserController
+from view.debouncedSearch import DebouncedSearch
+from view.pagedTable import PagedTable
 
 
 class UserView(ft.Column):
+    # Tablas que muestra la pestaña; su cambio invalida la vista en caché
+    TABLAS = ("usuario", "rol", "usuario_rol")
+
     def __init__(self, session: Session, page: ft.Page):
         super().__init__()
         self.session = session
@@ -12,9 +17,15 @@ class UserView(ft.Column):
         self.controller = UserController(session)
 
         # ---- Controles UI ----
+        self.search = DebouncedSearch(
+            session,
+            search=self.search_users,
+            render=self.render_users,
+            refine=self.refine_users,
+        )
         self.search_field = ft.TextField(
             hint_text="Buscar por ID...",
-            on_change=self.search_users,
+            on_change=self.search.on_change,
             expand=True
         )
 
@@ -25,7 +36,8 @@ class UserView(ft.Column):
         )
 
 
-        self.table = ft.DataTable(
+        self.table = PagedTable(
+            page=self.page,
             columns=[
                 ft.DataColumn(ft.Text("ID")),
                 ft.DataColumn(ft.Text("Nombre")),
@@ -33,7 +45,9 @@ class UserView(ft.Column):
                 ft.DataColumn(ft.Text("Acciones")),
                 
             ],
-            rows=[],
+            fetch_page=self.controller.get_all_user,
+            build_row=self.build_row,
+            key=lambda u: u.id_usuario,
             expand=True
         )
 
@@ -48,54 +62,53 @@ class UserView(ft.Column):
     #                  CARGAR USUARIOS
     # ------------------------------------------------------
     def load_users(self):
-        usuarios = self.controller.get_all_user()
-
-        self.table.rows = []
-        for u in usuarios:
-            self.table.rows.append(
-                ft.DataRow(
-                    cells=[
-                        ft.DataCell(ft.Text(str(u.id_usuario))),
-                        ft.DataCell(ft.Text(u.nombre)),
-                        ft.DataCell(ft.Text(u.correo)),
-                        ft.DataCell(
-                            ft.IconButton(
-                                icon=ft.Icons.VISIBILITY,
-                                tooltip="Ver detalles",
-                                on_click=lambda e, usr=u: self.open_detail_modal(usr)
-                            )
-                        ),
-                    ]
-                )
-            )
-        self.page.update()
+        self.search.reset()
+        self.table.reload()
+
+    def render_users(self, resultado):
+        # Sin texto de búsqueda se vuelve a la lista paginada
+        paginado, usuarios = resultado
+        if paginado:
+            self.table.reload(usuarios)
+        else:
+            self.table.set_rows(usuarios)
+
+    def build_row(self, u):
+        return ft.DataRow(
+            cells=[
+                ft.DataCell(ft.Text(str(u.id_usuario))),
+                ft.DataCell(ft.Text(u.nombre)),
+                ft.DataCell(ft.Text(u.correo)),
+                ft.DataCell(
+                    ft.IconButton(
+                        icon=ft.Icons.VISIBILITY,
+                        tooltip="Ver detalles",
+                        on_click=lambda e, usr=u: self.open_detail_modal(usr)
+                    )
+                ),
+            ]
+        )
 
     # --------------------------------------------------------
     #                  BUSCAR USUARIOS
     # --------------------------------------------------------
-    def search_users(self, e):
-        text = self.search_field.value
-        usuarios = self.controller.search_user(text)
-
-        self.table.rows = []
-        for u in usuarios:
-            self.table.rows.append(
-                ft.DataRow(
-                    cells=[
-                        ft.DataCell(ft.Text(str(u.id_usuario))),
-                        ft.DataCell(ft.Text(u.nombre)),
-                        ft.DataCell(ft.Text(u.correo)),
-                        ft.DataCell(
-                            ft.IconButton(
-                                icon=ft.Icons.VISIBILITY,
-                                tooltip="Ver detalles",
-                                on_click=lambda e, usr=u: self.open_detail_modal(usr)
-                            )
-                        ),
-                    ]
-                )
-            )
-        self.page.update()
+    def search_users(self, session, text):
+        # (paginado, usuarios): sin texto se pide la primera página de la lista
+        controller = UserController(session)
+        if not text or not text.strip():
+            return True, controller.get_all_user(limit=self.table.page_size)
+        return False, controller.search_user(text)
+
+    def refine_users(self, resultado, text):
+        # La búsqueda por ID es exacta; "12" no es un refinamiento de "1"
+        if text.strip()[:1].isdigit():
+            return None
+        texto = text.strip().lower()
+        _, usuarios = resultado
+        return False, [
+            u for u in usuarios
+            if texto in (u.nombre or "").lower() or texto in (u.correo or "").lower()
+        ]
 
     # --------------------------------------------------------
     #              MODAL PARA DETALLE + EDITAR + BORRAR
@@ -0,0 +1,34 @@
+import time
+from model.changes import VIEW_CACHE_TTL, change_counter
+
+
+class TabViewCache:
+    """
+    Conserva la vista ya construida de cada pestaña. Al volver a una pestaña
+    se reutiliza mientras no haya cambiado ninguna de las tablas que muestra
+    (atributo TABLAS de la vista) y no supere VIEW_CACHE_TTL segundos;
+    si no, se construye de nuevo.
+    """
+
+    def __init__(self, ttl: float = VIEW_CACHE_TTL):
+        self.ttl = ttl
+        self._vistas = {}
+
+    def get(self, vista_cls, build):
+        """Retorna la vista en caché de `vista_cls` o la crea con `build()`"""
+        version = change_counter.snapshot(vista_cls.TABLAS)
+        entrada = self._vistas.get(vista_cls)
+        if (
+            entrada is not None
+            and entrada[1] == version
+            and time.monotonic() - entrada[2] < self.ttl
+        ):
+            return entrada[0]
+
+        vista = build()
+        if self.ttl > 0:
+            self._vistas[vista_cls] = (vista, version, time.monotonic())
+        return vista
+
+    def clear(self):
+        self._vistas.clear()